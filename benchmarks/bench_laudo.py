@@ -0,0 +1,163 @@
+"""Benchmarks da geração de laudos, com comparação contra uma linha de base.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.bench_laudo                       # roda e grava bench_resultados.json
+    python -m benchmarks.bench_laudo --baseline benchmarks/baseline.json
+    python -m benchmarks.bench_laudo --salvar-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_laudo --filtro laudo_100    # só os casos cujo nome contém o texto
+
+Cada caso é calibrado para rodar ~``--tempo-alvo`` segundos por repetição; o relatório
+guarda a mediana e o mínimo por chamada. Na comparação vale o mínimo das repetições (o
+menos afetado por ruído da máquina, que pesa nos casos de poucos milissegundos): um caso
+é regressão quando ele fica acima de ``baseline * --limite`` (padrão 1.25, ou seja, 25%
+mais lento); nesse caso o processo termina com código 1.
+"""
+import argparse
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from PIL import Image
+
+from laudo.gerador import gerar_laudo_docx, montar_documento
+from laudo.imagens import preparar_imagens
+from laudo.pacote import salvar_documento
+from laudo.streaming import gerar_laudo_docx_streaming
+from laudo.textos import pluralizar_palavra, gerar_descricao_item_web
+
+DATA_FIXA = datetime(2025, 5, 5)
+QTD_ITENS = (1, 10, 100, 1000)
+TAMANHOS_IMAGEM = {'pequena': (640, 480), 'media': (1600, 1200), 'grande': (4000, 3000)}
+IMAGENS_POR_LAUDO = 3
+
+
+def itens_sinteticos(quantidade):
+    """Itens variados (materiais, embalagens, cores, quantidades) para os casos de teste."""
+    materiais = ('v', 'po', 'pd', 'r')
+    embalagens = ('e', 'z', 'a', 'pl', 'pa')
+    cores = ('t', 'b', 'preto', 'az', 'vermelho')
+    return [{
+        'quantidade': i % 37 + 1,
+        'tipo_material': materiais[i % len(materiais)],
+        'tipo_embalagem_base': embalagens[i % len(embalagens)],
+        'cor_embalagem': cores[i % len(cores)],
+        'referencia_subitem': f"2.1.{i % 50 + 1}",
+        'pessoa_relacionada': "Fulano de Tal" if i % 3 else "",
+    } for i in range(quantidade)]
+
+
+def foto_sintetica(largura, altura):
+    """JPEG com ruído (comprime como uma foto real, não como uma cor sólida)."""
+    ruido = Image.effect_noise((largura, altura), 40)
+    imagem = Image.merge('RGB', (ruido, ruido.rotate(90, expand=False), ruido.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    saida = io.BytesIO()
+    imagem.save(saida, 'JPEG', quality=90)
+    return saida.getvalue()
+
+
+def casos():
+    """Dicionário nome -> função sem argumentos a ser medida."""
+    resultado = {}
+    resultado['pluralizar_palavra'] = lambda: [pluralizar_palavra(p, 2) for p in ("porção", "plástico", "papel", "papel alumínio")]
+    item = itens_sinteticos(4)[3]
+    resultado['gerar_descricao_item_web'] = lambda: gerar_descricao_item_web("2.1", item)
+    for n in QTD_ITENS:
+        itens = itens_sinteticos(n)
+        resultado[f'laudo_{n}_itens'] = lambda itens=itens: gerar_laudo_docx("0000659555", itens, data=DATA_FIXA)
+        resultado[f'laudo_{n}_itens_streaming'] = lambda itens=itens: gerar_laudo_docx_streaming("0000659555", itens, data=DATA_FIXA)
+        documento = montar_documento("0000659555", itens, data=DATA_FIXA)
+        resultado[f'salvar_documento_{n}_itens'] = lambda documento=documento: salvar_documento(documento, io.BytesIO())
+    itens = itens_sinteticos(10)
+    for nome_tamanho, (largura, altura) in TAMANHOS_IMAGEM.items():
+        fotos = [(f"foto_{i}.jpg", foto_sintetica(largura, altura)) for i in range(IMAGENS_POR_LAUDO)]
+        resultado[f'imagens_{nome_tamanho}_preparar'] = lambda fotos=fotos: preparar_imagens(fotos)
+        resultado[f'laudo_10_itens_imagens_{nome_tamanho}'] = lambda fotos=fotos: gerar_laudo_docx(
+            "0000659555", itens, imagens=preparar_imagens(fotos), data=DATA_FIXA)
+    return resultado
+
+
+def medir(funcao, repeticoes, tempo_alvo):
+    """Mediana e mínimo (segundos por chamada) de ``repeticoes`` rodadas calibradas."""
+    funcao() # Aquecimento (caches, imports tardios)
+    laco = 1
+    while True:
+        inicio = time.perf_counter()
+        for _ in range(laco):
+            funcao()
+        decorrido = time.perf_counter() - inicio
+        if decorrido >= tempo_alvo or laco >= 1_000_000:
+            break
+        laco = max(laco * 2, int(laco * tempo_alvo / max(decorrido, 1e-9)))
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for _ in range(laco):
+            funcao()
+        tempos.append((time.perf_counter() - inicio) / laco)
+    return {'mediana_s': statistics.median(tempos), 'min_s': min(tempos), 'chamadas_por_repeticao': laco, 'repeticoes': repeticoes}
+
+
+def comparar(resultados, baseline, limite):
+    """Lista de (caso, atual, base, razão) pelo mínimo das repetições e a sublista de regressões."""
+    linhas, regressoes = [], []
+    for nome, medida in resultados.items():
+        base = baseline.get(nome)
+        if not base:
+            continue
+        razao = medida['min_s'] / base['min_s']
+        linhas.append((nome, medida['min_s'], base['min_s'], razao))
+        if razao > limite:
+            regressoes.append(nome)
+    return linhas, regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks da geração de laudos.")
+    parser.add_argument('--saida', default='bench_resultados.json', help="Arquivo JSON de resultados")
+    parser.add_argument('--baseline', help="JSON de referência para detectar regressões")
+    parser.add_argument('--salvar-baseline', help="Grava os resultados também como nova linha de base")
+    parser.add_argument('--limite', type=float, default=1.25, help="Razão máxima atual/base antes de acusar regressão")
+    parser.add_argument('--repeticoes', type=int, default=7)
+    parser.add_argument('--tempo-alvo', type=float, default=0.5, help="Segundos por repetição (calibração)")
+    parser.add_argument('--filtro', default='', help="Só roda casos cujo nome contém este texto")
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    for nome, funcao in casos().items():
+        if args.filtro not in nome:
+            continue
+        resultados[nome] = medir(funcao, args.repeticoes, args.tempo_alvo)
+        print(f"{nome:45s} {resultados[nome]['mediana_s'] * 1000:10.3f} ms (mín. {resultados[nome]['min_s'] * 1000:.3f})")
+
+    relatorio = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'plataforma': platform.platform(),
+        'processador': platform.processor() or platform.machine(),
+        'resultados': resultados,
+    }
+    for caminho in filter(None, (args.saida, args.salvar_baseline)):
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)['resultados']
+    linhas, regressoes = comparar(resultados, baseline, args.limite)
+    print(f"\n{'caso':45s} {'atual mín':>10s} {'base mín':>10s} {'razão':>7s}")
+    for nome, atual, base, razao in linhas:
+        marca = "  REGRESSÃO" if nome in regressoes else ""
+        print(f"{nome:45s} {atual * 1000:10.3f} {base * 1000:10.3f} {razao:7.2f}{marca}")
+    if regressoes:
+        print(f"\n{len(regressoes)} regressão(ões) acima de {args.limite:.2f}x: {', '.join(regressoes)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
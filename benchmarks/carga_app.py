@@ -0,0 +1,268 @@
+"""Carga de ponta a ponta na interface: latência de rerun e de geração com sessões simultâneas.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.carga_app                                  # 1, 10 e 50 itens; 1, 4 e 8 sessões
+    python -m benchmarks.carga_app --itens 100 --sessoes 1 2 4 8 16 --imagens 3
+    python -m benchmarks.carga_app --itens 20 --sessoes 4 --saida carga.json
+
+Cada sessão é um ``AppTest`` do ``laudo_app_v2.py`` (as sessões do Streamlit são threads
+do mesmo processo, como aqui). Roteiro de uma sessão, no modo formulário:
+    1. primeira execução da página com ``num_itens`` itens;
+    2. preenche material, embalagem, subitem e pessoa de cada item e clica em
+       "Atualizar pré-visualização" (``rerun_preenchido``);
+    3. ``--reruns`` vezes: altera uma pessoa e atualiza a pré-visualização (``rerun``);
+    4. muda o número de itens fora do formulário e volta (``rerun_num_itens``);
+    5. clica em "Gerar Laudo .docx" e espera o download (``geracao``).
+Cada sessão usa um lacre e fotos próprios, para não medir o cache de laudos/imagens.
+O relatório traz p50/p95/p99/máximo de cada etapa por configuração (itens × sessões) e
+a vazão de laudos; o JSON segue o formato de ``bench_laudo``.
+
+Ajustes no ``AppTest`` do Streamlit 1.32, válidos só durante a carga:
+    - não envia arquivos ao ``st.file_uploader``: com ``--imagens`` o uploader devolve
+      fotos sintéticas (``UploadedFile`` de verdade) guardadas no estado de cada sessão,
+      e a geração percorre o mesmo caminho das imagens enviadas pelo navegador;
+    - cada ``run`` troca o ``Runtime`` global por um simulado e o apaga ao terminar, o
+      que derruba as outras sessões em andamento: todas passam a ver o mesmo runtime;
+    - cada ``run`` também compila o script de novo, e ``compile`` em várias threads ao
+      mesmo tempo falha às vezes no CPython 3.11 ("AST constructor recursion depth
+      mismatch"): como no servidor, as sessões compartilham um só ``ScriptCache``.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import streamlit as st
+from streamlit.proto.Common_pb2 import FileURLs as FileURLsProto
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.runtime.uploaded_file_manager import UploadedFile, UploadedFileRec
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import element_tree, local_script_runner
+
+from benchmarks.bench_laudo import foto_sintetica, itens_sinteticos
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'laudo_app_v2.py')
+QTD_ITENS = (1, 10, 50)
+QTD_SESSOES = (1, 4, 8)
+TAMANHO_FOTO = (1600, 1200)
+CHAVE_FOTOS = '_carga_fotos' # Estado da sessão com as fotos sintéticas do uploader
+ETAPAS = ('primeira_execucao', 'rerun_preenchido', 'rerun', 'rerun_num_itens', 'geracao')
+
+
+def _indice_selectbox(self):
+    """``Selectbox.index`` tolerante a ``format_func``.
+
+    No 1.32 o ``AppTest`` procura o valor entre os rótulos formatados ("v: vegetal") e
+    falha com ``'v' is not in list``; aqui o índice cai no padrão do widget.
+    """
+    if self.value is None:
+        return None
+    if not self.options:
+        return 0
+    try:
+        return self.options.index(str(self.value))
+    except ValueError:
+        return int(self.proto.default)
+
+
+element_tree.Selectbox.index = property(_indice_selectbox)
+# Os valores dos widgets são preenchidos fora da thread do script: aviso esperado, a cada sessão
+logging.getLogger('streamlit.runtime.scriptrunner.script_run_context').addFilter(
+    lambda registro: 'missing ScriptRunContext' not in registro.getMessage())
+
+
+_file_uploader_original = st.file_uploader
+
+
+def _file_uploader_sintetico(*args, **kwargs):
+    """Substitui o ``st.file_uploader`` das fotos: devolve as guardadas no estado da sessão."""
+    if kwargs.get('key') != 'uploader': # Ex.: o laudo de constatação
+        return _file_uploader_original(*args, **kwargs)
+    return st.session_state.get(CHAVE_FOTOS) or None
+
+
+@contextmanager
+def ambiente_carga(com_imagens=False):
+    """Sessões ``AppTest`` simultâneas no mesmo processo (e uploader sintético, se pedido)."""
+    runtime = MagicMock(spec=Runtime) # O mesmo que o AppTest monta a cada run, mas um só
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    script_cache = ScriptCache()
+    originais = (Runtime.__dict__['instance'], Runtime.__dict__['exists'], local_script_runner.ScriptCache,
+                 st.file_uploader)
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+    local_script_runner.ScriptCache = lambda: script_cache
+    if com_imagens:
+        st.file_uploader = _file_uploader_sintetico
+    try:
+        yield
+    finally:
+        Runtime.instance, Runtime.exists, local_script_runner.ScriptCache, st.file_uploader = originais
+
+
+def fotos_upload(quantidade, sessao):
+    """``UploadedFile`` com fotos sintéticas distintas (o ruído muda a cada chamada)."""
+    largura, altura = TAMANHO_FOTO
+    return [UploadedFile(UploadedFileRec(f"carga_{sessao}_{i}", f"foto_{i}.jpg", 'image/jpeg',
+                                         foto_sintetica(largura, altura)), FileURLsProto())
+            for i in range(quantidade)]
+
+
+def _clicar(at, rotulo):
+    """Clica no botão cujo rótulo começa com ``rotulo`` e executa o rerun; devolve a duração."""
+    botao = next(b for b in at.button if b.label.startswith(rotulo))
+    botao.click()
+    inicio = time.perf_counter()
+    at.run()
+    return time.perf_counter() - inicio
+
+
+def _verificar(at, etapa):
+    if at.exception:
+        raise RuntimeError(f"{etapa}: {at.exception[0].message}")
+    if at.error:
+        raise RuntimeError(f"{etapa}: {at.error[0].value}")
+    if not at.title: # Erro de compilação do script: a execução termina sem elementos
+        raise RuntimeError(f"{etapa}: a página não foi renderizada")
+
+
+def executar_sessao(sessao, num_itens, num_imagens, reruns, timeout):
+    """Roteiro completo de uma sessão; devolve ``{etapa: [durações]}``."""
+    tempos = defaultdict(list)
+    itens = itens_sinteticos(num_itens)
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    at.session_state['num_itens'] = num_itens
+    if num_imagens:
+        at.session_state[CHAVE_FOTOS] = fotos_upload(num_imagens, sessao)
+
+    inicio = time.perf_counter()
+    at.run()
+    tempos['primeira_execucao'].append(time.perf_counter() - inicio)
+    _verificar(at, 'primeira_execucao')
+
+    at.text_input(key='lacre').set_value(f"{sessao:010d}")
+    for i, item in enumerate(itens):
+        at.selectbox(key=f'tipo_mat_{i}').set_value(item['tipo_material'])
+        at.selectbox(key=f'tipo_emb_{i}').set_value(item['tipo_embalagem_base'])
+        at.text_input(key=f'ref_{i}').set_value(item['referencia_subitem'])
+        at.text_input(key=f'pessoa_{i}').set_value(item['pessoa_relacionada'])
+    tempos['rerun_preenchido'].append(_clicar(at, "Atualizar"))
+    _verificar(at, 'rerun_preenchido')
+
+    for rodada in range(reruns):
+        at.text_input(key=f'pessoa_{rodada % num_itens}').set_value(f"Pessoa {sessao}.{rodada}")
+        tempos['rerun'].append(_clicar(at, "Atualizar"))
+        _verificar(at, 'rerun')
+
+    for valor in (num_itens + 1, num_itens):
+        at.number_input(key='num_itens_selector').set_value(valor)
+        inicio = time.perf_counter()
+        at.run()
+        tempos['rerun_num_itens'].append(time.perf_counter() - inicio)
+    _verificar(at, 'rerun_num_itens')
+
+    tempos['geracao'].append(_clicar(at, "Gerar"))
+    _verificar(at, 'geracao')
+    if not at.get('download_button') and not at.get('link_button'):
+        raise RuntimeError("geracao: nenhum botão de download após gerar")
+    return tempos
+
+
+def percentis(valores):
+    """p50, p95, p99 e máximo (segundos) de uma lista de durações."""
+    if len(valores) == 1:
+        return {'p50': valores[0], 'p95': valores[0], 'p99': valores[0], 'max': valores[0], 'n': 1}
+    cortes = statistics.quantiles(valores, n=100, method='inclusive')
+    return {'p50': statistics.median(valores), 'p95': cortes[94], 'p99': cortes[98], 'max': max(valores), 'n': len(valores)}
+
+
+def executar_configuracao(num_itens, sessoes, num_imagens, reruns, timeout):
+    """Roda ``sessoes`` sessões ao mesmo tempo; devolve percentis por etapa, vazão e falhas."""
+    tempos = defaultdict(list)
+    falhas = []
+    lock = threading.Lock()
+    largada = threading.Barrier(sessoes) # Todas as sessões começam juntas
+
+    def _sessao(indice):
+        largada.wait()
+        try:
+            resultado = executar_sessao(indice, num_itens, num_imagens, reruns, timeout)
+        except Exception as e:
+            with lock:
+                falhas.append(f"sessão {indice}: {e}")
+            return
+        with lock:
+            for etapa, duracoes in resultado.items():
+                tempos[etapa].extend(duracoes)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessoes) as executor:
+        list(executor.map(_sessao, range(sessoes)))
+    duracao = time.perf_counter() - inicio
+    return {
+        'itens': num_itens,
+        'sessoes': sessoes,
+        'imagens': num_imagens,
+        'duracao_s': duracao,
+        'laudos_por_s': len(tempos['geracao']) / duracao,
+        'falhas': falhas,
+        'etapas': {etapa: percentis(tempos[etapa]) for etapa in ETAPAS if tempos[etapa]},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Carga de ponta a ponta na interface (Streamlit AppTest).")
+    parser.add_argument('--itens', type=int, nargs='+', default=list(QTD_ITENS), help="Números de itens por laudo")
+    parser.add_argument('--sessoes', type=int, nargs='+', default=list(QTD_SESSOES), help="Sessões simultâneas")
+    parser.add_argument('--imagens', type=int, default=0, help="Fotos sintéticas enviadas por sessão")
+    parser.add_argument('--reruns', type=int, default=5, help="Reruns de edição medidos por sessão")
+    parser.add_argument('--timeout', type=float, default=300, help="Limite (s) de cada execução do script")
+    parser.add_argument('--saida', default='carga_resultados.json', help="Arquivo JSON de resultados")
+    args = parser.parse_args(argv)
+
+    with ambiente_carga(com_imagens=bool(args.imagens)):
+        executar_sessao(-1, 1, min(args.imagens, 1), 0, args.timeout) # Aquecimento: imports tardios e caches de recurso
+        configuracoes = []
+        print(f"{'itens':>6s} {'sessões':>8s} {'etapa':18s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'máx ms':>9s}")
+        for num_itens in args.itens:
+            for sessoes in args.sessoes:
+                resultado = executar_configuracao(num_itens, sessoes, args.imagens, args.reruns, args.timeout)
+                configuracoes.append(resultado)
+                for etapa, p in resultado['etapas'].items():
+                    print(f"{num_itens:6d} {sessoes:8d} {etapa:18s} {p['p50'] * 1000:9.1f} {p['p95'] * 1000:9.1f} "
+                          f"{p['p99'] * 1000:9.1f} {p['max'] * 1000:9.1f}")
+                print(f"{'':16s}{resultado['laudos_por_s']:.2f} laudos/s em {resultado['duracao_s']:.1f}s"
+                      + (f"; {len(resultado['falhas'])} falha(s): {resultado['falhas'][0]}" if resultado['falhas'] else ""))
+
+    relatorio = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'plataforma': platform.platform(),
+        'processador': platform.processor() or platform.machine(),
+        'nucleos': os.cpu_count(),
+        'servico': os.environ.get('LAUDO_SERVICO_URL') or None,
+        'configuracoes': configuracoes,
+    }
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    return 1 if any(c['falhas'] for c in configuracoes) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
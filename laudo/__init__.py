@@ -0,0 +1,4 @@
+"""Geração de laudos periciais (.docx): textos, montagem do documento e ferramentas de apoio.
+
+Os submódulos são importados sob demanda; ``laudo.textos`` não depende de python-docx.
+"""
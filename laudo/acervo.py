@@ -0,0 +1,279 @@
+"""Acervo local dos laudos emitidos, para localizar e baixar de novo sem regenerar.
+
+Uso:
+    python -m laudo.acervo --lacre 0000659555
+    python -m laudo.acervo --pessoa "fulano" --desde 2025-01-01
+    python -m laudo.acervo --extrair 42 --saida copia.docx
+
+Só fica ativo com ``LAUDO_ACERVO_DIR`` definida (os laudos têm dados do caso e, por
+padrão, nada é guardado em disco). No diretório ficam o índice SQLite
+(``indice.sqlite3``) e os .docx em ``blobs/``, endereçados pelo SHA-256 do conteúdo:
+o mesmo documento emitido duas vezes ocupa um só arquivo. Lacre, data, subitens e
+pessoas relacionadas têm índices B-tree, então cada busca custa O(log n) mais os
+resultados, mesmo com dezenas de milhares de laudos. O índice usa WAL e pode ser
+gravado ao mesmo tempo pela interface, pelo serviço e pelo modo em lote.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import unicodedata
+from datetime import datetime
+from functools import lru_cache
+
+from laudo.metricas import fase
+from laudo.textos import CAMPOS_ITEM, _registrar_aviso
+
+ACERVO_DIR = os.environ.get('LAUDO_ACERVO_DIR') or None
+LIMITE_RESULTADOS = 50
+TAMANHO_BLOCO = 1024 * 1024
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS laudos (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    lacre TEXT NOT NULL,
+    data TEXT NOT NULL,
+    emitido_em TEXT NOT NULL,
+    itens INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    entradas TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS laudos_lacre ON laudos (lacre, data);
+CREATE INDEX IF NOT EXISTS laudos_data ON laudos (data);
+CREATE TABLE IF NOT EXISTS chaves (
+    tipo TEXT NOT NULL,
+    valor TEXT NOT NULL,
+    laudo INTEGER NOT NULL REFERENCES laudos (id),
+    PRIMARY KEY (tipo, valor, laudo)
+) WITHOUT ROWID;
+"""
+
+
+def normalizar(texto):
+    """Forma de busca: sem acentos, sem diferença de maiúsculas e com espaços simples."""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return " ".join("".join(c for c in decomposto if not unicodedata.combining(c)).casefold().split())
+
+
+def normalizar_lacre(lacre):
+    """Lacre como é indexado e buscado: texto sem espaços nas pontas."""
+    return str(lacre if lacre is not None else '').strip()
+
+
+def _faixa_prefixo(prefixo):
+    """Limites ``[prefixo, fim)`` que selecionam pelo índice os valores começados por ``prefixo``."""
+    return prefixo, prefixo + '\U0010ffff'
+
+
+class Acervo:
+    """Índice SQLite dos laudos emitidos e os respectivos .docx endereçados por conteúdo."""
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self._dir_blobs = os.path.join(diretorio, 'blobs')
+        os.makedirs(self._dir_blobs, exist_ok=True)
+        # Uma conexão por acervo, compartilhada entre as sessões (threads) sob lock
+        self._conexao = sqlite3.connect(os.path.join(diretorio, 'indice.sqlite3'), timeout=30,
+                                        check_same_thread=False, isolation_level=None)
+        self._conexao.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.executescript(_ESQUEMA)
+            # Acervos gravados antes da normalização guardavam o lacre como digitado
+            self._conexao.execute("UPDATE laudos SET lacre = trim(lacre) WHERE lacre <> trim(lacre)")
+
+    def caminho_blob(self, hash_docx):
+        return os.path.join(self._dir_blobs, hash_docx[:2], f"{hash_docx}.docx")
+
+    def _gravar_blob(self, fonte):
+        """Copia o .docx (bytes, caminho ou arquivo binário) para ``blobs/``; devolve ``(hash, tamanho)``."""
+        if isinstance(fonte, (str, os.PathLike)):
+            with open(fonte, 'rb') as arquivo:
+                return self._gravar_blob(arquivo)
+        if isinstance(fonte, (bytes, bytearray, memoryview)):
+            hash_docx = hashlib.sha256(fonte).hexdigest()
+            destino = self.caminho_blob(hash_docx)
+            if not os.path.exists(destino):
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                with tempfile.NamedTemporaryFile(dir=self._dir_blobs, suffix='.tmp', delete=False) as temporario:
+                    temporario.write(fonte)
+                os.replace(temporario.name, destino) # Escrita atômica
+            return hash_docx, len(fonte)
+        # Arquivo: calcula o hash enquanto copia, em blocos, e só então dá o nome definitivo
+        sha = hashlib.sha256()
+        tamanho = 0
+        with tempfile.NamedTemporaryFile(dir=self._dir_blobs, suffix='.tmp', delete=False) as temporario:
+            for bloco in iter(lambda: fonte.read(TAMANHO_BLOCO), b''):
+                sha.update(bloco)
+                temporario.write(bloco)
+                tamanho += len(bloco)
+        hash_docx = sha.hexdigest()
+        destino = self.caminho_blob(hash_docx)
+        if os.path.exists(destino):
+            os.remove(temporario.name)
+        else:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            os.replace(temporario.name, destino)
+        return hash_docx, tamanho
+
+    def arquivar(self, lacre_num, itens_data, fonte, data=None):
+        """Guarda um laudo emitido e indexa lacre, data, subitens e pessoas; devolve o id.
+
+        ``fonte`` são os bytes do .docx, o caminho ou um arquivo binário aberto no início. Um
+        documento idêntico a outro já arquivado não gera nova entrada.
+        """
+        hash_docx, tamanho = self._gravar_blob(fonte)
+        data_laudo = (data or datetime.now()).strftime("%Y-%m-%d")
+        entradas = json.dumps({'lacre_num': lacre_num, 'data': data_laudo,
+                               'itens': [{campo: item.get(campo) for campo in CAMPOS_ITEM} for item in itens_data]},
+                              ensure_ascii=False, default=str)
+        chaves = {('subitem', item['referencia_subitem'].strip()) for item in itens_data
+                  if (item.get('referencia_subitem') or '').strip()}
+        chaves |= {('pessoa', normalizar(item['pessoa_relacionada'])) for item in itens_data
+                   if normalizar(item.get('pessoa_relacionada'))}
+        with self._lock:
+            self._conexao.execute("BEGIN IMMEDIATE")
+            try:
+                linha = self._conexao.execute("SELECT id FROM laudos WHERE hash = ?", (hash_docx,)).fetchone()
+                if linha is not None:
+                    self._conexao.execute("COMMIT")
+                    return linha['id']
+                id_laudo = self._conexao.execute(
+                    "INSERT INTO laudos (hash, lacre, data, emitido_em, itens, bytes, entradas) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (hash_docx, normalizar_lacre(lacre_num), data_laudo, datetime.now().isoformat(timespec='seconds'),
+                     len(itens_data), tamanho, entradas)).lastrowid
+                self._conexao.executemany("INSERT INTO chaves (tipo, valor, laudo) VALUES (?, ?, ?)",
+                                          [(tipo, valor, id_laudo) for tipo, valor in sorted(chaves)])
+                self._conexao.execute("COMMIT")
+            except BaseException:
+                self._conexao.execute("ROLLBACK")
+                raise
+        return id_laudo
+
+    def buscar(self, lacre=None, subitem=None, pessoa=None, desde=None, ate=None, limite=LIMITE_RESULTADOS):
+        """Laudos que atendem a todos os filtros informados, dos mais recentes aos mais antigos.
+
+        ``lacre`` é exato (sem os espaços das pontas, como no arquivamento); ``subitem`` e
+        ``pessoa`` (sem acentos/maiúsculas) são prefixos; ``desde``/``ate`` são datas
+        ``AAAA-MM-DD`` do laudo, inclusivas.
+        """
+        condicoes, parametros = [], []
+        lacre = normalizar_lacre(lacre)
+        if lacre:
+            condicoes.append("l.lacre = ?")
+            parametros.append(lacre)
+        if desde:
+            condicoes.append("l.data >= ?")
+            parametros.append(str(desde))
+        if ate:
+            condicoes.append("l.data <= ?")
+            parametros.append(str(ate))
+        for tipo, valor in (('subitem', (subitem or '').strip()), ('pessoa', normalizar(pessoa))):
+            if valor:
+                condicoes.append("l.id IN (SELECT laudo FROM chaves WHERE tipo = ? AND valor >= ? AND valor < ?)")
+                parametros += [tipo, *_faixa_prefixo(valor)]
+        consulta = "SELECT l.id, l.lacre, l.data, l.emitido_em, l.itens, l.bytes, l.hash FROM laudos l"
+        if condicoes:
+            consulta += " WHERE " + " AND ".join(condicoes)
+        consulta += " ORDER BY l.data DESC, l.id DESC LIMIT ?"
+        with self._lock:
+            return [dict(linha) for linha in self._conexao.execute(consulta, (*parametros, limite))]
+
+    def obter(self, id_laudo):
+        """Registro de um laudo (com as entradas usadas na geração), ou ``None``."""
+        with self._lock:
+            linha = self._conexao.execute("SELECT * FROM laudos WHERE id = ?", (id_laudo,)).fetchone()
+        if linha is None:
+            return None
+        registro = dict(linha)
+        registro['entradas'] = json.loads(registro['entradas'])
+        return registro
+
+    def abrir(self, id_laudo):
+        """Arquivo binário do .docx arquivado (para copiar em blocos), ou ``None``."""
+        registro = self.obter(id_laudo)
+        if registro is None:
+            return None
+        try:
+            return open(self.caminho_blob(registro['hash']), 'rb')
+        except FileNotFoundError: # Blob apagado à mão: o registro fica, sem o arquivo
+            return None
+
+    def conteudo(self, id_laudo):
+        """Bytes do .docx arquivado, ou ``None``."""
+        arquivo = self.abrir(id_laudo)
+        if arquivo is None:
+            return None
+        with arquivo:
+            return arquivo.read()
+
+    def total(self):
+        with self._lock:
+            return self._conexao.execute("SELECT COUNT(*) FROM laudos").fetchone()[0]
+
+
+@lru_cache(maxsize=1)
+def acervo():
+    """Acervo do processo (``None`` sem ``LAUDO_ACERVO_DIR``)."""
+    return Acervo(ACERVO_DIR) if ACERVO_DIR else None
+
+
+def arquivar_emitido(lacre_num, itens_data, fonte, data=None, avisos=None, medicao=None):
+    """Arquiva o laudo no acervo do processo, se ativo; devolve o id ou ``None``.
+
+    Uma falha do acervo (disco cheio, índice bloqueado) vira aviso e não impede o download.
+    """
+    acervo_local = acervo()
+    if acervo_local is None:
+        return None
+    try:
+        with fase(medicao, 'acervo'):
+            return acervo_local.arquivar(lacre_num, itens_data, fonte, data=data)
+    except (OSError, sqlite3.Error) as e:
+        _registrar_aviso(avisos, f"O laudo não pôde ser arquivado no acervo: {e}")
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consulta o acervo de laudos emitidos (LAUDO_ACERVO_DIR).")
+    parser.add_argument('--diretorio', default=ACERVO_DIR, help="Diretório do acervo (padrão: LAUDO_ACERVO_DIR)")
+    parser.add_argument('--lacre')
+    parser.add_argument('--subitem', help="Referência do subitem (prefixo)")
+    parser.add_argument('--pessoa', help="Pessoa relacionada (prefixo, sem diferenciar acentos)")
+    parser.add_argument('--desde', help="Data inicial do laudo (AAAA-MM-DD)")
+    parser.add_argument('--ate', help="Data final do laudo (AAAA-MM-DD)")
+    parser.add_argument('--limite', type=int, default=LIMITE_RESULTADOS)
+    parser.add_argument('--extrair', type=int, metavar='ID', help="Copia o .docx do laudo ID para --saida")
+    parser.add_argument('--saida', help="Arquivo de destino de --extrair (padrão: laudo_<ID>.docx)")
+    args = parser.parse_args(argv)
+    if not args.diretorio:
+        parser.error("informe --diretorio ou defina LAUDO_ACERVO_DIR")
+
+    acervo_local = Acervo(args.diretorio)
+    if args.extrair is not None:
+        arquivo = acervo_local.abrir(args.extrair)
+        if arquivo is None:
+            print(f"Laudo {args.extrair} não encontrado no acervo.", file=sys.stderr)
+            return 1
+        destino = args.saida or f"laudo_{args.extrair}.docx"
+        with arquivo, open(destino, 'wb') as saida:
+            shutil.copyfileobj(arquivo, saida, TAMANHO_BLOCO)
+        print(f"Laudo {args.extrair} gravado em {destino}.")
+        return 0
+
+    resultados = acervo_local.buscar(args.lacre, args.subitem, args.pessoa, args.desde, args.ate, args.limite)
+    for r in resultados:
+        print(f"{r['id']:>7}  {r['data']}  lacre {r['lacre']:<14} {r['itens']:>5} itens  {r['bytes'] / 1024:8.0f} KB")
+    print(f"{len(resultados)} laudo(s) de {acervo_local.total()} no acervo.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Admissão dos pedidos de geração: limites de upload, de pixels e de memória estimada.
+
+Antes de qualquer decodificação ou de ``Document()``, lê só o cabeçalho de cada imagem
+(dimensões, formato, orientação EXIF) e estima a memória de pico da geração. Pedidos
+acima dos limites são recusados (``PedidoRecusado``) ou, com ``LAUDO_ADMISSAO=reduzir``
+(padrão), ajustados até caber: primeiro menos imagens processadas ao mesmo tempo (só
+fica mais lento), depois imagens reduzidas a uma largura menor que a de impressão.
+
+Limites (variáveis de ambiente):
+    LAUDO_LIMITE_UPLOAD_MB     soma dos arquivos enviados (sempre recusa)
+    LAUDO_LIMITE_MEGAPIXELS    soma das dimensões originais das imagens (sempre recusa)
+    LAUDO_LIMITE_MEMORIA_MB    memória estimada da geração (reduz ou recusa)
+
+A estimativa segue o caminho de ``normalizar_imagem``: o JPEG é decodificado na escala
+do ``draft`` (1/2, 1/4, 1/8), a rotação EXIF e o redimensionamento em dois passes
+mantêm cópias decodificadas ao mesmo tempo, e só ``MAX_THREADS`` imagens são processadas
+juntas. As constantes foram calibradas pelo pico de RSS medido (``laudo.memoria``).
+"""
+import os
+
+from PIL import Image
+
+from laudo.imagens import LARGURA_MAXIMA_PX, MAX_THREADS, abrir_fonte
+
+LIMITE_UPLOAD = int(float(os.environ.get('LAUDO_LIMITE_UPLOAD_MB', '200')) * 1024 * 1024)
+LIMITE_MEGAPIXELS = float(os.environ.get('LAUDO_LIMITE_MEGAPIXELS', '300'))
+LIMITE_MEMORIA = int(float(os.environ.get('LAUDO_LIMITE_MEMORIA_MB', '512')) * 1024 * 1024)
+MODO_ADMISSAO = os.environ.get('LAUDO_ADMISSAO', 'reduzir') # 'reduzir' ou 'recusar'
+LARGURA_MINIMA_PX = 550 # Abaixo disso (100 dpi a 5.5") a ilustração perde a utilidade
+FATOR_REDUCAO = 0.75 # Cada tentativa de redução usa 3/4 da largura anterior
+BYTES_POR_ITEM = {'docx': 2560, 'streaming': 256} # Medido: árvore do python-docx x escrita direta
+BYTES_POR_PIXEL_SAIDA = 0.5 # JPEG qualidade 85 de fotos, aproximado
+ESCALAS_DRAFT = (8, 4, 2, 1)
+FATOR_ALOCADOR = 1.25 # Fragmentação do malloc com várias threads decodificando (medido no RSS)
+
+
+class PedidoRecusado(Exception):
+    """Pedido acima dos limites de admissão; a mensagem é exibível ao usuário."""
+
+
+def ler_cabecalho(nome, fonte):
+    """Dimensões, bandas, formato e orientação EXIF lidos sem decodificar a imagem.
+
+    Imagens ilegíveis entram com dimensões zeradas (a preparação das imagens as reporta
+    como aviso); bombas de descompressão são recusadas.
+    """
+    ilegivel = {'nome': nome, 'bytes': 0, 'largura': 0, 'altura': 0, 'bandas': 0, 'formato': None, 'orientacao': 1}
+    try:
+        with abrir_fonte(fonte) as (arquivo, tamanho):
+            ilegivel['bytes'] = tamanho
+            with Image.open(arquivo) as imagem:
+                # No PNG, getexif() decodifica a imagem inteira se o eXIf não vier antes dos pixels
+                exif = imagem.getexif() if imagem.format != 'PNG' or 'exif' in imagem.info else {}
+                return {'nome': nome, 'bytes': tamanho, 'largura': imagem.width, 'altura': imagem.height,
+                        'bandas': len(imagem.getbands()), 'formato': imagem.format,
+                        'orientacao': exif.get(0x0112, 1)} # Tag EXIF Orientation
+    except Image.DecompressionBombError:
+        raise PedidoRecusado(f"A imagem '{nome}' tem pixels demais para ser processada.") from None
+    except Exception:
+        return ilegivel
+
+
+def _memoria_imagem(cabecalho, largura_maxima):
+    """``(pico transitório, bytes da imagem normalizada)`` de uma imagem nesta largura."""
+    largura, altura, bandas = cabecalho['largura'], cabecalho['altura'], cabecalho['bandas']
+    if not largura:
+        return 0, 0
+    if (cabecalho['orientacao'] == 1 and largura <= largura_maxima
+            and cabecalho['formato'] in ('JPEG', 'PNG')):
+        # Devolvida sem recodificação (os bytes já estão no upload); o PNG ainda é
+        # decodificado pelo getexif() de normalizar_imagem
+        pico = 2 * largura * altura * bandas if cabecalho['formato'] == 'PNG' else 0
+        return int(pico * FATOR_ALOCADOR), 0
+    escala = 1
+    if cabecalho['formato'] == 'JPEG':
+        limite = min(largura // largura_maxima, altura // largura_maxima)
+        escala = next(s for s in ESCALAS_DRAFT if s <= max(1, limite))
+    decodificada = -(-largura // escala) * -(-altura // escala) * bandas
+    altura_decodificada = -(-altura // escala)
+    largura_saida = min(largura, largura_maxima)
+    pixels_saida = largura_saida * max(1, altura * largura_saida // largura)
+    # Decodificada + cópia da rotação EXIF, passe horizontal do LANCZOS, redimensionada + convert()
+    pico = 2 * decodificada + largura_saida * altura_decodificada * bandas + 2 * pixels_saida * bandas
+    return int(pico * FATOR_ALOCADOR), int(pixels_saida * BYTES_POR_PIXEL_SAIDA)
+
+
+def estimar_memoria(cabecalhos, num_itens, streaming=False, largura_maxima=LARGURA_MAXIMA_PX,
+                    max_threads=MAX_THREADS):
+    """Memória de pico estimada (bytes) para gerar o laudo com estas imagens.
+
+    Soma o upload (já em memória), os picos das ``max_threads`` imagens mais caras, as
+    imagens normalizadas e o documento (por item; no python-docx as imagens também são
+    copiadas para as partes do pacote).
+    """
+    picos, normalizadas = [], 0
+    for cabecalho in cabecalhos:
+        pico, saida = _memoria_imagem(cabecalho, largura_maxima)
+        picos.append(pico)
+        normalizadas += saida
+    picos.sort(reverse=True)
+    copias = 1 if streaming else 2
+    return (sum(c['bytes'] for c in cabecalhos) + sum(picos[:max_threads]) + normalizadas * copias
+            + num_itens * BYTES_POR_ITEM['streaming' if streaming else 'docx'])
+
+
+def _mb(valor):
+    return f"{valor / 1024 / 1024:.0f} MB"
+
+
+def avaliar_pedido(arquivos, num_itens, streaming=False, modo=MODO_ADMISSAO, limite_upload=LIMITE_UPLOAD,
+                   limite_megapixels=LIMITE_MEGAPIXELS, limite_memoria=LIMITE_MEMORIA):
+    """Aplica os limites ao pedido e escolhe a largura das imagens.
+
+    ``arquivos`` são os mesmos aceitos por ``preparar_imagens``. Devolve um dicionário com
+    ``largura_maxima`` e ``max_threads`` (a passar para ``preparar_imagens``), ``reduzida``
+    (largura abaixo da de impressão), ``estimativa_bytes``, ``megapixels`` e
+    ``bytes_upload``; levanta ``PedidoRecusado``.
+    """
+    cabecalhos = []
+    for arquivo in arquivos or []:
+        nome, fonte = arquivo if isinstance(arquivo, tuple) else (getattr(arquivo, 'name', str(arquivo)), arquivo)
+        cabecalhos.append(ler_cabecalho(nome, fonte))
+    bytes_upload = sum(c['bytes'] for c in cabecalhos)
+    if bytes_upload > limite_upload:
+        raise PedidoRecusado(f"As imagens somam {_mb(bytes_upload)}, acima do limite de {_mb(limite_upload)} "
+                             "(LAUDO_LIMITE_UPLOAD_MB).")
+    megapixels = sum(c['largura'] * c['altura'] for c in cabecalhos) / 1e6
+    if megapixels > limite_megapixels:
+        raise PedidoRecusado(f"As imagens somam {megapixels:.0f} megapixels, acima do limite de "
+                             f"{limite_megapixels:.0f} (LAUDO_LIMITE_MEGAPIXELS).")
+
+    largura, threads = LARGURA_MAXIMA_PX, MAX_THREADS
+    estimativa = estimar_memoria(cabecalhos, num_itens, streaming, largura, threads)
+    while estimativa > limite_memoria and modo == 'reduzir':
+        if threads > 1:
+            threads //= 2
+        elif int(largura * FATOR_REDUCAO) >= LARGURA_MINIMA_PX:
+            largura = int(largura * FATOR_REDUCAO)
+        else:
+            break
+        estimativa = estimar_memoria(cabecalhos, num_itens, streaming, largura, threads)
+    if estimativa > limite_memoria:
+        raise PedidoRecusado(f"A geração precisaria de cerca de {_mb(estimativa)} de memória, acima do limite de "
+                             f"{_mb(limite_memoria)} (LAUDO_LIMITE_MEMORIA_MB). Envie menos imagens ou imagens menores.")
+    return {'largura_maxima': largura, 'max_threads': threads, 'reduzida': largura < LARGURA_MAXIMA_PX,
+            'estimativa_bytes': estimativa, 'megapixels': megapixels, 'bytes_upload': bytes_upload}
@@ -0,0 +1,159 @@
+"""Cache LRU de conteúdo binário, limitado por bytes, com camada opcional em disco.
+
+Usado para reaproveitar trabalho entre reruns do Streamlit e entre sessões do mesmo
+processo (as sessões rodam em threads, por isso o acesso é protegido por lock).
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+def hash_conteudo(conteudo):
+    """Chave de endereçamento por conteúdo (SHA-256 em hexadecimal)."""
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+class CacheLRU:
+    """Cache chave -> bytes com despejo do item menos usado recentemente.
+
+    ``limite_memoria`` é o total de bytes mantido em memória. Com ``diretorio``, os itens
+    também são gravados em disco (limitados por ``limite_disco``) e sobrevivem ao
+    despejo da memória e ao reinício do processo.
+    """
+
+    def __init__(self, limite_memoria, diretorio=None, limite_disco=0):
+        self.limite_memoria = limite_memoria
+        self.diretorio = diretorio
+        self.limite_disco = limite_disco if diretorio else 0
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0
+        self._memoria = OrderedDict() # chave -> bytes
+        self._bytes_memoria = 0
+        self._disco = OrderedDict() # chave -> tamanho do arquivo
+        self._bytes_disco = 0
+        self._lock = threading.Lock()
+        if self.diretorio:
+            os.makedirs(self.diretorio, exist_ok=True)
+            self._indexar_disco()
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, chave)
+
+    def _indexar_disco(self):
+        """Recupera os itens gravados por execuções anteriores, do mais antigo ao mais recente."""
+        entradas = []
+        for nome in os.listdir(self.diretorio):
+            caminho = self._caminho(nome)
+            if nome.endswith('.tmp') or not os.path.isfile(caminho):
+                continue
+            info = os.stat(caminho)
+            entradas.append((info.st_mtime, nome, info.st_size))
+        for _, nome, tamanho in sorted(entradas):
+            self._disco[nome] = tamanho
+            self._bytes_disco += tamanho
+        self._aplicar_limite_disco()
+
+    def _aplicar_limite_memoria(self):
+        while self._bytes_memoria > self.limite_memoria and self._memoria:
+            _, valor = self._memoria.popitem(last=False)
+            self._bytes_memoria -= len(valor)
+            self.despejos += 1
+
+    def _aplicar_limite_disco(self):
+        while self._bytes_disco > self.limite_disco and self._disco:
+            chave, tamanho = self._disco.popitem(last=False)
+            self._bytes_disco -= tamanho
+            try:
+                os.remove(self._caminho(chave))
+            except OSError:
+                pass
+
+    def _guardar_memoria(self, chave, valor):
+        anterior = self._memoria.pop(chave, None) # Um valor novo grande demais também descarta o antigo
+        if anterior is not None:
+            self._bytes_memoria -= len(anterior)
+        if len(valor) > self.limite_memoria:
+            return
+        self._memoria[chave] = valor
+        self._bytes_memoria += len(valor)
+        self._aplicar_limite_memoria()
+
+    def _ler_disco(self, chave):
+        if chave not in self._disco:
+            return None
+        try:
+            with open(self._caminho(chave), 'rb') as f:
+                valor = f.read()
+            os.utime(self._caminho(chave)) # Mantém a ordem LRU entre reinícios
+        except OSError:
+            self._bytes_disco -= self._disco.pop(chave)
+            return None
+        self._disco.move_to_end(chave)
+        return valor
+
+    def _gravar_disco(self, chave, valor):
+        if not self.diretorio or len(valor) > self.limite_disco or chave in self._disco:
+            return
+        temporario = self._caminho(chave) + '.tmp'
+        with open(temporario, 'wb') as f:
+            f.write(valor)
+        os.replace(temporario, self._caminho(chave)) # Escrita atômica
+        self._disco[chave] = len(valor)
+        self._bytes_disco += len(valor)
+        self._aplicar_limite_disco()
+
+    def obter(self, chave):
+        """Devolve o valor guardado ou ``None``, atualizando os contadores."""
+        with self._lock:
+            valor = self._memoria.get(chave)
+            if valor is not None:
+                self._memoria.move_to_end(chave)
+            elif self.diretorio:
+                valor = self._ler_disco(chave)
+                if valor is not None:
+                    self._guardar_memoria(chave, valor)
+            if valor is None:
+                self.falhas += 1
+            else:
+                self.acertos += 1
+            return valor
+
+    def guardar(self, chave, valor):
+        """Guarda o valor (itens maiores que o limite não são guardados)."""
+        valor = bytes(valor)
+        with self._lock:
+            self._guardar_memoria(chave, valor)
+            try:
+                self._gravar_disco(chave, valor)
+            except OSError:
+                pass # Disco cheio/sem permissão: segue só com a memória
+
+    def limpar(self):
+        """Esvazia a memória e o disco (os contadores são mantidos)."""
+        with self._lock:
+            self._memoria.clear()
+            self._bytes_memoria = 0
+            for chave in list(self._disco):
+                try:
+                    os.remove(self._caminho(chave))
+                except OSError:
+                    pass
+            self._disco.clear()
+            self._bytes_disco = 0
+
+    def estatisticas(self):
+        """Contadores e ocupação atuais, para exibição ou métricas."""
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+                'despejos': self.despejos,
+                'itens_memoria': len(self._memoria),
+                'bytes_memoria': self._bytes_memoria,
+                'itens_disco': len(self._disco),
+                'bytes_disco': self._bytes_disco,
+            }
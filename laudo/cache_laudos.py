@@ -0,0 +1,40 @@
+"""Cache dos laudos já gerados, para repetir o download sem remontar o documento.
+
+A chave é um hash da forma canônica das entradas que definem o conteúdo do .docx
+(lacre, itens, ilustrações já processadas, data do laudo e motor de saída). O cache
+fica só em memória, limitado por bytes (``LAUDO_CACHE_LAUDOS_MB``), porque os laudos
+contêm dados do caso e não devem sobrar em disco.
+"""
+import json
+import os
+from functools import lru_cache
+
+from laudo.cache import CacheLRU, hash_conteudo
+from laudo.imagens import ler_bytes
+from laudo.textos import CAMPOS_ITEM, formatar_data_laudo
+
+CACHE_LAUDOS_MB = float(os.environ.get('LAUDO_CACHE_LAUDOS_MB', '128'))
+
+
+@lru_cache(maxsize=1)
+def cache_laudos():
+    """Cache de laudos gerados do processo, compartilhado entre sessões."""
+    return CacheLRU(int(CACHE_LAUDOS_MB * 1024 * 1024))
+
+
+def chave_laudo(lacre_num, itens_data, imagens=(), data=None, motor='docx'):
+    """Hash canônico das entradas do laudo.
+
+    Só entram os campos de ``CAMPOS_ITEM`` (``is_last`` vem da posição), as imagens
+    pelo hash do conteúdo, na ordem (o nome do arquivo não vai para o documento), e a
+    data já formatada, então gerar de novo no mesmo dia reaproveita o resultado.
+    """
+    canonico = {
+        'lacre': lacre_num,
+        'itens': [[item.get(campo) for campo in CAMPOS_ITEM] for item in itens_data],
+        'imagens': [hash_conteudo(ler_bytes(fonte)) for _, fonte in imagens],
+        'data': formatar_data_laudo(data),
+        'motor': motor,
+    }
+    serializado = json.dumps(canonico, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+    return hash_conteudo(serializado.encode('utf-8'))
@@ -0,0 +1,279 @@
+"""Importação dos itens a partir do .docx do laudo de constatação.
+
+O ``word/document.xml`` é lido em fluxo (``iterparse`` do lxml), sem montar o modelo de
+objetos do python-docx: cada parágrafo fora de tabela e cada linha de tabela (células
+separadas por tabulação) vira um trecho de texto, descartado logo depois de analisado,
+então a memória não cresce com o número de páginas.
+
+Um trecho é um subitem quando começa pela referência (``2.1.1``, ``Subitem 2.1.1 -``...)
+e cita o material ou a embalagem. Dele saem quantidade (``2 (duas)``, ``duas porções``,
+``cento e vinte porções``), material, embalagem, cor (plástico e papel) e a pessoa
+relacionada (``relacionada a``).
+O que não for reconhecido fica com o valor padrão da tabela e gera um aviso, para
+conferência antes da geração.
+
+Só entram os subitens da seção de descrição do material: a seção cujo título numerado
+(em maiúsculas, ex.: ``2 DO MATERIAL``) cita o material, ou a seção 2 se o documento não
+tiver esse título. Referências de outras seções ("5.1 Resultado obtido para o material
+vegetal...") são ignoradas, com aviso.
+
+Na interface, o .docx enviado preenche a tabela de itens. Pela linha de comando, o TSV
+gerado pode ser colado na tabela ou usado como base de um CSV do modo em lote:
+    python -m laudo.constatacao constatacao.docx > itens.tsv
+"""
+import argparse
+import io
+import re
+import sys
+import unicodedata
+import zipfile
+
+from lxml import etree
+
+from laudo.tabela import COLUNAS, EMBALAGENS_COM_COR
+from laudo.textos import CORES_FEMININO_EMBALAGEM, numero_por_extenso
+
+DOCUMENTO = 'word/document.xml'
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+MATERIAL_PADRAO, EMBALAGEM_PADRAO = 'v', 'e' # Os mesmos da tabela vazia
+SECAO_MATERIAL_PADRAO = '2' # Seção do material quando o documento não tem o título
+
+_REFERENCIA = r'(?:sub-?item\s+)?(\d+(?:\.\d+)+[A-Za-z]?)'
+_RE_SUBITEM = re.compile(r'^\s*' + _REFERENCIA + r'\b\s*[-–—.:)]*\s*(.*)$', re.I | re.S)
+_RE_CELULA_SUBITEM = re.compile(r'\s*' + _REFERENCIA + r'\s*', re.I)
+_RE_QTD_NUMERAL = re.compile(r'\b(\d+)\s*\([^\d()]+\)')
+_RE_QTD_INICIO = re.compile(r'^(\d+)\s')
+_RE_TITULO_SECAO = re.compile(r'^\s*(\d+)\s*[-–—.)]?\s+(\D.*)$', re.S)
+# O nome vai até vírgula, ponto e vírgula ou ponto final; o ponto de iniciais e abreviações
+# ("José A. Silva", "Fulano Jr.") faz parte dele
+_ABREVIACOES_NOME = ('Jr', 'Sr', 'Sra', 'Dr', 'Dra')
+_PONTO_NO_NOME = '|'.join([r'(?<=\b\w)\.'] + [rf'(?<=\b{abreviacao})\.' for abreviacao in _ABREVIACOES_NOME])
+_RE_PESSOA = re.compile(r'\b(?:relacionad[ao]s?|pertencentes?)\s+(?:a|ao|à|aos|às)\s+((?:[^,;.\t]|'
+                        + _PONTO_NO_NOME + r')+)', re.I)
+# Material e embalagem por palavra-chave (no texto sem acentos e em minúsculas)
+_MATERIAIS = [(re.compile(p), chave) for p, chave in (
+    (r'vegeta', 'v'), (r'pulveri|\bpo\b|\bem po\b', 'po'), (r'petrifica|\bpedras?\b|\bcrack\b', 'pd'),
+    (r'resin|haxixe', 'r'))]
+_EMBALAGENS = [(re.compile(p), chave) for p, chave in ( # Em ordem de prioridade ("plástico tipo zip")
+    (r'eppendorf|microtubo', 'e'), (r'\bzip\b|ziplock', 'z'), (r'aluminio', 'a'), (r'plastic', 'pl'),
+    (r'papel', 'pa'))]
+
+
+def _sem_acentos(texto):
+    """Minúsculas sem acentos (e sem outros caracteres fora do ASCII), para as palavras-chave."""
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii').lower()
+
+
+# Nome da cor (sem acento, masc./fem.) -> valor aceito pelo formulário
+_CORES = {_sem_acentos(v): (v if v in CORES_FEMININO_EMBALAGEM else k) for k, v in CORES_FEMININO_EMBALAGEM.items()}
+_CORES.update({_sem_acentos(k): k for k in CORES_FEMININO_EMBALAGEM if len(k) > 2})
+# Palavras dos números por extenso (uma, vinte, cento, duzentas...) -> valor; "mil" multiplica
+_PALAVRAS_NUMERO = {_sem_acentos(numero_por_extenso(n, feminino)): n
+                    for n in (*range(1, 20), *range(20, 100, 10), *range(100, 1000, 100)) for feminino in (True, False)}
+_PALAVRAS_NUMERO.update(cento=100, catorze=14)
+
+
+def _texto(elemento):
+    """Texto de um parágrafo ou célula (tabulações e quebras viram espaço)."""
+    partes = []
+    for no in elemento.iter(W + 't', W + 'tab', W + 'br'):
+        partes.append((no.text or '') if no.tag == W + 't' else ' ')
+    return ''.join(partes)
+
+
+def trechos_documento(arquivo_xml):
+    """Gera o texto de cada parágrafo fora de tabelas e de cada linha de tabela.
+
+    Os elementos já analisados são apagados da árvore (memória constante).
+    """
+    profundidade_tabela = 0
+    celulas = []
+    eventos = etree.iterparse(arquivo_xml, events=('start', 'end'), tag=(W + 'p', W + 'tbl', W + 'tr', W + 'tc'),
+                              resolve_entities=False, huge_tree=True)
+    for evento, elemento in eventos:
+        if elemento.tag == W + 'tbl':
+            profundidade_tabela += 1 if evento == 'start' else -1
+            if evento == 'start' or profundidade_tabela:
+                continue
+        elif evento == 'start':
+            continue
+        elif elemento.tag == W + 'tc':
+            celulas.append(' '.join(_texto(elemento).split()))
+            elemento.clear()
+            continue
+        elif elemento.tag == W + 'tr':
+            yield '\t'.join(celulas)
+            celulas = []
+            elemento.clear()
+            continue
+        elif profundidade_tabela: # Parágrafo de célula: lido junto com a célula
+            continue
+        else:
+            yield _texto(elemento)
+        # Fim de um bloco do corpo (parágrafo ou tabela): descarta-o com os irmãos anteriores
+        elemento.clear()
+        while elemento.getprevious() is not None:
+            del elemento.getparent()[0]
+
+
+def _primeira(padroes, texto):
+    """Chave do primeiro padrão (em ordem) encontrado no texto."""
+    return next((chave for padrao, chave in padroes if padrao.search(texto)), None)
+
+
+def _quantidade(descricao, normalizada):
+    encontrado = _RE_QTD_NUMERAL.search(descricao) or _RE_QTD_INICIO.match(descricao)
+    if encontrado:
+        return int(encontrado.group(1))
+    palavras = normalizada.split()
+    quantidade = _numero_inicial(palavras) # "vinte e duas porções", "cento e vinte porções"
+    if quantidade:
+        return quantidade
+    return 1 if palavras[:1] == ['porcao'] else None # "Porção de ..." sem número
+
+
+def _numero_inicial(palavras):
+    """Valor do número por extenso no início das palavras (sem acentos), ou ``None``."""
+    total = grupo = 0
+    lidas = 0
+    for i, palavra in enumerate(palavras):
+        if palavra in _PALAVRAS_NUMERO:
+            grupo += _PALAVRAS_NUMERO[palavra]
+        elif palavra == 'mil':
+            total, grupo = total + (grupo or 1) * 1000, 0
+        elif palavra == 'e' and lidas and palavras[i + 1:i + 2] and palavras[i + 1] in _PALAVRAS_NUMERO:
+            continue
+        else:
+            break
+        lidas += 1
+    return total + grupo if lidas else None
+
+
+def _cor(normalizada):
+    """Cor citada logo depois da embalagem ("plástico transparente", "de cor azul")."""
+    inicio = re.search(r'plastic|papel', normalizada)
+    for palavra in normalizada[inicio.end():].split()[:6] if inicio else ():
+        palavra = palavra.strip(',;.()')
+        if palavra in _CORES:
+            return _CORES[palavra]
+    return None
+
+
+def analisar_trecho(texto):
+    """Item extraído de um trecho, ou ``None`` se o trecho não descreve um subitem.
+
+    Devolve ``(item, faltando)``, com ``faltando`` listando os campos não reconhecidos.
+    """
+    if '\t' in texto: # Linha de tabela: a referência pode não estar na primeira coluna
+        celulas = texto.split('\t')
+        coluna = next((i for i, celula in enumerate(celulas) if _RE_CELULA_SUBITEM.fullmatch(celula)), None)
+        if coluna is not None:
+            texto = ' '.join(celulas[coluna:])
+    encontrado = _RE_SUBITEM.match(texto)
+    if not encontrado:
+        return None
+    referencia, descricao = encontrado.group(1), ' '.join(encontrado.group(2).split())
+    normalizada = _sem_acentos(descricao)
+    material = _primeira(_MATERIAIS, normalizada)
+    embalagem = _primeira(_EMBALAGENS, normalizada)
+    if material is None and embalagem is None: # Título de seção ("2.1 DO MATERIAL RECEBIDO")
+        return None
+    quantidade = _quantidade(descricao, normalizada)
+    pessoa = _RE_PESSOA.search(descricao) if 'relacionad' in normalizada or 'pertencent' in normalizada else None
+    faltando = [campo for campo, valor in (('quantidade', quantidade), ('material', material),
+                                           ('embalagem', embalagem)) if valor is None]
+    item = {
+        'quantidade': quantidade or 1,
+        'tipo_material': material or MATERIAL_PADRAO,
+        'tipo_embalagem_base': embalagem or EMBALAGEM_PADRAO,
+        'cor_embalagem': _cor(normalizada) if embalagem in EMBALAGENS_COM_COR else None,
+        'referencia_subitem': referencia,
+        'pessoa_relacionada': pessoa.group(1).strip() if pessoa else '',
+    }
+    return item, faltando
+
+
+def titulo_secao(texto):
+    """``(número, título normalizado)`` de um título de seção ("2 DO MATERIAL"), ou ``None``."""
+    encontrado = _RE_TITULO_SECAO.match(texto) if '\t' not in texto else None
+    if not encontrado:
+        return None
+    titulo = ' '.join(encontrado.group(2).split())
+    if not any(c.isalpha() for c in titulo) or titulo != titulo.upper(): # Títulos vêm em maiúsculas
+        return None
+    return encontrado.group(1), _sem_acentos(titulo)
+
+
+def importar_constatacao(fonte, avisos=None):
+    """Lê os subitens do .docx do laudo de constatação (caminho, bytes ou arquivo).
+
+    Devolve a lista de itens no formato das linhas da tabela (``COLUNAS``), na ordem do
+    documento. Só valem as referências da seção do material (ver o início do módulo);
+    referências repetidas ficam só na primeira ocorrência, e referências que têm
+    subitens (``2.1`` diante de ``2.1.1``) são títulos, não itens.
+    """
+    if isinstance(fonte, (bytes, bytearray)):
+        fonte = io.BytesIO(fonte)
+    encontrados, vistos, titulos, ignorados = [], set(), set(), {}
+    secao_atual, secao_material = None, SECAO_MATERIAL_PADRAO
+    with zipfile.ZipFile(fonte) as pacote, pacote.open(DOCUMENTO) as documento:
+        for texto in trechos_documento(documento):
+            titulo = titulo_secao(texto)
+            if titulo is not None:
+                secao_atual = titulo[0]
+                if 'material' in titulo[1]:
+                    secao_material = secao_atual
+                continue
+            resultado = analisar_trecho(texto)
+            if resultado is None or resultado[0]['referencia_subitem'] in vistos:
+                continue
+            referencia = resultado[0]['referencia_subitem']
+            if referencia.split('.')[0] != secao_material or secao_atual not in (None, secao_material):
+                ignorados.setdefault(referencia, secao_atual)
+                continue
+            vistos.add(referencia)
+            partes = referencia.split('.')
+            titulos.update('.'.join(partes[:i]) for i in range(2, len(partes)))
+            encontrados.append(resultado)
+    itens = []
+    for item, faltando in encontrados:
+        if item['referencia_subitem'] in titulos:
+            continue
+        if faltando and avisos is not None:
+            avisos.append(f"Subitem {item['referencia_subitem']}: {', '.join(faltando)} não identificado(s) "
+                          "no laudo de constatação; confira a linha importada.")
+        itens.append(item)
+    if avisos is not None:
+        for referencia, secao in ignorados.items():
+            if referencia in vistos:
+                continue
+            if secao and secao != secao_material:
+                avisos.append(f"Trecho {referencia} ignorado: está na seção {secao}, fora da seção do material "
+                              f"(seção {secao_material}).")
+            else:
+                avisos.append(f"Trecho {referencia} ignorado: a referência não é da seção do material "
+                              f"(seção {secao_material}).")
+    return itens
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extrai os subitens de um laudo de constatação (.docx) em TSV.")
+    parser.add_argument('arquivo', help="Laudo de constatação (.docx)")
+    args = parser.parse_args(argv)
+    avisos = []
+    try:
+        itens = importar_constatacao(args.arquivo, avisos)
+    except (OSError, KeyError, zipfile.BadZipFile, etree.XMLSyntaxError) as e:
+        print(f"Não foi possível ler {args.arquivo}: {e}", file=sys.stderr)
+        return 1
+    print('\t'.join(COLUNAS))
+    for item in itens:
+        print('\t'.join('' if item[coluna] is None else str(item[coluna]) for coluna in COLUNAS))
+    for aviso in avisos:
+        print(aviso, file=sys.stderr)
+    print(f"{len(itens)} subitem(ns) importado(s).", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Montagem do laudo em DOCX (python-docx), independente da interface Streamlit."""
+import io
+import time
+
+from docx.shared import Inches
+
+from laudo.imagens import LARGURA_IMAGEM_POL
+from laudo.pacote import salvar_documento
+from laudo.modelo import novo_documento, paragrafo_xml, paragrafo_xml_fixo, paragrafo_imagem_xml, inserir_xml
+from laudo.metricas import fase
+from laudo.secoes import (
+    TITULO_MATERIAL, ResumoItens, paragrafo_item, paragrafos_secoes, paragrafos_referencias,
+    paragrafos_encerramento,
+)
+from laudo.textos import _registrar_aviso
+
+MIME_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+TAMANHO_LOTE_XML = 500 # Parágrafos por conversão para lxml no motor python-docx
+
+
+def _fonte_imagem(fonte):
+    """Aceita caminho, bytes ou objeto com .getbuffer() e devolve algo aceito pelo python-docx."""
+    if isinstance(fonte, (bytes, bytearray, memoryview)):
+        return io.BytesIO(fonte)
+    if hasattr(fonte, 'getbuffer'): # UploadedFile do Streamlit / BytesIO
+        return io.BytesIO(fonte.getbuffer())
+    return fonte
+
+
+def _marcar(medicao, nome, inicio):
+    """Soma a ``medicao`` o tempo desde ``inicio`` e devolve o novo instante de referência."""
+    agora = time.perf_counter()
+    if medicao is not None:
+        medicao.acumular(nome, agora - inicio)
+    return agora
+
+
+def _com_ultimo(itens_data):
+    """Percorre os itens marcando ``is_last`` no último (olhando um item à frente).
+
+    Aceita qualquer iterável, inclusive geradores, sem materializar a lista.
+    """
+    iterador = iter(itens_data)
+    anterior = next(iterador, None)
+    if anterior is None:
+        return
+    for item in iterador:
+        yield dict(anterior, is_last=False)
+        anterior = item
+    yield dict(anterior, is_last=True)
+
+
+def gerar_paragrafos(lacre_num, itens_data, paragrafos_imagens=(), data=None, avisos=None, medicao=None):
+    """Gera, em ordem, o XML (w:p) de cada parágrafo do laudo.
+
+    Base comum dos dois motores de saída (python-docx e escrita em streaming); o texto
+    vem de ``laudo.secoes``. ``paragrafos_imagens`` são os parágrafos das ilustrações já
+    montados pelo motor, que conhece os relacionamentos do pacote. Os itens são
+    consumidos um a um, então a memória usada não cresce com o número de itens.
+    ``medicao`` (``MedicaoLaudo`` opcional) recebe o tempo da descrição dos itens, das
+    seções 3 a 7 e das referências, sem contar o tempo gasto pelo consumidor entre um
+    parágrafo e outro.
+    """
+    # 2 MATERIAL RECEBIDO PARA EXAME
+    yield paragrafo_xml_fixo(*TITULO_MATERIAL)
+    resumo = ResumoItens()
+
+    # Adiciona a descrição de cada item ao DOCX
+    for i, item_data in enumerate(_com_ultimo(itens_data)):
+         inicio = time.perf_counter()
+         numero_item_str = f"2.{i + 1}"
+         paragrafo = paragrafo_item(numero_item_str, item_data, avisos)
+         resumo.adicionar(item_data) # Coleta dados para lógica das seções seguintes
+         _marcar(medicao, 'descricao_itens', inicio)
+         if paragrafo is not None:
+             yield paragrafo_xml(*paragrafo)
+
+    # Imagens carregadas
+    yield from paragrafos_imagens
+
+    # --- Seções 3 a 7, Referências, Data, Assinatura ---
+    inicio = time.perf_counter()
+    partes = [paragrafo_xml_fixo(*p) for p in paragrafos_secoes(resumo, lacre_num, len(paragrafos_imagens))]
+    inicio = _marcar(medicao, 'secoes_3_7', inicio)
+    partes += [paragrafo_xml_fixo(*p) for p in paragrafos_referencias(resumo)]
+    inicio = _marcar(medicao, 'referencias', inicio)
+    partes += [paragrafo_xml_fixo(*p) for p in paragrafos_encerramento(data)]
+    _marcar(medicao, 'fechamento', inicio)
+    yield from partes
+
+
+def montar_documento(lacre_num, itens_data, imagens=(), data=None, avisos=None, medicao=None):
+    """Monta o Document completo do laudo (seções 2 a 7, referências, data e assinatura).
+
+    ``imagens`` é uma sequência de pares ``(nome, fonte)``; ``avisos`` (lista opcional)
+    recebe as mensagens não fatais para exibição pela interface; ``medicao`` (opcional)
+    recebe os tempos por fase.
+    """
+    inicio = time.perf_counter()
+    document = novo_documento()
+    inicio = _marcar(medicao, 'modelo', inicio)
+    paragrafos_imagens = []
+    for nome, fonte in imagens:
+        try:
+            r_id, imagem = document.part.get_or_add_image(_fonte_imagem(fonte))
+            cx, cy = imagem.scaled_dimensions(Inches(LARGURA_IMAGEM_POL), None)
+            paragrafos_imagens.append(paragrafo_imagem_xml(r_id, len(paragrafos_imagens) + 1, imagem.filename, cx, cy))
+        except Exception as e:
+            _registrar_aviso(avisos, f"Erro ao inserir imagem '{nome}': {e}")
+    _marcar(medicao, 'imagens_docx', inicio)
+
+    lote = [] # Converte os parágrafos em blocos (um parse por bloco, não por parágrafo)
+    for xml in gerar_paragrafos(lacre_num, itens_data, paragrafos_imagens, data=data, avisos=avisos, medicao=medicao):
+        lote.append(xml)
+        if len(lote) >= TAMANHO_LOTE_XML:
+            with fase(medicao, 'insercao_xml'):
+                inserir_xml(document, "".join(lote))
+            lote = []
+    with fase(medicao, 'insercao_xml'):
+        inserir_xml(document, "".join(lote))
+    return document
+
+
+def salvar_laudo_docx(destino, lacre_num, itens_data, imagens=(), data=None, avisos=None, medicao=None):
+    """Gera o laudo e grava em ``destino`` (caminho ou arquivo binário aberto e posicionável).
+
+    O zip é gravado por ``laudo.pacote`` (mídias sem recompressão, ordem e data fixas).
+    """
+    document = montar_documento(lacre_num, itens_data, imagens=imagens, data=data, avisos=avisos, medicao=medicao)
+    with fase(medicao, 'salvar'):
+        salvar_documento(document, destino)
+
+
+def gerar_laudo_docx(lacre_num, itens_data, imagens=(), data=None, avisos=None, medicao=None):
+    """Gera o laudo e devolve o conteúdo do arquivo .docx em bytes."""
+    bio = io.BytesIO()
+    salvar_laudo_docx(bio, lacre_num, itens_data, imagens=imagens, data=data, avisos=avisos, medicao=medicao)
+    return bio.getvalue()
@@ -0,0 +1,143 @@
+"""Preparação das ilustrações em memória: decodificação, rotação EXIF e redução para impressão.
+
+As imagens vêm direto dos buffers de upload (ou de caminhos, no modo em lote) e são
+processadas em paralelo numa thread pool (Pillow libera o GIL na decodificação e no
+redimensionamento). Nada é gravado em disco.
+"""
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+
+from PIL import Image, ImageOps
+
+from laudo.cache import CacheLRU, hash_conteudo
+from laudo.textos import _registrar_aviso
+
+LARGURA_IMAGEM_POL = 5.5 # Largura das ilustrações na página (polegadas)
+DPI_IMPRESSAO = 200 # Resolução suficiente para a ilustração impressa a 5.5"
+LARGURA_MAXIMA_PX = int(LARGURA_IMAGEM_POL * DPI_IMPRESSAO)
+QUALIDADE_JPEG = 85
+MAX_THREADS = 4
+# Orçamento do cache de imagens processadas (variáveis de ambiente)
+CACHE_IMAGENS_MB = float(os.environ.get('LAUDO_CACHE_IMAGENS_MB', '256'))
+CACHE_IMAGENS_DIR = os.environ.get('LAUDO_CACHE_IMAGENS_DIR') or None
+CACHE_IMAGENS_DISCO_MB = float(os.environ.get('LAUDO_CACHE_IMAGENS_DISCO_MB', '1024'))
+
+
+@lru_cache(maxsize=1)
+def cache_imagens():
+    """Cache de imagens normalizadas do processo, compartilhado entre sessões."""
+    return CacheLRU(int(CACHE_IMAGENS_MB * 1024 * 1024), diretorio=CACHE_IMAGENS_DIR,
+                    limite_disco=int(CACHE_IMAGENS_DISCO_MB * 1024 * 1024))
+
+
+def chave_imagem(conteudo, largura_maxima=LARGURA_MAXIMA_PX):
+    """Chave do cache: hash dos bytes enviados + parâmetros que alteram o resultado."""
+    return f"{hash_conteudo(conteudo)}-{largura_maxima}-{QUALIDADE_JPEG}"
+
+
+@contextmanager
+def abrir_fonte(fonte):
+    """Arquivo binário no início de ``fonte`` e o seu tamanho em bytes.
+
+    ``fonte`` pode ser bytes, um buffer (UploadedFile do Streamlit, BytesIO ou outro
+    objeto com ``.getbuffer()`` ou ``.getvalue()``) ou um caminho. Buffers posicionáveis
+    são lidos no lugar, sem cópia, e voltam à posição em que estavam.
+    """
+    if isinstance(fonte, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(fonte), len(fonte)
+    elif hasattr(fonte, 'getbuffer') and hasattr(fonte, 'seek') and hasattr(fonte, 'tell'):
+        posicao = fonte.tell()
+        fonte.seek(0)
+        try:
+            yield fonte, fonte.getbuffer().nbytes
+        finally:
+            fonte.seek(posicao)
+    elif hasattr(fonte, 'getbuffer'):
+        buffer = fonte.getbuffer()
+        yield io.BytesIO(buffer), buffer.nbytes
+    elif hasattr(fonte, 'getvalue'):
+        conteudo = fonte.getvalue()
+        yield io.BytesIO(conteudo), len(conteudo)
+    else:
+        with open(fonte, 'rb') as arquivo:
+            yield arquivo, os.fstat(arquivo.fileno()).st_size
+
+
+def ler_bytes(fonte):
+    """Conteúdo completo da imagem (as mesmas fontes de ``abrir_fonte``)."""
+    if isinstance(fonte, bytes):
+        return fonte
+    with abrir_fonte(fonte) as (arquivo, _):
+        return arquivo.read()
+
+
+def normalizar_imagem(conteudo, largura_maxima=LARGURA_MAXIMA_PX):
+    """Aplica a rotação EXIF e reduz a imagem à largura de impressão.
+
+    Imagens que já estão na orientação correta e dentro do limite são devolvidas
+    sem recodificação; as demais são regravadas no formato de origem (PNG continua
+    PNG, o resto vira JPEG).
+    """
+    with Image.open(io.BytesIO(conteudo)) as imagem:
+        formato = imagem.format
+        orientacao = imagem.getexif().get(0x0112, 1) # Tag EXIF Orientation
+        if orientacao == 1 and imagem.width <= largura_maxima and formato in ('JPEG', 'PNG'):
+            return conteudo
+        # JPEG: decodifica já em escala reduzida (1/2, 1/4, 1/8) quando possível
+        imagem.draft('RGB', (largura_maxima, largura_maxima))
+        imagem = ImageOps.exif_transpose(imagem)
+        if imagem.width > largura_maxima:
+            altura = max(1, round(imagem.height * largura_maxima / imagem.width))
+            imagem = imagem.resize((largura_maxima, altura), Image.Resampling.LANCZOS)
+
+        saida = io.BytesIO()
+        if formato == 'PNG':
+            imagem.save(saida, 'PNG')
+        else:
+            imagem.convert('RGB').save(saida, 'JPEG', quality=QUALIDADE_JPEG)
+        return saida.getvalue()
+
+
+def preparar_imagens(arquivos, avisos=None, max_threads=MAX_THREADS, cache=None,
+                     largura_maxima=LARGURA_MAXIMA_PX):
+    """Lê e normaliza as imagens em paralelo, preservando a ordem de envio.
+
+    ``arquivos`` são UploadedFile, pares ``(nome, fonte)`` ou caminhos; devolve a lista
+    de ``(nome, bytes)`` pronta para ``montar_documento``. Com ``cache`` (um ``CacheLRU``),
+    imagens já processadas não passam de novo pela thread pool. ``largura_maxima`` menor
+    que a de impressão é usada quando a admissão reduz o pedido. Imagens ilegíveis viram aviso.
+    """
+    entradas = []
+    for arquivo in arquivos or []:
+        if isinstance(arquivo, tuple):
+            entradas.append(arquivo)
+        else:
+            entradas.append((getattr(arquivo, 'name', str(arquivo)), arquivo))
+
+    def _processar(entrada):
+        nome, fonte = entrada
+        try:
+            conteudo = ler_bytes(fonte)
+            chave = chave_imagem(conteudo, largura_maxima) if cache is not None else None
+            normalizada = cache.obter(chave) if chave else None
+            if normalizada is None:
+                normalizada = normalizar_imagem(conteudo, largura_maxima)
+                if chave:
+                    cache.guardar(chave, normalizada)
+            return nome, normalizada, None
+        except Exception as e:
+            return nome, None, e
+
+    imagens = []
+    if not entradas:
+        return imagens
+    with ThreadPoolExecutor(max_workers=min(max_threads, len(entradas))) as executor:
+        for nome, conteudo, erro in executor.map(_processar, entradas):
+            if erro is not None:
+                _registrar_aviso(avisos, f"Erro ao processar imagem '{nome}': {erro}")
+            else:
+                imagens.append((nome, conteudo))
+    return imagens
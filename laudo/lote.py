@@ -0,0 +1,187 @@
+"""Geração de laudos em lote, sem interface, distribuída entre processos.
+
+Uso:
+    python -m laudo.lote casos.jsonl --saida laudos/ --processos 8
+
+Formato JSONL (um caso por linha):
+    {"arquivo": "laudo_0001.docx", "lacre_num": "0000659555", "data": "2025-05-05",
+     "itens": [{"quantidade": 2, "tipo_material": "v", "tipo_embalagem_base": "pl",
+                "cor_embalagem": "t", "referencia_subitem": "2.1.1",
+                "pessoa_relacionada": "Fulano"}],
+     "imagens": ["fotos/0001_a.jpg"]}
+
+Com ``--metricas arquivo.prom`` os tempos por fase de todos os casos são agregados e
+gravados no formato texto do Prometheus ao final; ``LAUDO_METRICAS_LOG`` grava uma linha
+JSON por laudo, com o pico de memória de cada geração. Com ``LAUDO_ACERVO_DIR``, cada
+laudo gerado também entra no acervo (``laudo.acervo``).
+
+Formato CSV: uma linha por item, agrupadas pela coluna ``caso`` (na ordem em que
+aparecem). Colunas: caso, lacre_num, data, quantidade, tipo_material,
+tipo_embalagem_base, cor_embalagem, referencia_subitem, pessoa_relacionada e,
+opcionalmente, imagens (caminhos separados por ``;``, lidos na primeira linha do caso).
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from laudo.acervo import arquivar_emitido
+from laudo.admissao import PedidoRecusado, avaliar_pedido
+from laudo.imagens import preparar_imagens, cache_imagens
+from laudo.metricas import MedicaoLaudo, RegistroMetricas
+from laudo.saida import gerar_em_arquivo
+from laudo.textos import CAMPOS_ITEM, validar_entrada
+
+
+def _item_de_linha(linha):
+    """Converte uma linha do CSV no dicionário de item usado pela geração."""
+    return {campo: (linha.get(campo) or '').strip() or None for campo in CAMPOS_ITEM}
+
+
+def _normalizar_item(item):
+    """Quantidade lida como texto (CSV, JSONL) convertida para inteiro; vazia vale 1.
+
+    Valores que não são inteiros ficam como vieram, para ``validar_entrada`` reprovar só o caso.
+    """
+    quantidade = item.get('quantidade')
+    if quantidade is None or quantidade == '':
+        quantidade = 1
+    elif isinstance(quantidade, str) and quantidade.strip().isdecimal():
+        quantidade = int(quantidade)
+    return {**item, 'quantidade': quantidade}
+
+
+def ler_casos_jsonl(caminho):
+    """Lê os casos de um arquivo JSONL (linhas em branco são ignoradas)."""
+    casos = []
+    with open(caminho, encoding='utf-8') as f:
+        for num_linha, linha in enumerate(f, start=1):
+            if not linha.strip():
+                continue
+            caso = json.loads(linha)
+            caso.setdefault('arquivo', f"laudo_{num_linha:05d}.docx")
+            casos.append(caso)
+    return casos
+
+
+def ler_casos_csv(caminho):
+    """Lê os casos de um CSV com uma linha por item, agrupando pela coluna ``caso``."""
+    casos = {}
+    with open(caminho, encoding='utf-8', newline='') as f:
+        for linha in csv.DictReader(f):
+            id_caso = linha['caso'].strip()
+            caso = casos.get(id_caso)
+            if caso is None:
+                imagens = [p.strip() for p in (linha.get('imagens') or '').split(';') if p.strip()]
+                caso = casos[id_caso] = {
+                    'arquivo': f"laudo_{id_caso}.docx",
+                    'lacre_num': (linha.get('lacre_num') or '').strip(),
+                    'data': (linha.get('data') or '').strip() or None,
+                    'imagens': imagens,
+                    'itens': [],
+                }
+            caso['itens'].append(_item_de_linha(linha))
+    return list(casos.values())
+
+
+def ler_casos(caminho):
+    """Escolhe o leitor pelo sufixo do arquivo (.csv ou JSONL)."""
+    if caminho.lower().endswith('.csv'):
+        return ler_casos_csv(caminho)
+    return ler_casos_jsonl(caminho)
+
+
+def processar_caso(caso, dir_saida, streaming=False):
+    """Gera um laudo e grava no diretório de saída. Executado nos processos filhos.
+
+    Devolve ``(nome, ok, mensagem, duração, métricas)``; as métricas (dicionário de
+    ``MedicaoLaudo``) são ``None`` quando o caso não passa na validação ou na admissão
+    (``laudo.admissao``). O laudo é escrito com um nome temporário e só ganha o nome final
+    se a geração termina, então uma falha não deixa um .docx incompleto na saída.
+    """
+    inicio = time.perf_counter()
+    nome = caso['arquivo']
+    medicao = None
+    try:
+        lacre_num = caso.get('lacre_num')
+        itens = [_normalizar_item(item) for item in caso.get('itens') or []]
+        erros = validar_entrada(lacre_num, itens)
+        if erros:
+            return nome, False, " ".join(erros), 0.0, None
+        arquivos = [(os.path.basename(p), p) for p in caso.get('imagens') or []]
+        try:
+            admissao = avaliar_pedido(arquivos, len(itens), streaming=streaming)
+        except PedidoRecusado as e:
+            return nome, False, str(e), 0.0, None
+        data = datetime.strptime(caso['data'], "%Y-%m-%d") if caso.get('data') else None
+        avisos = []
+        if admissao['reduzida']:
+            avisos.append(f"imagens reduzidas a {admissao['largura_maxima']} px de largura (limite de memória)")
+        caminho = os.path.join(dir_saida, nome)
+        parcial = caminho + '.parcial'
+        with MedicaoLaudo('streaming' if streaming else 'docx', registro=None) as medicao:
+            medicao.itens = len(itens)
+            medicao.memoria_estimada = admissao['estimativa_bytes']
+            with medicao.fase('imagens'):
+                imagens = preparar_imagens(arquivos, avisos=avisos, cache=cache_imagens(),
+                                           max_threads=admissao['max_threads'],
+                                           largura_maxima=admissao['largura_maxima'])
+            medicao.imagens = len(imagens)
+            medicao.bytes_imagens = sum(len(conteudo) for _, conteudo in imagens)
+            try: # Escreve direto no arquivo, sem o .docx inteiro em memória
+                medicao.bytes_saida = gerar_em_arquivo(parcial, lacre_num, itens, imagens=imagens, data=data,
+                                                       avisos=avisos, medicao=medicao, streaming=streaming)
+                os.replace(parcial, caminho)
+            except BaseException:
+                if os.path.exists(parcial):
+                    os.remove(parcial)
+                raise
+            arquivar_emitido(lacre_num, itens, caminho, data=data, avisos=avisos, medicao=medicao)
+        return nome, True, "; ".join(avisos), time.perf_counter() - inicio, medicao.como_dict()
+    except Exception:
+        return (nome, False, traceback.format_exc(), time.perf_counter() - inicio,
+                medicao.como_dict() if medicao is not None else None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera laudos .docx em lote a partir de um arquivo JSONL ou CSV.")
+    parser.add_argument('entrada', help="Arquivo de casos (.jsonl ou .csv)")
+    parser.add_argument('--saida', default='laudos_gerados', help="Diretório de saída (padrão: laudos_gerados)")
+    parser.add_argument('-j', '--processos', type=int, default=os.cpu_count() or 1,
+                        help="Número de processos (padrão: núcleos disponíveis)")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Usa o motor de escrita em streaming (memória constante para laudos muito grandes)")
+    parser.add_argument('--metricas', help="Grava os tempos por fase agregados (formato Prometheus) neste arquivo")
+    args = parser.parse_args(argv)
+
+    casos = ler_casos(args.entrada)
+    os.makedirs(args.saida, exist_ok=True)
+    inicio = time.perf_counter()
+    falhas = 0
+    registro = RegistroMetricas()
+    with ProcessPoolExecutor(max_workers=max(1, args.processos)) as executor:
+        futuros = [executor.submit(processar_caso, caso, args.saida, args.streaming) for caso in casos]
+        for futuro in as_completed(futuros):
+            nome, ok, mensagem, duracao, metricas = futuro.result()
+            if metricas is not None:
+                registro.registrar(metricas)
+            if ok:
+                print(f"OK    {nome} ({duracao:.2f}s)" + (f" - avisos: {mensagem}" if mensagem else ""))
+            else:
+                falhas += 1
+                print(f"FALHA {nome}: {mensagem}", file=sys.stderr)
+    total = time.perf_counter() - inicio
+    print(f"{len(casos) - falhas}/{len(casos)} laudos gerados em {total:.1f}s ({args.processos} processos).")
+    if args.metricas:
+        with open(args.metricas, 'w', encoding='utf-8') as f:
+            f.write(registro.texto_prometheus())
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
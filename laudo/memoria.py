@@ -0,0 +1,104 @@
+"""Medição da memória de cada geração: pico de RSS amostrado enquanto o laudo é gerado.
+
+O RSS é o do processo inteiro, então com várias sessões gerando ao mesmo tempo o pico de
+um laudo inclui o que as outras alocaram no mesmo intervalo; no serviço e no modo em
+lote (um laudo por processo filho) o valor é só do pedido. É o RSS que conta os buffers
+do Pillow e do lxml, que o ``tracemalloc`` não enxerga; com ``LAUDO_TRACEMALLOC=1`` o
+pico de alocações Python também é medido (deixa a geração mais lenta).
+
+O ``tracemalloc`` também é do processo: os monitores ativos o compartilham por contagem
+de referências (o primeiro liga e zera o pico, o último desliga), e só o monitor que
+zerou o pico informa ``pico_python_bytes``; os que começam durante outra medição ficam
+com ``None``, pois o pico já inclui alocações de antes deles.
+"""
+import os
+import threading
+import tracemalloc
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+INTERVALO_AMOSTRAGEM_S = float(os.environ.get('LAUDO_AMOSTRAGEM_MEMORIA_S', '0.02'))
+USAR_TRACEMALLOC = os.environ.get('LAUDO_TRACEMALLOC') == '1'
+_TAMANHO_PAGINA = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_usuarios = 0 # Monitores medindo com tracemalloc neste momento
+_tracemalloc_iniciado = False # Se foi um monitor que ligou o tracemalloc (e deve desligá-lo)
+
+
+def rss_atual():
+    """RSS do processo em bytes (0 se a plataforma não informa).
+
+    No Linux vem de ``/proc/self/statm``; nos demais Unix, do pico (``ru_maxrss``).
+    """
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _TAMANHO_PAGINA
+    except (OSError, IndexError, ValueError):
+        pass
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 # kB no Linux; bytes no macOS (aprox.)
+    return 0
+
+
+class MonitorMemoria:
+    """Contexto que amostra o RSS numa thread e guarda o crescimento máximo.
+
+    Depois do bloco: ``pico_bytes`` (pico de RSS menos o RSS na entrada) e, com
+    tracemalloc, ``pico_python_bytes``.
+    """
+
+    def __init__(self, intervalo=INTERVALO_AMOSTRAGEM_S, usar_tracemalloc=USAR_TRACEMALLOC):
+        self.intervalo = intervalo
+        self.usar_tracemalloc = usar_tracemalloc
+        self.inicial = 0
+        self.pico_bytes = 0
+        self.pico_python_bytes = None
+        self._pico = 0
+        self._parar = threading.Event()
+        self._amostrador = None
+        self._zerou_pico = False
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            self._pico = max(self._pico, rss_atual())
+
+    def __enter__(self):
+        self.inicial = self._pico = rss_atual()
+        if self.usar_tracemalloc:
+            self._entrar_tracemalloc()
+        self._amostrador = threading.Thread(target=self._amostrar, name='laudo-memoria', daemon=True)
+        self._amostrador.start()
+        return self
+
+    def __exit__(self, tipo_erro, erro, tb):
+        self._parar.set()
+        self._amostrador.join()
+        self._pico = max(self._pico, rss_atual())
+        self.pico_bytes = max(0, self._pico - self.inicial)
+        if self.usar_tracemalloc:
+            self._sair_tracemalloc()
+        return False
+
+    def _entrar_tracemalloc(self):
+        global _tracemalloc_usuarios, _tracemalloc_iniciado
+        with _tracemalloc_lock:
+            if _tracemalloc_usuarios == 0:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    _tracemalloc_iniciado = True
+                tracemalloc.reset_peak()
+                self._zerou_pico = True
+            _tracemalloc_usuarios += 1
+
+    def _sair_tracemalloc(self):
+        global _tracemalloc_usuarios, _tracemalloc_iniciado
+        with _tracemalloc_lock:
+            if self._zerou_pico:
+                self.pico_python_bytes = tracemalloc.get_traced_memory()[1]
+            _tracemalloc_usuarios -= 1
+            if _tracemalloc_usuarios == 0 and _tracemalloc_iniciado:
+                tracemalloc.stop()
+                _tracemalloc_iniciado = False
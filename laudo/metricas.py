@@ -0,0 +1,204 @@
+"""Instrumentação leve da geração: tempo por fase e tamanhos de cada laudo.
+
+Cada laudo gerado vira uma linha JSON no logger ``laudo.metricas`` (gravada em arquivo
+se ``LAUDO_METRICAS_LOG`` estiver definida) e alimenta um registro do processo, que
+pode ser exportado no formato texto do Prometheus com p50/p95 por fase.
+
+As fases podem se aninhar (ex.: ``descricao_itens`` ocorre dentro de ``montagem``),
+então a soma das fases não é necessariamente o tempo total. A memória de cada geração
+(pico de RSS, ver ``laudo.memoria``) e a estimativa da admissão entram nos tamanhos.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+
+from laudo.memoria import MonitorMemoria
+
+logger = logging.getLogger('laudo.metricas')
+JANELA_AMOSTRAS = 1024 # Amostras recentes mantidas por série para os quantis
+QUANTIS = (0.5, 0.95)
+TAMANHOS = ('itens', 'imagens', 'bytes_imagens', 'bytes_saida',
+            'memoria_pico_bytes', 'memoria_python_bytes', 'memoria_estimada_bytes')
+
+if os.environ.get('LAUDO_METRICAS_LOG'):
+    _handler = logging.FileHandler(os.environ['LAUDO_METRICAS_LOG'], encoding='utf-8')
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+
+def _quantil(valores, q):
+    """Quantil por interpolação linear sobre os valores ordenados."""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    posicao = (len(ordenados) - 1) * q
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+
+class RegistroMetricas:
+    """Agrega as medições de todos os laudos do processo (seguro entre threads)."""
+
+    def __init__(self, janela=JANELA_AMOSTRAS):
+        self._lock = threading.Lock()
+        self._fases = defaultdict(lambda: deque(maxlen=janela)) # fase -> durações recentes
+        self._somas = defaultdict(float) # fase -> soma total (segundos)
+        self._contagens = defaultdict(int) # fase -> número de medições
+        self._tamanhos = defaultdict(lambda: deque(maxlen=janela)) # métrica -> valores recentes
+        self._tempos = defaultdict(lambda: deque(maxlen=janela)) # outras durações (ex.: rerun da página)
+        self.laudos = 0
+        self.falhas = 0
+
+    def registrar(self, dados):
+        """Acrescenta uma medição no formato de ``MedicaoLaudo.como_dict()``.
+
+        O formato é serializável, então medições feitas em outros processos (lote) também
+        podem ser agregadas aqui.
+        """
+        with self._lock:
+            if dados['evento'] == 'laudo_gerado':
+                self.laudos += 1
+            else:
+                self.falhas += 1
+            for fase, duracao in dados['fases_s'].items():
+                self._fases[fase].append(duracao)
+                self._somas[fase] += duracao
+                self._contagens[fase] += 1
+            self._fases['total'].append(dados['total_s'])
+            self._somas['total'] += dados['total_s']
+            self._contagens['total'] += 1
+            for nome in TAMANHOS:
+                if dados.get(nome) is not None:
+                    self._tamanhos[nome].append(dados[nome])
+
+    def observar(self, nome, segundos):
+        """Registra uma duração avulsa, exportada como ``laudo_<nome>_segundos``."""
+        with self._lock:
+            self._tempos[nome].append(segundos)
+
+    def resumo(self):
+        """Dicionário fase -> {p50, p95, n} (segundos), para exibição."""
+        with self._lock:
+            return {fase: {'p50': _quantil(v, 0.5), 'p95': _quantil(v, 0.95), 'n': self._contagens[fase]}
+                    for fase, v in self._fases.items()}
+
+    def texto_prometheus(self):
+        """Exporta as métricas no formato de exposição texto do Prometheus."""
+        with self._lock:
+            linhas = [
+                '# HELP laudo_gerados_total Laudos gerados com sucesso.',
+                '# TYPE laudo_gerados_total counter',
+                f'laudo_gerados_total {self.laudos}',
+                '# HELP laudo_falhas_total Gerações que terminaram com erro.',
+                '# TYPE laudo_falhas_total counter',
+                f'laudo_falhas_total {self.falhas}',
+                '# HELP laudo_fase_segundos Duração de cada fase da geração (janela recente).',
+                '# TYPE laudo_fase_segundos summary',
+            ]
+            for fase in sorted(self._fases):
+                for q in QUANTIS:
+                    linhas.append(f'laudo_fase_segundos{{fase="{fase}",quantile="{q}"}} {_quantil(self._fases[fase], q):.6f}')
+                linhas.append(f'laudo_fase_segundos_sum{{fase="{fase}"}} {self._somas[fase]:.6f}')
+                linhas.append(f'laudo_fase_segundos_count{{fase="{fase}"}} {self._contagens[fase]}')
+            for nome in sorted(self._tempos):
+                metrica = f'laudo_{nome}_segundos'
+                linhas.append(f'# TYPE {metrica} summary')
+                for q in QUANTIS:
+                    linhas.append(f'{metrica}{{quantile="{q}"}} {_quantil(self._tempos[nome], q):.6f}')
+                linhas.append(f'{metrica}_sum {sum(self._tempos[nome]):.6f}')
+                linhas.append(f'{metrica}_count {len(self._tempos[nome])}')
+            for nome in sorted(self._tamanhos):
+                metrica = f'laudo_{nome}'
+                linhas.append(f'# TYPE {metrica} summary')
+                for q in QUANTIS:
+                    linhas.append(f'{metrica}{{quantile="{q}"}} {_quantil(self._tamanhos[nome], q):.0f}')
+                linhas.append(f'{metrica}_sum {sum(self._tamanhos[nome]):.0f}')
+                linhas.append(f'{metrica}_count {len(self._tamanhos[nome])}')
+            return '\n'.join(linhas) + '\n'
+
+
+REGISTRO = RegistroMetricas()
+
+
+class MedicaoLaudo:
+    """Tempos, tamanhos e memória de uma geração; use ``fase()`` em torno de cada etapa.
+
+    ``memoria_estimada`` é preenchida por quem fez a admissão do pedido, para comparar a
+    estimativa com o pico medido.
+    """
+
+    def __init__(self, motor='docx', registro=REGISTRO):
+        self.motor = motor
+        self.registro = registro
+        self.fases = defaultdict(float)
+        self.itens = 0
+        self.imagens = 0
+        self.bytes_imagens = 0
+        self.bytes_saida = 0
+        self.ok = True
+        self.memoria_estimada = None
+        self.total_s = 0.0
+        self._inicio = None
+        self._memoria = MonitorMemoria()
+
+    @contextmanager
+    def fase(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases[nome] += time.perf_counter() - inicio
+
+    @property
+    def memoria_pico(self):
+        """Crescimento máximo do RSS durante a geração (bytes), medido ao sair do bloco."""
+        return self._memoria.pico_bytes
+
+    def acumular(self, nome, segundos):
+        """Soma tempo a uma fase medida em pedaços (ex.: dentro de um gerador)."""
+        self.fases[nome] += segundos
+
+    def __enter__(self):
+        self._memoria.__enter__()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo_erro, erro, tb):
+        self.total_s = time.perf_counter() - self._inicio
+        self._memoria.__exit__(tipo_erro, erro, tb)
+        self.ok = tipo_erro is None
+        self.finalizar()
+        return False
+
+    def como_dict(self):
+        return {
+            'evento': 'laudo_gerado' if self.ok else 'laudo_falhou',
+            'motor': self.motor,
+            'itens': self.itens,
+            'imagens': self.imagens,
+            'bytes_imagens': self.bytes_imagens,
+            'bytes_saida': self.bytes_saida,
+            'memoria_pico_bytes': self.memoria_pico,
+            'memoria_python_bytes': self._memoria.pico_python_bytes,
+            'memoria_estimada_bytes': self.memoria_estimada,
+            'total_s': round(self.total_s, 6),
+            'fases_s': {fase: round(duracao, 6) for fase, duracao in self.fases.items()},
+        }
+
+    def finalizar(self):
+        """Emite a linha JSON e registra a medição no agregado do processo."""
+        dados = self.como_dict()
+        logger.info(json.dumps(dados, ensure_ascii=False))
+        if self.registro is not None:
+            self.registro.registrar(dados)
+
+
+def fase(medicao, nome):
+    """``medicao.fase(nome)`` ou um contexto vazio quando não há medição."""
+    return medicao.fase(nome) if medicao is not None else nullcontext()
@@ -0,0 +1,186 @@
+"""Modelo base do laudo: estilos nomeados e fragmentos XML pré-renderizados.
+
+O documento base (fonte padrão + estilos ``Laudo *``) é montado uma vez por processo e
+guardado serializado (para o motor em streaming) e aberto; cada laudo recebe uma cópia
+das partes já abertas, sem novo parse, e só acrescenta os parágrafos (o texto vem de
+``laudo.secoes``). Os parágrafos referenciam o estilo e trazem apenas o que difere
+dele (espaçamento/alinhamento), em vez de repetir fonte e tamanho em cada run.
+"""
+import copy
+import io
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import parse_xml
+from docx.opc.part import Part, XmlPart
+from docx.opc.oxml import serialize_part_xml
+from docx.oxml.shape import CT_Inline
+from docx.package import Package
+from docx.parts.styles import StylesPart
+from lxml import etree
+from docx.shared import Pt
+
+from laudo.secoes import CORPO, ESPACO_ESTILO, ALINHAMENTO_ESTILO
+
+FONTE_PADRAO = 'Gadugi'
+TAMANHO_PADRAO = 12
+NS_W = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+# Nome do estilo: (negrito, tamanho); espaço depois e alinhamento vêm de ``laudo.secoes``
+ESTILOS = {
+    'Laudo Titulo': (True, 12),
+    'Laudo Corpo': (False, 12),
+    'Laudo Legenda': (False, 10),
+    'Laudo Assinatura': (False, 12),
+}
+_ALINHAMENTO_WD = {
+    'left': WD_ALIGN_PARAGRAPH.LEFT, 'center': WD_ALIGN_PARAGRAPH.CENTER,
+    'right': WD_ALIGN_PARAGRAPH.RIGHT, 'both': WD_ALIGN_PARAGRAPH.JUSTIFY,
+}
+
+
+def setup_default_font(document, font_name=FONTE_PADRAO, font_size=TAMANHO_PADRAO):
+    """Define a fonte padrão para o documento."""
+    style = document.styles['Normal']
+    style.font.name = font_name
+    style.font.size = Pt(font_size)
+    # Tenta aplicar a outros estilos comuns
+    for style_name in ['Heading 1', 'Heading 2', 'Heading 3', 'Body Text']:
+        if style_name in document.styles:
+            font = document.styles[style_name].font
+            font.name = font_name
+            font.size = Pt(font_size) # Mantém 12pt para todos por enquanto
+
+
+def _criar_estilos(document):
+    """Cria os estilos de parágrafo do laudo (título, corpo, legenda, assinatura)."""
+    for nome, (negrito, tamanho) in ESTILOS.items():
+        id_estilo = nome.replace(' ', '')
+        estilo = document.styles.add_style(nome, WD_STYLE_TYPE.PARAGRAPH)
+        estilo.base_style = document.styles['Normal']
+        estilo.quick_style = True
+        estilo.font.name = FONTE_PADRAO
+        estilo.font.size = Pt(tamanho)
+        estilo.font.bold = negrito
+        formato = estilo.paragraph_format
+        formato.alignment = _ALINHAMENTO_WD[ALINHAMENTO_ESTILO[id_estilo]]
+        formato.space_after = Pt(ESPACO_ESTILO[id_estilo])
+        formato.line_spacing = 1.0
+
+
+@lru_cache(maxsize=1)
+def documento_base_bytes():
+    """Pacote .docx do modelo base, montado uma única vez por processo."""
+    document = Document()
+    setup_default_font(document)
+    _criar_estilos(document)
+    bio = io.BytesIO()
+    document.save(bio)
+    return bio.getvalue()
+
+
+@lru_cache(maxsize=1)
+def _documento_base():
+    """Modelo base aberto (só leitura: é a origem das cópias de ``novo_documento``)."""
+    return Document(io.BytesIO(documento_base_bytes()))
+
+
+class _EstilosModelo(StylesPart):
+    """styles.xml do modelo (o maior XML do pacote), sem cópia por laudo.
+
+    É gravado com os bytes do modelo; a árvore só é copiada se o documento ler ou alterar
+    os estilos (``document.styles``).
+    """
+
+    def __init__(self, partname, content_type, original, package):
+        Part.__init__(self, partname, content_type, package=package)
+        self._original = original
+        self._copia = None
+
+    @property
+    def _element(self):
+        if self._copia is None:
+            self._copia = copy.deepcopy(self._original.element)
+        return self._copia
+
+    @property
+    def blob(self):
+        return _blob_estilos(self._original) if self._copia is None else serialize_part_xml(self._copia)
+
+
+@lru_cache(maxsize=1)
+def _blob_estilos(original):
+    return original.blob
+
+
+def _copiar_relacionamentos(origem, destino, copias):
+    for rel in origem.rels.values():
+        alvo = rel.target_ref if rel.is_external else copias[rel.target_part]
+        destino.load_rel(rel.reltype, alvo, rel.rId, rel.is_external)
+
+
+def novo_documento():
+    """Cópia do modelo base, pronta para receber os parágrafos do laudo.
+
+    Monta o pacote como o ``Unmarshaller`` do python-docx, mas a partir das partes já
+    abertas: as árvores XML são copiadas (``deepcopy`` do lxml, sem novo parse), os
+    binários (tema, miniatura) compartilhados, pois não são alterados, e os estilos só
+    copiados se forem usados (``_EstilosModelo``).
+    """
+    base = _documento_base().part.package
+    pacote = Package()
+    copias = {}
+    for parte in base.parts:
+        if isinstance(parte, StylesPart):
+            copias[parte] = _EstilosModelo(parte.partname, parte.content_type, parte, pacote)
+        elif isinstance(parte, XmlPart):
+            copias[parte] = type(parte)(parte.partname, parte.content_type, copy.deepcopy(parte.element), pacote)
+        else:
+            copias[parte] = type(parte)(parte.partname, parte.content_type, parte.blob, pacote)
+    _copiar_relacionamentos(base, pacote, copias)
+    for parte, copia in copias.items():
+        _copiar_relacionamentos(parte, copia, copias)
+    for copia in copias.values():
+        copia.after_unmarshal()
+    pacote.after_unmarshal()
+    return pacote.main_document_part.document
+
+
+def paragrafo_xml(texto, estilo=CORPO, espaco_depois=None, alinhamento=None):
+    """XML (w:p) de um parágrafo de um único run no estilo indicado.
+
+    ``espaco_depois`` (pt) e ``alinhamento`` (valor de w:jc: 'left', 'right', 'center',
+    'both') só são escritos quando diferem do estilo. Os argumentos são os mesmos das
+    tuplas de ``laudo.secoes``.
+    """
+    propriedades = f'<w:pStyle w:val="{estilo}"/>'
+    if espaco_depois is not None and espaco_depois != ESPACO_ESTILO[estilo]:
+        propriedades += f'<w:spacing w:after="{int(espaco_depois * 20)}"/>'
+    if alinhamento is not None and alinhamento != ALINHAMENTO_ESTILO[estilo]:
+        propriedades += f'<w:jc w:val="{alinhamento}"/>'
+    return (f'<w:p><w:pPr>{propriedades}</w:pPr>'
+            f'<w:r><w:t xml:space="preserve">{escape(texto)}</w:t></w:r></w:p>')
+
+
+paragrafo_xml_fixo = lru_cache(maxsize=1024)(paragrafo_xml) # Para textos que se repetem entre laudos
+
+def paragrafo_imagem_xml(r_id, id_forma, nome_arquivo, cx, cy):
+    """XML (w:p) de uma ilustração centralizada, com 6 pt depois, no estilo Normal."""
+    inline = etree.tostring(CT_Inline.new_pic_inline(id_forma, r_id, nome_arquivo, cx, cy), encoding='unicode')
+    return ('<w:p><w:pPr><w:spacing w:after="120"/><w:jc w:val="center"/></w:pPr>'
+            f'<w:r><w:drawing>{inline}</w:drawing></w:r></w:p>')
+
+
+def _elementos(xml):
+    """Converte um ou mais w:p serializados em elementos lxml."""
+    return list(parse_xml(f'<w:body xmlns:w="{NS_W}">{xml}</w:body>'))
+
+
+def inserir_xml(document, xml):
+    """Acrescenta os parágrafos serializados ao fim do corpo (antes do sectPr)."""
+    sect_pr = document.element.body.sectPr
+    for elemento in _elementos(xml):
+        sect_pr.addprevious(elemento)
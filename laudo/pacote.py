@@ -0,0 +1,121 @@
+"""Empacotamento do .docx: política de compressão por parte, ordem e data fixas.
+
+Os dois motores (python-docx e streaming) gravam o zip por aqui, depois da montagem:
+
+- as ilustrações já comprimidas (JPEG, PNG, GIF em ``word/media/``) são armazenadas sem
+  compressão: deflate não reduz o tamanho delas e só gasta CPU a cada laudo;
+- as demais partes (XML e a miniatura do modelo, que tem muito preenchimento) são
+  comprimidas com deflate no nível ``LAUDO_NIVEL_DEFLATE`` (0 a 9; padrão 6, o do zlib;
+  1 é bem mais rápido e gera arquivos pouco maiores);
+- as partes vão numa ordem fixa ([Content_Types].xml, relacionamentos do pacote, demais
+  partes por nome, ilustrações por nome) e com a mesma data (1980-01-01, a mínima do zip).
+
+Assim as mesmas entradas geram exatamente os mesmos bytes, o que permite deduplicar pelo
+hash do arquivo (acervo, caches, downloads) em vez de pelo conteúdo das partes.
+
+As partes do python-docx são serializadas pelos passos do ``PackageWriter`` (testado com a
+versão fixada em requirements.txt); se outra versão não os tiver, o documento é salvo
+com ``save()`` num buffer e as partes são lidas de volta do zip.
+"""
+import io
+import os
+import zipfile
+
+from docx.opc.pkgwriter import PackageWriter
+
+NIVEL_DEFLATE = int(os.environ.get('LAUDO_NIVEL_DEFLATE', '6'))
+DATA_FIXA = (1980, 1, 1, 0, 0, 0)
+EXTENSOES_COMPRIMIDAS = frozenset(('jpeg', 'jpg', 'jpe', 'png', 'gif'))
+DIRETORIO_MIDIAS = 'word/media/'
+TIPOS_CONTEUDO = '[Content_Types].xml'
+RELACIONAMENTOS_PACOTE = '_rels/.rels'
+
+
+def ja_comprimida(nome):
+    """Se a parte é uma ilustração já comprimida (em ``word/media/``, pela extensão)."""
+    return nome.startswith(DIRETORIO_MIDIAS) and nome.rsplit('.', 1)[-1].lower() in EXTENSOES_COMPRIMIDAS
+
+
+def ordem_partes(nome):
+    """Chave de ordenação das partes no zip."""
+    if nome == TIPOS_CONTEUDO:
+        return 0, nome
+    if nome == RELACIONAMENTOS_PACOTE:
+        return 1, nome
+    return (3 if ja_comprimida(nome) else 2), nome
+
+
+def info_parte(nome, nivel=NIVEL_DEFLATE):
+    """``ZipInfo`` da parte com data fixa e a compressão da política."""
+    info = zipfile.ZipInfo(nome, date_time=DATA_FIXA)
+    info.create_system = 3 # Fixo: o padrão do zipfile depende do sistema operacional
+    info.external_attr = 0o600 << 16 # O mesmo que ZipFile.writestr usa para nomes
+    if ja_comprimida(nome) or nivel == 0:
+        info.compress_type = zipfile.ZIP_STORED
+    else:
+        info.compress_type = zipfile.ZIP_DEFLATED
+        # Nível usado por ZipFile.open(info, 'w') (writestr recebe o nível pelo argumento
+        # público): atributo público a partir do Python 3.13, interno antes
+        if hasattr(zipfile.ZipInfo, 'compress_level'):
+            info.compress_level = nivel
+        elif '_compresslevel' in getattr(zipfile.ZipInfo, '__slots__', ()):
+            info._compresslevel = nivel
+    return info
+
+
+def escrever_partes(destino, partes, nivel=NIVEL_DEFLATE, em_fluxo=None):
+    """Grava o pacote em ``destino`` (caminho ou arquivo binário) com a política acima.
+
+    ``partes`` é um dicionário nome -> bytes. ``em_fluxo`` (opcional) é um par
+    ``(nome, escrever)``: a parte é gerada durante a gravação, na sua posição da ordem, por
+    ``escrever(arquivo)`` (ex.: o document.xml do motor em streaming).
+    """
+    nomes = list(partes) + ([em_fluxo[0]] if em_fluxo else [])
+    with zipfile.ZipFile(destino, 'w') as zf:
+        for nome in sorted(nomes, key=ordem_partes):
+            if em_fluxo and nome == em_fluxo[0]:
+                with zf.open(info_parte(nome, nivel), 'w', force_zip64=True) as saida:
+                    em_fluxo[1](saida)
+            else:
+                info = info_parte(nome, nivel)
+                zf.writestr(info, partes[nome], compresslevel=nivel if info.compress_type == zipfile.ZIP_DEFLATED else None)
+
+
+class _ColetorPartes:
+    """Recebe as partes serializadas pelo ``PackageWriter`` do python-docx (mesma interface
+    do ``PhysPkgWriter``), no lugar do zip que ele gravaria."""
+
+    def __init__(self):
+        self.partes = {}
+
+    def write(self, pack_uri, blob):
+        self.partes[pack_uri.membername] = blob
+
+
+def partes_documento(document):
+    """Partes serializadas de um ``Document`` (nome no zip -> bytes), como em ``save()``."""
+    pacote = document.part.package
+    try:
+        partes = list(pacote.parts)
+        for parte in partes:
+            parte.before_marshal()
+        coletor = _ColetorPartes()
+        PackageWriter._write_content_types_stream(coletor, partes)
+        PackageWriter._write_pkg_rels(coletor, pacote.rels)
+        PackageWriter._write_parts(coletor, partes)
+        return coletor.partes
+    except (AttributeError, TypeError): # Passos internos ausentes ou alterados nesta versão
+        return _partes_salvas(document)
+
+
+def _partes_salvas(document):
+    """Alternativa só com API pública: ``save()`` num buffer e leitura das partes do zip."""
+    bio = io.BytesIO()
+    document.save(bio)
+    with zipfile.ZipFile(bio) as zf:
+        return {info.filename: zf.read(info) for info in zf.infolist()}
+
+
+def salvar_documento(document, destino, nivel=NIVEL_DEFLATE):
+    """Substitui ``document.save(destino)``, gravando pelo estágio de empacotamento."""
+    escrever_partes(destino, partes_documento(document), nivel)
@@ -0,0 +1,56 @@
+"""Pré-visualização do texto do laudo (seções 2 a 7) em HTML, renderizada de forma incremental.
+
+O HTML de cada item fica em cache pela tupla dos seus campos (mais o número e se é o
+último), então a cada rerun só os itens alterados são renderizados de novo; o resto é
+concatenação. As seções 3 a 7 dependem do conjunto de itens e são recalculadas
+sempre, mas são poucos parágrafos. Não depende do python-docx.
+"""
+import html
+from functools import lru_cache
+
+from laudo.secoes import (
+    TITULO, LEGENDA, TITULO_MATERIAL, ESPACO_ESTILO, ALINHAMENTO_ESTILO, ResumoItens, paragrafo_item,
+    paragrafos_secoes,
+)
+from laudo.textos import CAMPOS_ITEM
+
+_CSS_ESTILO = {TITULO: 'font-weight:bold;', LEGENDA: 'font-size:0.85em;'} # Espaço e alinhamento vêm de laudo.secoes
+_CSS_ALINHAMENTO = {'left': 'left', 'right': 'right', 'center': 'center', 'both': 'justify'}
+
+
+def _html_paragrafo(texto, estilo, espaco_depois=None, alinhamento=None):
+    """<p> equivalente a uma tupla de ``laudo.secoes`` (estilo, espaço e alinhamento)."""
+    css = _CSS_ESTILO.get(estilo, '')
+    css += f'text-align:{_CSS_ALINHAMENTO[alinhamento or ALINHAMENTO_ESTILO[estilo]]};'
+    css += f'margin:0 0 {ESPACO_ESTILO[estilo] if espaco_depois is None else espaco_depois}pt 0;'
+    return f'<p style="{css}">{html.escape(texto)}</p>'
+
+
+_html_paragrafo_fixo = lru_cache(maxsize=1024)(_html_paragrafo)
+
+
+@lru_cache(maxsize=8192)
+def _html_item(numero_item_str, campos, is_last):
+    """HTML da descrição de um item; ``campos`` segue a ordem de ``CAMPOS_ITEM``."""
+    item_data = dict(zip(CAMPOS_ITEM, campos), is_last=is_last)
+    paragrafo = paragrafo_item(numero_item_str, item_data)
+    if paragrafo is None:
+        return f'<p style="color:#b00020;">{numero_item_str} [dados incompletos ou inválidos]</p>'
+    return _html_paragrafo(*paragrafo)
+
+
+def previa_html(lacre_num, itens_data, num_imagens=0):
+    """HTML das seções 2 a 7 para os itens atuais do formulário."""
+    partes = ['<div style="font-family:Gadugi,Segoe UI,sans-serif;font-size:0.9em;">',
+              _html_paragrafo_fixo(*TITULO_MATERIAL)]
+    resumo = ResumoItens()
+    ultimo = len(itens_data) - 1
+    for i, item_data in enumerate(itens_data):
+        numero_item_str = f"2.{i + 1}"
+        partes.append(_html_item(numero_item_str, tuple(item_data.get(campo) for campo in CAMPOS_ITEM), i == ultimo))
+        resumo.adicionar(item_data)
+    if num_imagens:
+        partes.append(_html_paragrafo_fixo(f"[{num_imagens} ilustração(ões)]", LEGENDA))
+    partes += [_html_paragrafo_fixo(*p) for p in paragrafos_secoes(resumo, lacre_num or "[lacre]", num_imagens)]
+    partes.append('</div>')
+    return "".join(partes)
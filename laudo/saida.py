@@ -0,0 +1,62 @@
+"""Saída dos laudos em arquivo temporário com limite de memória ("spool").
+
+O .docx é escrito num ``SpooledTemporaryFile``: fica em memória enquanto for pequeno e
+passa para o disco acima de ``LAUDO_SPOOL_MB``, então laudos com muitas fotos não
+ocupam RAM durante a geração. ``LAUDO_MEMORIA_SESSAO_MB`` é o teto de bytes que uma
+sessão do Streamlit pode receber para download (o ``st.download_button`` guarda uma
+cópia em memória); acima dele o download é servido direto do disco pelo serviço de
+geração (``laudo.servico``).
+"""
+import os
+import shutil
+import tempfile
+
+from laudo.gerador import salvar_laudo_docx
+from laudo.streaming import escrever_laudo_docx
+
+LIMIAR_SPOOL = int(float(os.environ.get('LAUDO_SPOOL_MB', '16')) * 1024 * 1024)
+MEMORIA_SESSAO = int(float(os.environ.get('LAUDO_MEMORIA_SESSAO_MB', '256')) * 1024 * 1024)
+DIR_SPOOL = os.environ.get('LAUDO_DIR_SPOOL') or None # Padrão: diretório temporário do sistema
+TAMANHO_BLOCO_COPIA = 1024 * 1024
+
+
+def arquivo_spool(limiar=LIMIAR_SPOOL):
+    """Arquivo temporário que só vai para o disco acima de ``limiar`` bytes (apagado ao fechar)."""
+    return tempfile.SpooledTemporaryFile(max_size=limiar, dir=DIR_SPOOL, suffix='.docx')
+
+
+def gerar_em_arquivo(destino, lacre_num, itens_data, imagens=(), data=None, avisos=None, medicao=None, streaming=False):
+    """Escreve o laudo em ``destino`` com o motor escolhido e devolve o tamanho em bytes."""
+    if streaming:
+        escrever_laudo_docx(destino, lacre_num, itens_data, imagens=imagens, data=data, avisos=avisos, medicao=medicao)
+    else:
+        salvar_laudo_docx(destino, lacre_num, itens_data, imagens=imagens, data=data, avisos=avisos, medicao=medicao)
+    if isinstance(destino, (str, os.PathLike)):
+        return os.path.getsize(destino)
+    return destino.seek(0, os.SEEK_END)
+
+
+def gerar_em_spool(lacre_num, itens_data, imagens=(), data=None, avisos=None, medicao=None, streaming=False):
+    """Gera o laudo num arquivo spool e devolve ``(arquivo, tamanho)``, com o arquivo no início.
+
+    Quem recebe o arquivo deve fechá-lo (o que libera a memória ou apaga o temporário).
+    """
+    arquivo = arquivo_spool()
+    try:
+        tamanho = gerar_em_arquivo(arquivo, lacre_num, itens_data, imagens=imagens, data=data,
+                                   avisos=avisos, medicao=medicao, streaming=streaming)
+    except BaseException:
+        arquivo.close()
+        raise
+    arquivo.seek(0)
+    return arquivo, tamanho
+
+
+def cabe_na_sessao(tamanho, limite=MEMORIA_SESSAO):
+    """Se um download deste tamanho pode ser entregue pela memória da sessão."""
+    return tamanho <= limite
+
+
+def copiar_em_blocos(origem, destino, tamanho_bloco=TAMANHO_BLOCO_COPIA):
+    """Copia um arquivo para outro (ex.: resposta HTTP) sem carregá-lo inteiro na memória."""
+    shutil.copyfileobj(origem, destino, tamanho_bloco)
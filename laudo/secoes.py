@@ -0,0 +1,175 @@
+"""Conteúdo textual do laudo (seções 2 a 7), independente do formato de saída.
+
+Cada parágrafo é uma tupla ``(texto, estilo, espaco_depois, alinhamento)``; o gerador
+DOCX converte as tuplas em XML (``modelo.paragrafo_xml``) e a pré-visualização em HTML.
+``espaco_depois`` (pt) e ``alinhamento`` (``'left'``, ``'right'``...) são ``None``
+quando valem os do estilo. Este módulo não depende do python-docx.
+"""
+from laudo.substancias import SUBSTANCIAS, SUBSTANCIA_POR_MATERIAL, chave_natural
+from laudo.textos import gerar_descricao_item_web, formatar_data_laudo, _registrar_aviso
+
+# Identificadores dos estilos de parágrafo do modelo (ver ``modelo.ESTILOS``)
+TITULO, CORPO, LEGENDA, ASSINATURA = 'LaudoTitulo', 'LaudoCorpo', 'LaudoLegenda', 'LaudoAssinatura'
+# Espaço depois (pt) e alinhamento (valor de w:jc) de cada estilo: valem quando a tupla traz ``None``
+ESPACO_ESTILO = {TITULO: 6, CORPO: 6, LEGENDA: 12, ASSINATURA: 0}
+ALINHAMENTO_ESTILO = {TITULO: 'both', CORPO: 'both', LEGENDA: 'center', ASSINATURA: 'center'}
+
+# --- Blocos fixos (iguais em todos os laudos) ---
+BLOCOS_FIXOS = {
+    'objetivo': (
+        ("3 OBJETIVO DOS EXAMES", TITULO, None, None),
+        ("Visa esclarecer à autoridade requisitante quanto às características do material apresentado, bem como se ele contém substância de uso proscrito no Brasil e capaz de causar dependência física e/ou psíquica. O presente laudo pericial busca demonstrar a materialidade da infração penal apurada.", CORPO, 12, None),
+    ),
+    'custodia': (
+        ("7 CUSTÓDIA DO MATERIAL", TITULO, None, None),
+        ("7.1 Contraprova", CORPO, None, None),
+    ),
+    'encerramento': (
+        ("É o que se tem a relatar.", CORPO, 24, None),
+    ),
+    'assinatura': (
+        ("Laudo assinado digitalmente com dados do assinador à esquerda das páginas", ASSINATURA, None, 'left'),
+        ("Daniel Chendes Lima", ASSINATURA, None, None),
+        ("Perito Criminal", ASSINATURA, 12, None),
+    ),
+}
+TITULO_MATERIAL = ("2 MATERIAL RECEBIDO PARA EXAME", TITULO, None, None)
+
+
+def _subsecao(prefixo, titulo, linhas):
+    """Título numerado (``prefixo``) seguido das linhas ``prefixo.1``, ``prefixo.2``...
+
+    Devolve pares ``(texto, espaço depois)``: 6 pt após o título e a última linha, 0 entre as linhas.
+    """
+    subsecao = [(f"{prefixo} {titulo}", 6)]
+    subsecao += [(f"{prefixo}.{numero} {linha}", 6 if numero == len(linhas) else 0)
+                 for numero, linha in enumerate(linhas, start=1)]
+    return subsecao
+
+
+def _secao(linhas, espaco_final=12):
+    """Parágrafos de corpo de uma seção; o último recebe o espaço de fechamento."""
+    partes = [(texto, CORPO, espaco, None) for texto, espaco in linhas[:-1]]
+    texto, _ = linhas[-1]
+    partes.append((texto, CORPO, espaco_final, None))
+    return partes
+
+
+class ResumoItens:
+    """Substâncias e subitens encontrados nos itens, acumulados em uma passada.
+
+    Cada referência de subitem guarda a sua chave de ordenação natural no momento em
+    que aparece; no fim, só as referências distintas de cada substância são ordenadas.
+    """
+
+    def __init__(self):
+        self.subitens = [{} for _ in SUBSTANCIAS] # por substância: referência -> chave natural
+        self.presentes = [False] * len(SUBSTANCIAS)
+        self._encontradas = None # Resultado de substancias(), reaproveitado entre as seções
+
+    def adicionar(self, item_data):
+        indice = SUBSTANCIA_POR_MATERIAL.get(item_data.get('tipo_material'))
+        if indice is None:
+            return
+        self._encontradas = None
+        self.presentes[indice] = True
+        ref_sub = item_data.get('referencia_subitem')
+        if ref_sub and ref_sub not in self.subitens[indice]:
+            self.subitens[indice][ref_sub] = chave_natural(ref_sub)
+
+    def substancias(self):
+        """Pares ``(substância, texto dos subitens)`` das substâncias presentes, na ordem do registro.
+
+        O texto já vem com o rótulo: "subitem 2.1.1" ou "subitens 2.1.1 e 2.1.2".
+        """
+        if self._encontradas is None:
+            self._encontradas = []
+            for indice, substancia in enumerate(SUBSTANCIAS):
+                if not self.presentes[indice]:
+                    continue
+                referencias = sorted(self.subitens[indice], key=self.subitens[indice].get)
+                rotulo = "subitem" if len(referencias) == 1 else "subitens"
+                self._encontradas.append((substancia, f"{rotulo} {' e '.join(referencias)}"))
+        return self._encontradas
+
+
+def paragrafo_item(numero_item_str, item_data, avisos=None):
+    """Parágrafo da descrição do item, ou ``None`` se a descrição não pôde ser gerada."""
+    desc_item_txt = gerar_descricao_item_web(numero_item_str, item_data, avisos)
+    if "[ERRO" in desc_item_txt: # Só adiciona se não deu erro na geração
+        _registrar_aviso(avisos, f"Erro ao formatar item {numero_item_str}. Verifique os dados.")
+        return None
+    return (desc_item_txt, CORPO, None, None)
+
+
+def paragrafos_secoes(resumo, lacre_num, imagens_inseridas_count=0):
+    """Legenda das ilustrações e seções 3 a 7."""
+    # Adiciona Legenda da(s) Ilustração(ões)
+    if imagens_inseridas_count > 1:
+        caption_text = f"Ilustrações 1-{imagens_inseridas_count} – Material recebido para exame."
+    else: # Legenda padrão (uma imagem ou nenhuma)
+        caption_text = "Ilustração 1 – Material recebido para exame."
+    partes = [(caption_text, LEGENDA, None, None)]
+
+    # 3 OBJETIVO DOS EXAMES
+    partes += BLOCOS_FIXOS['objetivo']
+
+    encontradas = resumo.substancias()
+
+    # 4 EXAMES
+    partes.append(("4 EXAMES", TITULO, None, None))
+    exames = []
+    for numero, (substancia, _) in enumerate(encontradas, start=1):
+        exames += _subsecao(f"4.{numero}", substancia['exames_titulo'], substancia['exames'])
+    if not encontradas:
+        exames += [("4.1 Exames realizados", 6), ("4.1.1 Exame macroscópico;", 6)]
+    partes += _secao(exames)
+
+    # 5 RESULTADOS
+    resultados = []
+    for numero, (substancia, subitens_texto) in enumerate(encontradas, start=1):
+        resultados += _subsecao(f"5.{numero}", f"Resultados obtidos para os materiais descritos no(s) {subitens_texto}:",
+                                substancia['resultados'])
+    if resultados:
+        partes.append(("5 RESULTADOS", TITULO, None, None))
+        partes += _secao(resultados)
+    else: # Sem resultados, o próprio título fecha a seção
+        partes.append(("5 RESULTADOS", TITULO, 12, None))
+
+    # 6 CONCLUSÃO
+    partes.append(("6 CONCLUSÃO", TITULO, None, None))
+    conclusoes = [f"nos materiais descritos no(s) {subitens_texto}, {substancia['conclusao']}"
+                  for substancia, subitens_texto in encontradas]
+    if conclusoes:
+        texto_final_conclusao = f"A partir das análises realizadas, conclui-se que, {' Outrossim, '.join(conclusoes)}"
+    else:
+        texto_final_conclusao = "A partir das análises realizadas, conclui-se que não foram detectadas substâncias de uso proscrito nos materiais analisados, com fulcro na Portaria nº 344/1998, atualizada por meio da RDC nº 970, de 19/03/2025, da Anvisa."
+    partes.append((texto_final_conclusao, CORPO, 12, None))
+
+    # 7 CUSTÓDIA DO MATERIAL
+    partes += BLOCOS_FIXOS['custodia']
+    texto_lacre_docx = f"7.1.1 A amostra contraprova ficará armazenada neste Instituto, conforme Portaria 0003/2019/SSP (Lacre nº {lacre_num})."
+    partes.append((texto_lacre_docx, CORPO, 12, None))
+    return partes
+
+
+def paragrafos_referencias(resumo):
+    """Título e lista de referências (as das substâncias encontradas ao final)."""
+    partes = [("REFERÊNCIAS", TITULO, None, None)]
+    referencias_base = [
+        "BRASIL. Ministério da Saúde. Portaria SVS/MS n° 344, de 12 de maio de 1998. Aprova o regulamento técnico sobre substâncias e medicamentos sujeitos a controle especial. Diário Oficial da União: Brasília, DF, p. 37, 19 maio 1998. Alterada pela RDC nº 970, de 19/03/2025.",
+        "GOIÁS. Secretaria de Estado da Segurança Pública. Portaria nº 0003/2019/SSP de 10 de janeiro de 2019. Regulamenta a apreensão, movimentação, exames, acondicionamento, armazenamento e destruição de drogas no âmbito da Secretaria de Estado da Segurança Pública. Diário Oficial do Estado de Goiás: n° 22.972, Goiânia, GO, p. 4-5, 15 jan. 2019.",
+        "SWGDRUG: Scientific Working Group for the Analysis of Seized Drugs. Recommendations. Version 8.0 june. 2019. Disponível em: http://www.swgdrug.org/Documents/SWGDRUG%20Recommendations%20Version%208_FINAL_ForPosting_092919.pdf. Acesso em: 07/10/2019."
+    ]
+    referencias_base += [substancia['referencia'] for substancia, _ in resumo.substancias()]
+    partes += _secao([(ref, 6) for ref in referencias_base])
+    return partes
+
+
+def paragrafos_encerramento(data=None):
+    """Encerramento, data e assinatura."""
+    return [
+        *BLOCOS_FIXOS['encerramento'],
+        (formatar_data_laudo(data), CORPO, 24, 'right'),
+        *BLOCOS_FIXOS['assinatura'],
+    ]
@@ -0,0 +1,485 @@
+"""Serviço HTTP local de geração de laudos, com fila limitada e pool de processos.
+
+Uso:
+    python -m laudo.servico --porta 8765 --processos 4 --fila 16
+
+A interface Streamlit usa o serviço quando ``LAUDO_SERVICO_URL`` está definida
+(ex.: ``http://127.0.0.1:8765``): envia o pedido, acompanha fila e progresso e baixa o
+.docx pronto, sem gerar o documento dentro da thread da sessão.
+
+Rotas:
+    POST /laudos              {"lacre_num", "itens", "data"?, "streaming"?,
+                               "imagens": [{"nome", "conteudo" (base64)}]}
+                              -> 202 {"id", "estado", "posicao"}; 400 com corpo ou Content-Length
+                                 inválidos; 422 com "erros" (``validar_pedido``);
+                                 413 com "erros" acima dos limites de ``laudo.admissao``;
+                                 503 + Retry-After quando a fila está cheia ou os processos
+                                 de geração estão sendo recriados
+    GET  /laudos/<id>         -> estado ("na_fila", "processando", "concluido", "erro"),
+                                 posicao na fila, progresso (0 a 1), etapa, avisos
+    GET  /laudos/<id>/docx    -> o .docx, lido do disco em blocos (409 enquanto não estiver
+                                 concluído); o arquivo é apagado assim que a resposta termina
+    GET  /metricas            -> métricas no formato texto do Prometheus
+    GET  /saude               -> ocupação da fila
+
+Os itens têm os mesmos campos consumidos por ``gerar_descricao_item_web``. Os processos
+gravam o resultado num arquivo temporário (``LAUDO_DIR_SPOOL``), então nenhum .docx
+passa inteiro pela memória do servidor.
+"""
+import argparse
+import base64
+import json
+import math
+import multiprocessing
+import os
+import re
+import signal
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from laudo.acervo import arquivar_emitido
+from laudo.cache_laudos import cache_laudos, chave_laudo
+from laudo.gerador import MIME_DOCX
+from laudo.admissao import PedidoRecusado, avaliar_pedido
+from laudo.imagens import LARGURA_MAXIMA_PX, MAX_THREADS, preparar_imagens, cache_imagens
+from laudo.metricas import MedicaoLaudo, REGISTRO
+from laudo.saida import DIR_SPOOL, LIMIAR_SPOOL, gerar_em_arquivo, copiar_em_blocos
+from laudo.textos import validar_entrada
+
+PROCESSOS = int(os.environ.get('LAUDO_SERVICO_PROCESSOS', min(4, os.cpu_count() or 1)))
+LIMITE_FILA = int(os.environ.get('LAUDO_SERVICO_FILA', '16')) # Pedidos aguardando, além dos em execução
+TAMANHO_MAXIMO_PEDIDO = int(float(os.environ.get('LAUDO_SERVICO_MAX_MB', '64')) * 1024 * 1024)
+RETENCAO_S = 15 * 60 # Tempo que um resultado fica disponível para download
+TEMPO_ESTIMADO_PADRAO_S = 2.0 # Estimativa por laudo antes de haver medições (Retry-After)
+ROTA_TRABALHO = re.compile(r'^/laudos/([0-9a-f]{32})(/docx)?$')
+
+_progresso = None # Fila de progresso herdada pelos processos filhos
+
+
+class FilaCheia(Exception):
+    """Pedido recusado por falta de vaga; ``retry_after`` sugere quando tentar de novo (s)."""
+
+    def __init__(self, retry_after, mensagem="Fila de geração cheia"):
+        super().__init__(f"{mensagem}; tente novamente em {retry_after}s.")
+        self.retry_after = retry_after
+
+
+# --- Execução nos processos filhos ---
+
+def _iniciar_processo(fila_progresso):
+    global _progresso
+    _progresso = fila_progresso
+
+
+def _informar(id_trabalho, progresso, etapa):
+    if _progresso is not None:
+        _progresso.put((id_trabalho, progresso, etapa))
+
+
+def _com_progresso(itens, id_trabalho, inicio=0.1, fim=0.9):
+    """Repassa os itens à geração informando o avanço a cada ~5%."""
+    passo = max(1, len(itens) // 20)
+    for i, item in enumerate(itens, start=1):
+        yield item
+        if i % passo == 0:
+            _informar(id_trabalho, inicio + (fim - inicio) * i / len(itens), 'itens')
+    _informar(id_trabalho, fim, 'salvando')
+
+
+def _remover(caminho):
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
+
+
+def executar_trabalho(id_trabalho, pedido):
+    """Gera o laudo de um pedido num arquivo temporário.
+
+    Devolve ``(caminho, tamanho, avisos, métricas)``; o arquivo passa a ser do servidor.
+    """
+    _informar(id_trabalho, 0.0, 'imagens')
+    lacre_num = pedido['lacre_num']
+    itens = pedido['itens']
+    data = datetime.strptime(pedido['data'], "%Y-%m-%d") if pedido.get('data') else None
+    avisos = []
+    admissao = pedido.get('admissao') or {}
+    with MedicaoLaudo('streaming' if pedido.get('streaming') else 'docx', registro=None) as medicao:
+        medicao.itens = len(itens)
+        medicao.memoria_estimada = admissao.get('estimativa_bytes')
+        with medicao.fase('imagens'):
+            imagens = preparar_imagens([(img['nome'], base64.b64decode(img['conteudo'])) for img in pedido.get('imagens') or []],
+                                       avisos=avisos, cache=cache_imagens(),
+                                       max_threads=admissao.get('max_threads', MAX_THREADS),
+                                       largura_maxima=admissao.get('largura_maxima', LARGURA_MAXIMA_PX))
+        if admissao.get('reduzida'):
+            avisos.append(f"Pedido grande: imagens reduzidas a {admissao['largura_maxima']} px de largura "
+                          "para caber no limite de memória.")
+        medicao.imagens = len(imagens)
+        medicao.bytes_imagens = sum(len(conteudo) for _, conteudo in imagens)
+        _informar(id_trabalho, 0.1, 'itens')
+        with medicao.fase('cache_laudos'):
+            chave = chave_laudo(lacre_num, itens, imagens, data=data, motor=medicao.motor)
+            conteudo = cache_laudos().obter(chave)
+        descritor, caminho = tempfile.mkstemp(suffix='.docx', dir=DIR_SPOOL)
+        try:
+            with os.fdopen(descritor, 'wb') as arquivo:
+                if conteudo is not None:
+                    arquivo.write(conteudo)
+                    tamanho = len(conteudo)
+                else:
+                    avisos_antes = len(avisos)
+                    tamanho = gerar_em_arquivo(arquivo, lacre_num, _com_progresso(itens, id_trabalho), imagens=imagens,
+                                               data=data, avisos=avisos, medicao=medicao, streaming=medicao.motor == 'streaming')
+            # Só laudos pequenos vão para o cache em memória; sem avisos da geração
+            if conteudo is None and len(avisos) == avisos_antes and tamanho <= LIMIAR_SPOOL:
+                with open(caminho, 'rb') as arquivo:
+                    cache_laudos().guardar(chave, arquivo.read())
+            if conteudo is None: # Do cache, o mesmo documento já foi arquivado
+                arquivar_emitido(lacre_num, itens, caminho, data=data, avisos=avisos, medicao=medicao)
+        except BaseException:
+            _remover(caminho)
+            raise
+        medicao.bytes_saida = tamanho
+    return caminho, tamanho, avisos, medicao.como_dict()
+
+
+# --- Fila no processo do servidor ---
+
+class FilaLaudos:
+    """Fila limitada de trabalhos de geração executados num pool de processos."""
+
+    def __init__(self, processos=PROCESSOS, limite_fila=LIMITE_FILA, retencao_s=RETENCAO_S):
+        self.processos = processos
+        self.limite_fila = limite_fila
+        self.retencao_s = retencao_s
+        self._trabalhos = {} # id -> dicionário de estado
+        self._sequencia = 0
+        self._lock = threading.Lock()
+        self._fila_progresso = multiprocessing.Queue()
+        self._executor = self._novo_executor()
+        self._ouvinte = threading.Thread(target=self._ouvir_progresso, daemon=True)
+        self._ouvinte.start()
+
+    def _novo_executor(self):
+        return ProcessPoolExecutor(max_workers=self.processos, initializer=_iniciar_processo,
+                                   initargs=(self._fila_progresso,))
+
+    def _recriar_executor(self, quebrado):
+        """Troca um pool quebrado (processo filho morto: falta de memória, ``os._exit``...) por um novo.
+
+        Chamado tanto por ``submeter`` quanto pelo retorno dos trabalhos; só o primeiro troca.
+        """
+        with self._lock:
+            if self._executor is not quebrado:
+                return
+            self._executor = self._novo_executor()
+        quebrado.shutdown(wait=False, cancel_futures=True)
+
+    def _ouvir_progresso(self):
+        while True:
+            mensagem = self._fila_progresso.get()
+            if mensagem is None:
+                return
+            id_trabalho, progresso, etapa = mensagem
+            with self._lock:
+                trabalho = self._trabalhos.get(id_trabalho)
+                if trabalho is not None and trabalho['estado'] in ('na_fila', 'processando'):
+                    trabalho.update(estado='processando', progresso=progresso, etapa=etapa)
+
+    def _pendentes(self):
+        return [t for t in self._trabalhos.values() if t['estado'] in ('na_fila', 'processando')]
+
+    def _descartar_expirados(self):
+        limite = time.monotonic() - self.retencao_s
+        for id_trabalho in [i for i, t in self._trabalhos.items() if t['fim'] and t['fim'] < limite]:
+            trabalho = self._trabalhos.pop(id_trabalho)
+            if trabalho['arquivo']:
+                _remover(trabalho['arquivo'])
+
+    def _espera_estimada(self, aguardando):
+        """Segundos até abrir uma vaga, pela mediana recente do tempo total por laudo."""
+        por_laudo = REGISTRO.resumo().get('total', {}).get('p50') or TEMPO_ESTIMADO_PADRAO_S
+        return max(1, math.ceil(por_laudo * (aguardando + 1) / self.processos))
+
+    def submeter(self, pedido):
+        """Enfileira o pedido e devolve o estado inicial.
+
+        Levanta ``FilaCheia`` se não houver vaga ou se o pool de processos estava quebrado
+        (ele é recriado e o pedido pode ser reenviado).
+        """
+        with self._lock:
+            self._descartar_expirados()
+            pendentes = len(self._pendentes())
+            if pendentes >= self.processos + self.limite_fila:
+                raise FilaCheia(self._espera_estimada(pendentes - self.processos))
+            id_trabalho = uuid.uuid4().hex
+            self._sequencia += 1
+            self._trabalhos[id_trabalho] = {
+                'id': id_trabalho, 'sequencia': self._sequencia, 'estado': 'na_fila', 'progresso': 0.0,
+                'etapa': None, 'itens': len(pedido['itens']), 'avisos': [], 'erro': None,
+                'arquivo': None, 'bytes': None, 'fim': None,
+            }
+            executor = self._executor
+        try:
+            futuro = executor.submit(executar_trabalho, id_trabalho, pedido)
+        except BrokenProcessPool:
+            # Pool quebrado: o pedido não entrou, então não ocupa vaga
+            with self._lock:
+                self._trabalhos.pop(id_trabalho, None)
+            self._recriar_executor(executor)
+            raise FilaCheia(1, "Processos de geração reiniciados") from None
+        futuro.add_done_callback(lambda f, id_trabalho=id_trabalho: self._concluir(id_trabalho, f, executor))
+        return self.estado(id_trabalho)
+
+    def _concluir(self, id_trabalho, futuro, executor=None):
+        try:
+            caminho, tamanho, avisos, metricas = futuro.result()
+            REGISTRO.registrar(metricas)
+            atualizacao = {'estado': 'concluido', 'progresso': 1.0, 'etapa': None, 'avisos': avisos,
+                           'arquivo': caminho, 'bytes': tamanho}
+        except BrokenProcessPool:
+            # Um processo filho morreu: todos os trabalhos do pool terminam aqui, e o pool é trocado
+            atualizacao = {'estado': 'erro', 'erro': "O processo de geração foi encerrado inesperadamente."}
+            if executor is not None:
+                self._recriar_executor(executor)
+        except Exception as e:
+            traceback.print_exc()
+            atualizacao = {'estado': 'erro', 'erro': f"{type(e).__name__}: {e}"}
+        with self._lock:
+            trabalho = self._trabalhos.get(id_trabalho)
+            if trabalho is not None:
+                trabalho.update(atualizacao, fim=time.monotonic())
+            elif atualizacao.get('arquivo'):
+                _remover(atualizacao['arquivo'])
+
+    def estado(self, id_trabalho):
+        """Estado público do trabalho (sem o conteúdo), ou ``None`` se não existir."""
+        with self._lock:
+            trabalho = self._trabalhos.get(id_trabalho)
+            if trabalho is None:
+                return None
+            posicao = None
+            if trabalho['estado'] == 'na_fila':
+                posicao = 1 + sum(1 for t in self._trabalhos.values()
+                                  if t['estado'] == 'na_fila' and t['sequencia'] < trabalho['sequencia'])
+            publico = {chave: valor for chave, valor in trabalho.items() if chave not in ('arquivo', 'fim', 'sequencia')}
+            publico['posicao'] = posicao
+            return publico
+
+    def resultado(self, id_trabalho):
+        """Caminho do .docx de um trabalho concluído (``None`` se ainda não houver)."""
+        with self._lock:
+            trabalho = self._trabalhos.get(id_trabalho)
+            return trabalho['arquivo'] if trabalho is not None else None
+
+    def liberar(self, id_trabalho):
+        """Apaga o arquivo de um trabalho já entregue; o estado passa a ``entregue``."""
+        with self._lock:
+            trabalho = self._trabalhos.get(id_trabalho)
+            if trabalho is None or not trabalho['arquivo']:
+                return
+            _remover(trabalho['arquivo'])
+            trabalho.update(estado='entregue', arquivo=None)
+
+    def ocupacao(self):
+        with self._lock:
+            pendentes = self._pendentes()
+            processando = sum(1 for t in pendentes if t['estado'] == 'processando')
+            return {'processos': self.processos, 'limite_fila': self.limite_fila,
+                    'processando': processando, 'na_fila': len(pendentes) - processando}
+
+    def encerrar(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._fila_progresso.put(None)
+        self._ouvinte.join(timeout=5)
+        with self._lock:
+            for trabalho in self._trabalhos.values():
+                if trabalho['arquivo']:
+                    _remover(trabalho['arquivo'])
+
+
+# --- HTTP ---
+
+def validar_pedido(pedido):
+    """Erros de conteúdo do pedido (respondidos com 422), conferidos antes de entrar na fila.
+
+    Além de ``validar_entrada`` (lacre, referências e códigos de material e embalagem),
+    confere a forma de ``itens``, ``imagens`` e ``data``, para que nenhum pedido aceito
+    falhe no processo filho por um campo ausente ou mal formado.
+    """
+    if not isinstance(pedido, dict):
+        return ["O pedido deve ser um objeto JSON."]
+    itens = pedido.get('itens') or []
+    if not isinstance(itens, list) or not all(isinstance(item, dict) for item in itens):
+        return ["'itens' deve ser uma lista de objetos."]
+    erros = validar_entrada(pedido.get('lacre_num'), itens)
+    if pedido.get('data'):
+        try:
+            datetime.strptime(pedido['data'], "%Y-%m-%d")
+        except (TypeError, ValueError):
+            erros.append("'data' deve estar no formato AAAA-MM-DD.")
+    imagens = pedido.get('imagens') or []
+    if not isinstance(imagens, list) or not all(isinstance(img, dict) and isinstance(img.get('nome'), str)
+                                                and isinstance(img.get('conteudo'), str) for img in imagens):
+        erros.append("'imagens' deve ser uma lista de objetos com 'nome' e 'conteudo' (base64).")
+    return erros
+
+
+class _Manipulador(BaseHTTPRequestHandler):
+    server_version = "LaudoServico/1.0"
+
+    def _responder(self, status, corpo, tipo='application/json; charset=utf-8', cabecalhos=()):
+        if not isinstance(corpo, bytes):
+            corpo = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(corpo)))
+        for nome, valor in cabecalhos:
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_POST(self):
+        if self.path != '/laudos':
+            return self._responder(404, {'erro': "Rota inexistente."})
+        try:
+            tamanho = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            return self._responder(400, {'erro': "Content-Length inválido."})
+        if tamanho > TAMANHO_MAXIMO_PEDIDO:
+            return self._responder(413, {'erro': f"Pedido acima de {TAMANHO_MAXIMO_PEDIDO // (1024 * 1024)} MB."})
+        if tamanho < 0:
+            return self._responder(400, {'erro': "Content-Length inválido."})
+        try:
+            pedido = json.loads(self.rfile.read(tamanho))
+            erros = validar_pedido(pedido)
+            if not erros: # Imagens decodificadas uma a uma, só para ler os cabeçalhos
+                admissao = avaliar_pedido(((img['nome'], base64.b64decode(img['conteudo']))
+                                           for img in pedido.get('imagens') or []),
+                                          len(pedido['itens']), streaming=bool(pedido.get('streaming')))
+        except PedidoRecusado as e:
+            return self._responder(413, {'erros': [str(e)]})
+        except (ValueError, AttributeError, TypeError, KeyError) as e:
+            return self._responder(400, {'erro': f"JSON inválido: {e}"})
+        if erros:
+            return self._responder(422, {'erros': erros})
+        pedido['admissao'] = admissao
+        try:
+            estado = self.server.fila.submeter(pedido)
+        except FilaCheia as e:
+            return self._responder(503, {'erro': str(e)}, cabecalhos=[('Retry-After', str(e.retry_after))])
+        self._responder(202, estado, cabecalhos=[('Location', f"/laudos/{estado['id']}")])
+
+    def do_GET(self):
+        if self.path == '/metricas':
+            return self._responder(200, REGISTRO.texto_prometheus().encode('utf-8'), tipo='text/plain; version=0.0.4')
+        if self.path == '/saude':
+            return self._responder(200, self.server.fila.ocupacao())
+        rota = ROTA_TRABALHO.match(self.path)
+        estado = self.server.fila.estado(rota.group(1)) if rota else None
+        if estado is None:
+            return self._responder(404, {'erro': "Trabalho inexistente ou expirado."})
+        if not rota.group(2):
+            return self._responder(200, estado)
+        caminho = self.server.fila.resultado(rota.group(1))
+        if caminho is None:
+            return self._responder(410 if estado['estado'] == 'entregue' else 409, estado)
+        with open(caminho, 'rb') as arquivo:
+            self.send_response(200)
+            self.send_header('Content-Type', MIME_DOCX)
+            self.send_header('Content-Length', str(estado['bytes']))
+            self.send_header('Content-Disposition', 'attachment; filename="laudo_pericial_v2.docx"')
+            self.end_headers()
+            copiar_em_blocos(arquivo, self.wfile)
+        self.server.fila.liberar(rota.group(1)) # Entregue por completo: libera o disco
+
+    def log_message(self, formato, *args):
+        pass # As métricas já registram cada laudo; evita uma linha por consulta de progresso
+
+
+def criar_servidor(host='127.0.0.1', porta=8765, processos=PROCESSOS, limite_fila=LIMITE_FILA):
+    """Servidor HTTP pronto para ``serve_forever()``; a fila fica em ``servidor.fila``."""
+    servidor = ThreadingHTTPServer((host, porta), _Manipulador)
+    servidor.daemon_threads = True
+    servidor.fila = FilaLaudos(processos=processos, limite_fila=limite_fila)
+    return servidor
+
+
+# --- Cliente (usado pela interface) ---
+
+def _requisitar(url, dados=None):
+    requisicao = urllib.request.Request(url, data=dados, headers={'Content-Type': 'application/json'} if dados else {})
+    with urllib.request.urlopen(requisicao, timeout=30) as resposta:
+        return resposta.read()
+
+
+def enviar_pedido(url_base, lacre_num, itens_data, imagens=(), data=None, streaming=False):
+    """Envia um pedido ao serviço; ``imagens`` são pares ``(nome, bytes)``.
+
+    Devolve o estado inicial do trabalho. Levanta ``FilaCheia`` (503) ou ``ValueError``
+    com a mensagem do serviço para pedidos recusados.
+    """
+    pedido = {
+        'lacre_num': lacre_num,
+        'itens': itens_data,
+        'data': data.strftime("%Y-%m-%d") if data else None,
+        'streaming': streaming,
+        'imagens': [{'nome': nome, 'conteudo': base64.b64encode(conteudo).decode('ascii')} for nome, conteudo in imagens],
+    }
+    try:
+        return json.loads(_requisitar(f"{url_base}/laudos", json.dumps(pedido).encode('utf-8')))
+    except urllib.error.HTTPError as e:
+        corpo = json.loads(e.read() or b'{}')
+        if e.code == 503:
+            raise FilaCheia(int(e.headers.get('Retry-After') or 1)) from None
+        raise ValueError(" ".join(corpo.get('erros') or [corpo.get('erro') or str(e)])) from None
+
+
+def consultar_trabalho(url_base, id_trabalho):
+    """Estado atual do trabalho (fila, progresso, avisos)."""
+    return json.loads(_requisitar(f"{url_base}/laudos/{id_trabalho}"))
+
+
+def baixar_laudo(url_base, id_trabalho):
+    """Conteúdo do .docx de um trabalho concluído (o serviço o descarta após a entrega)."""
+    return _requisitar(f"{url_base}/laudos/{id_trabalho}/docx")
+
+
+def _interromper(*_):
+    raise KeyboardInterrupt
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço HTTP local de geração de laudos.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('-j', '--processos', type=int, default=PROCESSOS, help="Processos de geração")
+    parser.add_argument('--fila', type=int, default=LIMITE_FILA, help="Pedidos aguardando além dos em execução")
+    args = parser.parse_args(argv)
+
+    servidor = criar_servidor(args.host, args.porta, args.processos, args.fila)
+    print(f"Serviço de laudos em http://{args.host}:{args.porta} ({args.processos} processos, fila {args.fila}).")
+    signal.signal(signal.SIGTERM, _interromper) # SIGTERM encerra como Ctrl+C: processos e temporários liberados
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servidor.fila.encerrar()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
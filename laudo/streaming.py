@@ -0,0 +1,129 @@
+"""Motor de saída em streaming: escreve o .docx direto no zip, parágrafo a parágrafo.
+
+Alternativa a ``gerador.gerar_laudo_docx`` para laudos muito grandes: não monta a árvore
+do python-docx. O ``word/document.xml`` é escrito em fluxo dentro do zip à medida que
+``gerar_paragrafos`` produz o XML, então a memória fica estável qualquer que seja o
+número de itens. O conteúdo (parágrafos, estilos e ilustrações) é o mesmo do motor
+python-docx, pois ambos usam o mesmo modelo base e o mesmo gerador de parágrafos, e o
+zip segue a mesma política de ``laudo.pacote``.
+"""
+import hashlib
+import io
+import zipfile
+from functools import lru_cache
+
+from docx.image.image import Image
+from docx.shared import Inches
+
+from laudo.gerador import gerar_paragrafos, _fonte_imagem
+from laudo.imagens import LARGURA_IMAGEM_POL, ler_bytes
+from laudo.metricas import fase
+from laudo.modelo import documento_base_bytes, paragrafo_imagem_xml
+from laudo.pacote import escrever_partes
+from laudo.textos import _registrar_aviso
+
+DOCUMENTO = 'word/document.xml'
+RELACIONAMENTOS = 'word/_rels/document.xml.rels'
+TIPOS_CONTEUDO = '[Content_Types].xml'
+REL_IMAGEM = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/image'
+TAMANHO_BLOCO = 64 * 1024 # Bytes acumulados antes de cada escrita no zip
+
+
+@lru_cache(maxsize=1)
+def _pacote_base():
+    """Partes do modelo base, com o document.xml dividido em torno do corpo."""
+    with zipfile.ZipFile(io.BytesIO(documento_base_bytes())) as zf:
+        partes = {info.filename: zf.read(info) for info in zf.infolist()}
+    documento = partes.pop(DOCUMENTO).decode('utf-8')
+    inicio_corpo = documento.index('<w:body>') + len('<w:body>')
+    inicio_sect = documento.index('<w:sectPr', inicio_corpo)
+    cabecalho = documento[:inicio_corpo].encode('utf-8')
+    rodape = documento[inicio_sect:].encode('utf-8')
+    return partes, cabecalho, rodape
+
+
+def _preparar_imagens(imagens, avisos):
+    """Lê as ilustrações e define nome no pacote, relacionamento e dimensões de cada uma.
+
+    Imagens idênticas compartilham a mesma parte de mídia, como no python-docx.
+    """
+    midias = {} # sha1 -> (caminho no pacote, r_id)
+    arquivos = [] # (caminho no pacote, bytes)
+    paragrafos = []
+    for nome, fonte in imagens:
+        try:
+            conteudo = ler_bytes(_fonte_imagem(fonte))
+            imagem = Image.from_blob(conteudo)
+            cx, cy = imagem.scaled_dimensions(Inches(LARGURA_IMAGEM_POL), None)
+        except Exception as e:
+            _registrar_aviso(avisos, f"Erro ao inserir imagem '{nome}': {e}")
+            continue
+        sha1 = hashlib.sha1(conteudo).hexdigest()
+        if sha1 not in midias:
+            numero = len(midias) + 1
+            midias[sha1] = (f'word/media/image{numero}.{imagem.ext}', f'rIdImg{numero}')
+            arquivos.append((midias[sha1][0], conteudo, imagem.content_type))
+        caminho, r_id = midias[sha1]
+        paragrafos.append(paragrafo_imagem_xml(r_id, len(paragrafos) + 1, f'image.{imagem.ext}', cx, cy))
+    return arquivos, paragrafos
+
+
+def _tipos_conteudo(base, arquivos):
+    """[Content_Types].xml com os tipos das mídias acrescentados (por extensão)."""
+    xml = base.decode('utf-8')
+    for caminho, _, tipo in arquivos:
+        extensao = caminho.rsplit('.', 1)[1]
+        if f'Extension="{extensao}"' not in xml:
+            xml = xml.replace('</Types>', f'<Default Extension="{extensao}" ContentType="{tipo}"/></Types>')
+    return xml.encode('utf-8')
+
+
+def _relacionamentos(base, arquivos):
+    """document.xml.rels com um relacionamento por mídia."""
+    xml = base.decode('utf-8')
+    novos = "".join(
+        f'<Relationship Id="rIdImg{numero}" Type="{REL_IMAGEM}" Target="{caminho[len("word/"):]}"/>'
+        for numero, (caminho, _, _) in enumerate(arquivos, start=1)
+    )
+    return xml.replace('</Relationships>', novos + '</Relationships>').encode('utf-8')
+
+
+def escrever_laudo_docx(destino, lacre_num, itens_data, imagens=(), data=None, avisos=None, medicao=None):
+    """Escreve o laudo em ``destino`` (caminho ou arquivo binário aberto) em streaming.
+
+    Mesmos parâmetros de ``gerador.gerar_laudo_docx``; ``itens_data`` pode ser um gerador.
+    """
+    with fase(medicao, 'modelo'):
+        partes, cabecalho, rodape = _pacote_base()
+    with fase(medicao, 'imagens_docx'):
+        arquivos, paragrafos_imagens = _preparar_imagens(imagens, avisos)
+    conteudos = {caminho: conteudo for caminho, conteudo, _ in arquivos}
+    for nome, conteudo in partes.items():
+        if nome == TIPOS_CONTEUDO:
+            conteudo = _tipos_conteudo(conteudo, arquivos)
+        elif nome == RELACIONAMENTOS:
+            conteudo = _relacionamentos(conteudo, arquivos)
+        conteudos[nome] = conteudo
+
+    def escrever_documento(saida):
+        saida.write(cabecalho)
+        bloco, tamanho = [], 0
+        for xml in gerar_paragrafos(lacre_num, itens_data, paragrafos_imagens, data=data, avisos=avisos, medicao=medicao):
+            bloco.append(xml)
+            tamanho += len(xml)
+            if tamanho >= TAMANHO_BLOCO:
+                with fase(medicao, 'salvar'):
+                    saida.write("".join(bloco).encode('utf-8'))
+                bloco, tamanho = [], 0
+        with fase(medicao, 'salvar'):
+            saida.write("".join(bloco).encode('utf-8'))
+            saida.write(rodape)
+
+    escrever_partes(destino, conteudos, em_fluxo=(DOCUMENTO, escrever_documento))
+
+
+def gerar_laudo_docx_streaming(lacre_num, itens_data, imagens=(), data=None, avisos=None, medicao=None):
+    """Versão em streaming de ``gerar_laudo_docx``: devolve o .docx em bytes."""
+    bio = io.BytesIO()
+    escrever_laudo_docx(bio, lacre_num, itens_data, imagens=imagens, data=data, avisos=avisos, medicao=medicao)
+    return bio.getvalue()
@@ -0,0 +1,53 @@
+"""Registro das substâncias pesquisadas: materiais, exames, resultados, conclusão e referência.
+
+As seções 4 a 6 e as referências do laudo são montadas a partir deste registro, na
+ordem em que as substâncias aparecem aqui. Para incluir uma substância nova, basta
+acrescentar uma entrada (e os códigos de material correspondentes em
+``textos.TIPOS_MATERIAL_BASE``); a numeração (4.x, 5.x) e os textos de ligação são
+gerados automaticamente.
+"""
+import re
+
+SUBSTANCIAS = (
+    {
+        'nome': 'cannabis',
+        'materiais': ('v', 'r'),
+        'exames_titulo': "Exames realizados para pesquisa de Cannabis Sativa L. (maconha)",
+        'exames': (
+            "Ensaio químico com Fast blue salt B: teste de cor em reação com solução aquosa de sal de azul sólido B em meio alcalino;",
+            "Cromatografia em Camada Delgada (CCD), comparativa com substância padrão, em sistemas contendo eluentes apropriados e posterior revelação com solução aquosa de azul sólido B.",
+        ),
+        'resultados': (
+            "No ensaio com Fast blue salt B, foram obtidas coloração característica para canabinol e tetrahidrocanabinol (princípios ativos da Cannabis sativa L.).",
+            "Na CCD, obtiveram-se perfis cromatográficos coincidentes com o material de referência (padrão de Cannabis sativa L.); portanto, a substância tetrahidrocanabinol está presente nos materiais questionados.",
+        ),
+        'conclusao': "foi detectada a presença de partes da planta Cannabis sativa L., vulgarmente conhecida por maconha. A Cannabis sativa L. contém princípios ativos chamados canabinóis, dentre os quais se encontra o tetrahidrocanabinol, substância perturbadora do sistema nervoso central. Tanto a Cannabis sativa L. quanto a tetrahidrocanabinol são proscritas no país, com fulcro na Portaria nº 344/1998, atualizada por meio da RDC nº 970, de 19/03/2025, da Anvisa.",
+        'referencia': "UNODC (United Nations Office on Drugs and Crime). Laboratory and scientific section. Recommended Methods for the Identification and Analysis of Cannabis and Cannabis Products. New York: 2012.",
+    },
+    {
+        'nome': 'cocaina',
+        'materiais': ('po', 'pd'),
+        'exames_titulo': "Exames realizados para pesquisa de cocaína",
+        'exames': (
+            "Ensaio químico com teste de tiocianato de cobalto-reação de cor com solução de tiocianato de cobalto em meio ácido;",
+            "Cromatografia em Camada Delgada (CCD), comparativa com substância padrão, em sistemas com eluentes apropriados e revelação com solução de iodo platinado.",
+        ),
+        'resultados': (
+            "No teste de tiocianato de cobalto, foram obtidas coloração característica para cocaína;",
+            "Na CCD, obteve-se perfis cromatográficos coincidentes com o material de referência (padrão de cocaína); portanto, a substância cocaína está presente nos materiais questionados.",
+        ),
+        'conclusao': "foi detectada a presença de cocaína, substância alcaloide estimulante do sistema nervoso central. A cocaína é proscrita no país, com fulcro na Portaria nº 344/1998, atualizada por meio da RDC nº 970, de 19/03/2025, da Anvisa.",
+        'referencia': "UNODC (United Nations Office on Drugs and Crime). Laboratory and Scientific Section. Recommended Methods for the Identification and Analysis of Cocaine in Seized Materials. New York: 2012.",
+    },
+)
+
+# Código do material -> posição da substância no registro (consulta O(1) por item)
+SUBSTANCIA_POR_MATERIAL = {material: indice for indice, substancia in enumerate(SUBSTANCIAS)
+                           for material in substancia['materiais']}
+
+_RE_NUMEROS = re.compile(r'(\d+)')
+
+
+def chave_natural(referencia):
+    """Chave de ordenação natural: '2.1.2' vem antes de '2.1.10'."""
+    return tuple(int(parte) if parte.isdigit() else parte.lower() for parte in _RE_NUMEROS.split(referencia))
@@ -0,0 +1,113 @@
+"""Entrada de itens em lote: grade editável (st.data_editor) ou CSV/TSV colado.
+
+A validação é feita por coluna (pandas), em uma passada, e produz os mesmos registros
+``itens_data`` do formulário item a item.
+"""
+import csv
+import io
+
+import pandas as pd
+
+from laudo.textos import CAMPOS_ITEM, TIPOS_MATERIAL_BASE, TIPOS_EMBALAGEM_BASE
+
+COLUNAS = list(CAMPOS_ITEM) # Colunas da grade, na ordem dos campos do item
+EMBALAGENS_COM_COR = ['pl', 'pa']
+PADRAO_REFERENCIA = r'\d+(?:\.\d+)*[A-Za-z]?' # Ex.: 2.1.1, 2.1.10, 3.2a
+
+
+def tabela_vazia(linhas=1):
+    """DataFrame inicial da grade, com os valores padrão do formulário."""
+    return pd.DataFrame({
+        'quantidade': [1] * linhas,
+        'tipo_material': ['v'] * linhas,
+        'tipo_embalagem_base': ['e'] * linhas,
+        'cor_embalagem': [None] * linhas,
+        'referencia_subitem': [''] * linhas,
+        'pessoa_relacionada': [''] * linhas,
+    }, columns=COLUNAS)
+
+
+def tabela_de_itens(itens):
+    """DataFrame da grade preenchido com itens prontos (ex.: importados da constatação)."""
+    return pd.DataFrame(itens, columns=COLUNAS)
+
+
+def ler_tabela_colada(texto):
+    """Converte texto colado (planilha/TSV, CSV com ',' ou ';') em DataFrame.
+
+    A primeira linha é tratada como cabeçalho se contiver os nomes das colunas;
+    senão as colunas são lidas na ordem de ``COLUNAS``.
+    """
+    texto = texto.strip('\n')
+    if not texto.strip():
+        return tabela_vazia(0)
+    primeira = texto.split('\n', 1)[0]
+    if '\t' in primeira:
+        separador = '\t'
+    else:
+        try:
+            separador = csv.Sniffer().sniff(primeira, delimiters=',;').delimiter
+        except csv.Error:
+            separador = ','
+    tem_cabecalho = any(campo.strip().lower() in COLUNAS for campo in primeira.split(separador))
+    df = pd.read_csv(io.StringIO(texto), sep=separador, header=0 if tem_cabecalho else None,
+                     dtype=str, keep_default_na=False, skipinitialspace=True)
+    if tem_cabecalho:
+        df.columns = [str(c).strip().lower() for c in df.columns]
+    else:
+        df = df.iloc[:, :len(COLUNAS)]
+        df.columns = COLUNAS[:df.shape[1]]
+    return df.reindex(columns=COLUNAS)
+
+
+def validar_tabela(df):
+    """Valida a tabela de itens e devolve ``(itens_data, erros)``.
+
+    Linhas totalmente vazias são ignoradas. Os erros citam o número da linha (1 = primeiro item).
+    """
+    df = df.reindex(columns=COLUNAS).reset_index(drop=True)
+    texto = df.astype(object).where(df.notna(), '').astype(str).apply(lambda coluna: coluna.str.strip())
+    vazias = (texto == '').all(axis=1)
+    texto = texto[~vazias].reset_index(drop=True)
+    linhas = pd.Series(range(1, len(texto) + 1))
+
+    material = texto['tipo_material'].str.lower()
+    embalagem = texto['tipo_embalagem_base'].str.lower()
+    cor = texto['cor_embalagem'].str.lower()
+    quantidade = pd.to_numeric(texto['quantidade'], errors='coerce')
+
+    verificacoes = [
+        (quantidade.isna() | (quantidade < 1) | (quantidade % 1 != 0),
+         "quantidade deve ser um inteiro maior ou igual a 1"),
+        (~material.isin(list(TIPOS_MATERIAL_BASE)),
+         f"tipo de material inválido (use {', '.join(TIPOS_MATERIAL_BASE)})"),
+        (~embalagem.isin(list(TIPOS_EMBALAGEM_BASE)),
+         f"tipo de embalagem inválido (use {', '.join(TIPOS_EMBALAGEM_BASE)})"),
+        (texto['referencia_subitem'] == '',
+         "informe a referência do subitem"),
+        ((texto['referencia_subitem'] != '') & ~texto['referencia_subitem'].str.fullmatch(PADRAO_REFERENCIA),
+         "referência do subitem deve ter o formato 2.1.1"),
+    ]
+    problemas = []
+    for mascara, mensagem in verificacoes:
+        problemas += [(linha, mensagem) for linha in linhas[mascara.to_numpy()]]
+    if problemas:
+        problemas.sort(key=lambda problema: problema[0]) # Ordem das linhas, estável por verificação
+        return [], [f"Linha {linha}: {mensagem}." for linha, mensagem in problemas]
+
+    # Cor só vale para plástico/papel (como no formulário)
+    cor = cor.where(embalagem.isin(EMBALAGENS_COM_COR) & (cor != ''), None)
+    pessoa = texto['pessoa_relacionada']
+    itens_data = pd.DataFrame({
+        'quantidade': quantidade.astype(int),
+        'tipo_material': material,
+        'tipo_embalagem_base': embalagem,
+        'cor_embalagem': cor,
+        'referencia_subitem': texto['referencia_subitem'],
+        'pessoa_relacionada': pessoa,
+        'is_last': linhas == len(texto),
+    }).to_dict('records')
+    for item in itens_data: # Tipos nativos (numpy -> int/bool) para hashing e JSON
+        item['quantidade'] = int(item['quantidade'])
+        item['is_last'] = bool(item['is_last'])
+    return itens_data, []
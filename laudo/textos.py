@@ -0,0 +1,292 @@
+"""Textos do laudo: constantes e descrições dos itens, sem dependência de Streamlit ou python-docx."""
+import logging
+import re
+from datetime import datetime
+from functools import lru_cache
+
+logger = logging.getLogger('laudo.textos')
+
+# --- 1. Constantes (Com suas últimas modificações) ---
+TIPOS_MATERIAL_BASE = {
+    "v": "vegetal dessecado",
+    "po": "pulverizado",
+    "pd": "petrificado",
+    "r": "resinoso"
+}
+TONALIDADES_ESPECIAIS = { # Não usado atualmente, mas mantido
+    "b": ("branco", "esbranquiçada"),
+    "a": ("amarelo", "amarelada")
+}
+TONALIDADES_GENERICAS = { # Usando suas abreviações
+    "b": "esbranquiçada", "a": "amarelada", "vd": "esverdeada",
+    "vr": "avermelhada", "az": "azulada", "p": "enegrecida",
+    "c": "acinzentada", "m": "amarronzada", "r": "arrosada",
+    "l": "alaranjada", "violeta": "arroxeadada"
+}
+TIPOS_EMBALAGEM_BASE = {
+    "e": "microtubo do tipo “eppendorf”",
+    "z": "embalagem do tipo \"zip\"",
+    "a": "papel alumínio",
+    "pl": "plástico",
+    "pa": "papel"
+}
+CORES_FEMININO_EMBALAGEM = { # Inclui abreviações e nomes
+    "t": "transparente",
+    "branco": "branca", "branca": "branca", "b": "branca",
+    "azul": "azul", "az": "azul",
+    "amarelo": "amarela", "amarela": "amarela", "am": "amarela",
+    "vermelho": "vermelha", "vermelha": "vermelha", "vm": "vermelha",
+    "verde": "verde", "vd": "verde",
+    "preto": "preta", "preta": "preta", "p": "preta", # Adicionado 'p'
+    "cinza": "cinza", "c": "cinza",
+    "marrom": "marrom", "m": "marrom",
+    "rosa": "rosa", "r": "rosa",
+    "laranja": "laranja", "l": "laranja",
+    "violeta": "violeta",
+    "roxa" : "roxa"
+}
+QUANTIDADES_EXTENSO = { # Mantido por compatibilidade; o extenso vem de numero_por_extenso()
+    1: "uma", 2: "duas", 3: "três", 4: "quatro", 5: "cinco",
+    6: "seis", 7: "sete", 8: "oito", 9: "nove", 10: "dez",
+    11: "onze", 12: "doze", 13: "treze", 14: "quatorze", 15: "quinze",
+    16: "dezesseis", 17: "dezessete", 18: "dezoito", 19: "dezenove", 20: "vinte"
+}
+meses_portugues = {
+    "January": "janeiro", "February": "fevereiro", "March": "março",
+    "April": "abril", "May": "maio", "June": "junho", "July": "julho",
+    "August": "agosto", "September": "setembro", "October": "outubro",
+    "November": "novembro", "December": "dezembro"
+}
+# Nomes dos meses por número (strftime('%B') depende do locale do processo)
+MESES_POR_NUMERO = {
+    1: "janeiro", 2: "fevereiro", 3: "março", 4: "abril", 5: "maio", 6: "junho",
+    7: "julho", 8: "agosto", 9: "setembro", 10: "outubro", 11: "novembro", 12: "dezembro"
+}
+
+# Campos de cada item (formulário, tabela, lote); ``is_last`` é derivado da posição
+CAMPOS_ITEM = ('quantidade', 'tipo_material', 'tipo_embalagem_base', 'cor_embalagem',
+               'referencia_subitem', 'pessoa_relacionada')
+
+# --- 2. Funções Auxiliares ---
+
+def _registrar_aviso(avisos, mensagem):
+    """Guarda o aviso para a interface (se houver lista) e registra no log."""
+    if avisos is not None:
+        avisos.append(mensagem)
+    logger.warning(mensagem)
+
+
+@lru_cache(maxsize=1024)
+def _plural(palavra):
+    """Regras de plural (memoizadas; o vocabulário de embalagens é pequeno)."""
+    if palavra == "microtubo do tipo “eppendorf”": return palavra
+    if palavra == "embalagem do tipo \"zip\"": return palavra
+    if palavra == "microtubo do tipo “eppendorf”s": return "microtubo do tipo “eppendorf”"
+    if palavra.endswith('m'): return palavra[:-1] + 'ns'
+    if palavra.endswith(('ão', 'ões')): return palavra # 'õe' é menos comum, talvez 'ões' cubra
+    if palavra.endswith(('al', 'el', 'ol', 'ul')): return palavra[:-1] + 'is' # Regra do L -> is
+    if palavra.endswith(('r', 'z', 's')): return palavra + 'es' # Regra R/Z/S -> es (cuidado com 's' já plural)
+    # Simplificação: Adiciona 's' para a maioria das vogais e consoantes não cobertas acima
+    # (Pode precisar de mais regras para casos específicos)
+    return palavra + 's'
+
+def pluralizar_palavra(palavra, quantidade):
+    """Pluraliza uma palavra em português."""
+    if quantidade == 1 or not isinstance(palavra, str):
+        return palavra # Retorna original se qtd=1 ou tipo inválido
+    return _plural(palavra)
+
+# --- Números por extenso (cardinais, com gênero) ---
+_UNIDADES = ("zero", "um", "dois", "três", "quatro", "cinco", "seis", "sete", "oito", "nove",
+             "dez", "onze", "doze", "treze", "quatorze", "quinze", "dezesseis", "dezessete", "dezoito", "dezenove")
+_DEZENAS = ("", "", "vinte", "trinta", "quarenta", "cinquenta", "sessenta", "setenta", "oitenta", "noventa")
+_CENTENAS = ("", "cento", "duzentos", "trezentos", "quatrocentos", "quinhentos",
+             "seiscentos", "setecentos", "oitocentos", "novecentos")
+# Escalas acima de mil (masculinas: "dois milhões" mesmo para substantivo feminino)
+_ESCALAS = (("milhão", "milhões"), ("bilhão", "bilhões"), ("trilhão", "trilhões"), ("quatrilhão", "quatrilhões"))
+
+
+def _feminino(palavra):
+    """Flexiona uma palavra do número no feminino (uma, duas, duzentas...)."""
+    if palavra == "um": return "uma"
+    if palavra == "dois": return "duas"
+    if palavra.endswith("entos"): return palavra[:-2] + "as"
+    return palavra
+
+
+def _grupo_extenso(n, feminino):
+    """Extenso de 1 a 999."""
+    if n == 100:
+        return "cem"
+    partes = []
+    centena, resto = divmod(n, 100)
+    if centena:
+        partes.append(_CENTENAS[centena])
+    if resto >= 20:
+        dezena, unidade = divmod(resto, 10)
+        partes.append(_DEZENAS[dezena])
+        if unidade:
+            partes.append(_UNIDADES[unidade])
+    elif resto:
+        partes.append(_UNIDADES[resto])
+    if feminino:
+        partes = [_feminino(p) for p in partes]
+    return " e ".join(partes)
+
+
+@lru_cache(maxsize=4096)
+def numero_por_extenso(numero, feminino=True):
+    """Cardinal por extenso em português (ex.: 2201 -> 'duas mil duzentas e uma').
+
+    O gênero (padrão feminino, para "porções") vale para unidades, centenas e o
+    multiplicador de "mil"; milhão/bilhão são masculinos ("dois milhões").
+    """
+    if numero < 0:
+        return "menos " + numero_por_extenso(-numero, feminino)
+    if numero < 20:
+        return _feminino(_UNIDADES[numero]) if feminino else _UNIDADES[numero]
+    grupos = [] # Grupos de três dígitos, do menos para o mais significativo
+    while numero:
+        numero, grupo = divmod(numero, 1000)
+        grupos.append(grupo)
+    if len(grupos) - 3 >= len(_ESCALAS): # Grupo mais alto: ordem len(grupos) - 1, escala ordem - 2
+        raise ValueError("Número grande demais para escrever por extenso")
+
+    partes = []
+    for ordem in range(len(grupos) - 1, -1, -1):
+        grupo = grupos[ordem]
+        if not grupo:
+            continue
+        if ordem == 0:
+            partes.append(_grupo_extenso(grupo, feminino))
+        elif ordem == 1:
+            partes.append("mil" if grupo == 1 else f"{_grupo_extenso(grupo, feminino)} mil")
+        else:
+            singular, plural = _ESCALAS[ordem - 2]
+            partes.append(f"{_grupo_extenso(grupo, False)} {singular if grupo == 1 else plural}")
+    # "e" antes do último grupo não nulo quando ele é menor que cem ou uma centena redonda
+    # (mil e cem, dois mil e cinco, um milhão e mil, dois milhões e quinhentas mil)
+    ultimo = next(grupo for grupo in grupos if grupo)
+    if len(partes) > 1 and (ultimo < 100 or ultimo % 100 == 0):
+        return " ".join(partes[:-1]) + " e " + partes[-1]
+    return " ".join(partes)
+
+def obter_quantidade_extenso_web(quantidade):
+    """Obtém a quantidade por extenso (feminino, concordando com "porções")."""
+    if isinstance(quantidade, float) and quantidade.is_integer(): # Ex.: 2.0 vindo de planilha
+        quantidade = int(quantidade)
+    if isinstance(quantidade, int) and not isinstance(quantidade, bool):
+        return numero_por_extenso(quantidade)
+    logger.warning("Quantidade %s não mapeada para extenso. Usando numeral.", quantidade)
+    return str(quantidade)
+
+# --- Tabelas de fragmentos pré-compiladas ---
+_RE_COR = re.compile(r'^(.*?)( de cor .+)?$', re.IGNORECASE | re.UNICODE)
+_CORES_NEUTRAS = frozenset(['transparente', 'azul', 'verde', 'cinza', 'marrom', 'rosa', 'laranja', 'violeta', 'roxa'])
+_EMBALAGENS_INVARIAVEIS = ("microtubo do tipo “eppendorf”", "embalagem do tipo \"zip\"")
+
+
+@lru_cache(maxsize=1024)
+def fragmentos_quantidade(quantidade):
+    """(extenso, porção/porções, acondicionamento, referente/referentes) para a quantidade."""
+    singular = quantidade == 1
+    return (
+        obter_quantidade_extenso_web(quantidade),
+        pluralizar_palavra("porção", quantidade),
+        "acondicionada em" if singular else "acondicionadas, individualmente, em",
+        "referente" if singular else "referentes",
+    )
+
+
+@lru_cache(maxsize=1024)
+def texto_embalagem(tipo_embalagem_base_key, cor_embalagem_key_or_text, plural):
+    """Texto da embalagem (com cor, se plástico/papel), no singular ou plural."""
+    embalagem_singular = TIPOS_EMBALAGEM_BASE.get(tipo_embalagem_base_key, f"[Emb. Inválida: {tipo_embalagem_base_key}]")
+
+    # Monta a string da embalagem com cor, tratando None e strings vazias
+    if tipo_embalagem_base_key in ("pl", "pa") and cor_embalagem_key_or_text:
+        # Busca pela chave OU usa o texto direto se não for chave conhecida
+        cor_legivel = CORES_FEMININO_EMBALAGEM.get(cor_embalagem_key_or_text, cor_embalagem_key_or_text)
+        # Tenta feminilizar se necessário (e se não for uma cor 'neutra' ou vazia)
+        if cor_legivel and isinstance(cor_legivel, str) and cor_legivel not in _CORES_NEUTRAS and cor_legivel.endswith('o'):
+            cor_legivel = cor_legivel[:-1] + 'a'
+        embalagem_singular = f"{embalagem_singular} de cor {cor_legivel}"
+
+    if not plural or any(inv in embalagem_singular for inv in _EMBALAGENS_INVARIAVEIS):
+        return embalagem_singular
+    # Pluraliza só a base, preservando a parte da cor
+    match_cor = _RE_COR.match(embalagem_singular)
+    return f"{_plural(match_cor.group(1))}{match_cor.group(2) or ''}"
+
+
+# Aquece as tabelas com as combinações oferecidas na interface e quantidades usuais
+for _emb in TIPOS_EMBALAGEM_BASE:
+    for _cor in (None, *CORES_FEMININO_EMBALAGEM):
+        texto_embalagem(_emb, _cor, False)
+        texto_embalagem(_emb, _cor, True)
+for _qtd in range(1, 101):
+    fragmentos_quantidade(_qtd)
+
+
+def gerar_descricao_item_web(numero_item_str, item_data, avisos=None):
+    """Gera a descrição formatada para o DOCX a partir dos dados do item."""
+    try:
+        quantidade = item_data.get('quantidade', 1) # Default 1 se faltar
+        tipo_material_key = item_data.get('tipo_material')
+        tipo_embalagem_base_key = item_data.get('tipo_embalagem_base')
+        referencia_subitem = item_data.get('referencia_subitem', '[Ref. Ausente]') # Placeholder se faltar
+        pessoa_relacionada = item_data.get('pessoa_relacionada')
+
+        if not tipo_material_key or not tipo_embalagem_base_key:
+            _registrar_aviso(avisos, f"Erro interno: Tipo de material ou embalagem faltando para item {numero_item_str}")
+            return f"[ERRO NA DESCRIÇÃO DO ITEM {numero_item_str}]"
+
+        qtd_extenso, porcoes, acondicionamento, referente = fragmentos_quantidade(quantidade)
+        tipo_material_nome = TIPOS_MATERIAL_BASE.get(tipo_material_key) or f"[Tipo Inválido: {tipo_material_key}]"
+        emb_texto = texto_embalagem(tipo_embalagem_base_key, item_data.get('cor_embalagem'), quantidade != 1)
+
+        terminacao = "." if item_data.get('is_last', False) else ";"
+        relacionada = f", relacionada a {pessoa_relacionada}" if pessoa_relacionada else ""
+        return (f"{numero_item_str} {quantidade} ({qtd_extenso}) {porcoes} de material {tipo_material_nome}, "
+                f"{acondicionamento} {emb_texto}, {referente} à amostra do subitem {referencia_subitem} "
+                f"do laudo de constatação supracitado{relacionada}{terminacao}")
+
+    except Exception as e:
+        _registrar_aviso(avisos, f"Erro ao gerar descrição para item {numero_item_str}: {e}")
+        return f"[ERRO NA DESCRIÇÃO DO ITEM {numero_item_str}]"
+
+def formatar_data_laudo(data=None):
+    """Monta a linha de data do encerramento ('Goiânia, 5 de maio de 2025.')."""
+    hoje = data or datetime.now()
+    return f"Goiânia, {hoje.day} de {MESES_POR_NUMERO[hoje.month]} de {hoje.year}."
+
+def quantidade_valida(quantidade):
+    """Se a quantidade é um inteiro maior ou igual a 1 (como na tabela de itens)."""
+    return isinstance(quantidade, int) and not isinstance(quantidade, bool) and quantidade >= 1
+
+def validar_entrada(lacre_num, itens_data):
+    """Validação básica dos inputs obrigatórios; retorna a lista de erros encontrados.
+
+    Os tipos dos campos e os códigos de material e de embalagem são conferidos com as
+    mesmas tabelas da entrada em tabela, para que itens de lote ou do serviço falhem
+    aqui, com mensagem, e não durante a geração.
+    """
+    erros = []
+    if not lacre_num:
+        erros.append("Por favor, informe o número do Lacre.")
+    if any(not item.get('referencia_subitem') for item in itens_data): # Checa se referencia existe e não é vazia
+        erros.append("Por favor, informe a Referência do Subitem para todos os itens.")
+    if not itens_data:
+        erros.append("Informe ao menos um item.")
+    for numero, item in enumerate(itens_data, start=1):
+        if not quantidade_valida(item.get('quantidade', 1)):
+            erros.append(f"Item {numero}: quantidade deve ser um inteiro maior ou igual a 1.")
+        nao_texto = [campo for campo in CAMPOS_ITEM[1:] if item.get(campo) is not None and not isinstance(item[campo], str)]
+        if nao_texto: # Códigos que não são texto nem podem ser procurados nas tabelas
+            erros.append(f"Item {numero}: {', '.join(nao_texto)} deve(m) ser texto.")
+            continue
+        if item.get('tipo_material') not in TIPOS_MATERIAL_BASE:
+            erros.append(f"Item {numero}: tipo de material inválido (use {', '.join(TIPOS_MATERIAL_BASE)}).")
+        if item.get('tipo_embalagem_base') not in TIPOS_EMBALAGEM_BASE:
+            erros.append(f"Item {numero}: tipo de embalagem inválido (use {', '.join(TIPOS_EMBALAGEM_BASE)}).")
+    return erros
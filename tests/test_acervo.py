@@ -0,0 +1,90 @@
+"""Acervo local dos laudos emitidos (``laudo.acervo``)."""
+import os
+from datetime import datetime
+
+import pytest
+
+from laudo import acervo as modulo_acervo
+from laudo.acervo import Acervo, arquivar_emitido
+from laudo.saida import gerar_em_spool
+
+
+def _item(referencia, pessoa=''):
+    return {'quantidade': 1, 'tipo_material': 'v', 'tipo_embalagem_base': 'e', 'cor_embalagem': None,
+            'referencia_subitem': referencia, 'pessoa_relacionada': pessoa}
+
+
+@pytest.fixture
+def acervo(tmp_path):
+    return Acervo(str(tmp_path / 'acervo'))
+
+
+def _blobs(acervo):
+    return [nome for _, _, nomes in os.walk(os.path.join(acervo.diretorio, 'blobs')) for nome in nomes]
+
+
+def test_um_blob_por_conteudo(acervo, tmp_path):
+    primeiro = acervo.arquivar('123', [_item('2.1.1')], b'docx 1', data=datetime(2025, 5, 5))
+    assert acervo.arquivar('123', [_item('2.1.1')], b'docx 1', data=datetime(2025, 5, 5)) == primeiro
+    caminho = tmp_path / 'copia.docx'
+    caminho.write_bytes(b'docx 1')
+    assert acervo.arquivar('123', [_item('2.1.1')], str(caminho)) == primeiro
+    with open(caminho, 'rb') as arquivo:
+        assert acervo.arquivar('123', [_item('2.1.1')], arquivo) == primeiro
+    segundo = acervo.arquivar('123', [_item('2.1.1')], b'docx 2')
+    assert segundo != primeiro
+    assert acervo.total() == 2
+    assert len(_blobs(acervo)) == 2
+    assert acervo.conteudo(primeiro) == b'docx 1'
+    assert acervo.conteudo(segundo) == b'docx 2'
+    assert acervo.conteudo(999) is None
+
+
+def test_busca_por_prefixo(acervo):
+    a = acervo.arquivar('111', [_item('2.1.1', 'José da Silva'), _item('2.1.10')], b'a', data=datetime(2025, 1, 10))
+    b = acervo.arquivar('222', [_item('2.2.1', 'Maria Souza')], b'b', data=datetime(2025, 3, 1))
+    c = acervo.arquivar('111', [_item('3.1', 'JOSÉ Pereira')], b'c', data=datetime(2025, 6, 1))
+
+    def ids(**filtros):
+        return [r['id'] for r in acervo.buscar(**filtros)]
+
+    assert ids() == [c, b, a]
+    assert ids(lacre='111') == [c, a]
+    assert ids(subitem='2.1') == [a]
+    assert ids(subitem='2.1.10') == [a]
+    assert ids(subitem='2') == [b, a]
+    assert ids(pessoa='jose') == [c, a]
+    assert ids(pessoa='Jose da') == [a]
+    assert ids(pessoa='maria s') == [b]
+    assert ids(lacre='111', pessoa='josé p') == [c]
+    assert ids(desde='2025-02-01') == [c, b]
+    assert ids(desde='2025-01-10', ate='2025-03-01') == [b, a]
+    assert ids(subitem='9') == []
+    assert ids(limite=1) == [c]
+
+
+def test_lacre_normalizado_ao_arquivar_e_buscar(acervo):
+    id_laudo = acervo.arquivar('  0000659555 ', [_item('2.1.1')], b'docx')
+    assert [r['id'] for r in acervo.buscar(lacre='0000659555')] == [id_laudo]
+    assert [r['id'] for r in acervo.buscar(lacre=' 0000659555\t')] == [id_laudo]
+    assert acervo.obter(id_laudo)['lacre'] == '0000659555'
+
+
+def test_arquivar_emitido_com_arquivo_spool(acervo, monkeypatch):
+    monkeypatch.setattr(modulo_acervo, 'acervo', lambda: acervo)
+    itens = [_item('2.1.1', 'Fulano')]
+    arquivo, tamanho = gerar_em_spool('123', itens, data=datetime(2025, 5, 5))
+    with arquivo:
+        id_laudo = arquivar_emitido('123', itens, arquivo, data=datetime(2025, 5, 5))
+        arquivo.seek(0)
+        conteudo = arquivo.read()
+    registro = acervo.obter(id_laudo)
+    assert registro['bytes'] == tamanho == len(conteudo)
+    assert registro['entradas']['itens'] == itens
+    assert acervo.conteudo(id_laudo) == conteudo
+    assert [r['id'] for r in acervo.buscar(pessoa='fulano')] == [id_laudo]
+
+
+def test_arquivar_emitido_sem_acervo(monkeypatch):
+    monkeypatch.setattr(modulo_acervo, 'acervo', lambda: None)
+    assert arquivar_emitido('123', [_item('2.1.1')], b'docx') is None
@@ -0,0 +1,119 @@
+"""Cache LRU em memória e em disco (``laudo.cache.CacheLRU``)."""
+import os
+import threading
+
+from laudo.cache import CacheLRU, hash_conteudo
+
+
+def test_despejo_do_menos_usado_em_memoria():
+    cache = CacheLRU(10)
+    cache.guardar('a', b'aaaa')
+    cache.guardar('b', b'bbbb')
+    assert cache.obter('a') == b'aaaa' # 'a' passa a ser o mais recente
+    cache.guardar('c', b'cccc')
+    assert cache.obter('b') is None
+    assert cache.obter('a') == b'aaaa'
+    assert cache.obter('c') == b'cccc'
+    estatisticas = cache.estatisticas()
+    assert (estatisticas['despejos'], estatisticas['itens_memoria'], estatisticas['bytes_memoria']) == (1, 2, 8)
+
+
+def test_item_maior_que_o_limite_nao_entra():
+    cache = CacheLRU(4)
+    cache.guardar('a', b'aaa')
+    cache.guardar('grande', b'x' * 5)
+    assert cache.obter('grande') is None
+    assert cache.obter('a') == b'aaa'
+    cache.guardar('a', b'y' * 5) # Substituído por um valor grande demais: o antigo não fica
+    assert cache.obter('a') is None
+    assert cache.estatisticas()['bytes_memoria'] == 0
+
+
+def test_substituir_valor_atualiza_os_bytes():
+    cache = CacheLRU(100)
+    cache.guardar('a', b'12345')
+    cache.guardar('a', bytearray(b'12'))
+    assert cache.obter('a') == b'12'
+    assert cache.estatisticas()['bytes_memoria'] == 2
+
+
+def test_contadores_de_acertos_e_falhas():
+    cache = CacheLRU(100)
+    assert cache.estatisticas()['taxa_acerto'] == 0.0
+    cache.guardar('a', b'a')
+    cache.obter('a')
+    cache.obter('a')
+    cache.obter('b')
+    estatisticas = cache.estatisticas()
+    assert (estatisticas['acertos'], estatisticas['falhas']) == (2, 1)
+    assert estatisticas['taxa_acerto'] == 2 / 3
+    cache.limpar()
+    assert cache.obter('a') is None
+    assert cache.estatisticas()['falhas'] == 2 # limpar() mantém os contadores
+
+
+def test_disco_serve_o_que_saiu_da_memoria(tmp_path):
+    cache = CacheLRU(4, diretorio=str(tmp_path), limite_disco=100)
+    cache.guardar('a', b'aaaa')
+    cache.guardar('b', b'bbbb') # Despeja 'a' da memória, não do disco
+    assert cache.estatisticas()['itens_memoria'] == 1
+    assert cache.obter('a') == b'aaaa'
+    assert cache.estatisticas()['acertos'] == 1
+    assert sorted(os.listdir(tmp_path)) == ['a', 'b']
+
+
+def test_limite_do_disco(tmp_path):
+    cache = CacheLRU(100, diretorio=str(tmp_path), limite_disco=8)
+    cache.guardar('a', b'aaaa')
+    cache.guardar('b', b'bbbb')
+    cache.guardar('c', b'cccc') # Excede o disco: sai o mais antigo
+    cache.guardar('grande', b'x' * 9) # Maior que o disco: só em memória
+    assert sorted(os.listdir(tmp_path)) == ['b', 'c']
+    estatisticas = cache.estatisticas()
+    assert (estatisticas['itens_disco'], estatisticas['bytes_disco']) == (2, 8)
+
+
+def test_indexa_o_disco_de_execucoes_anteriores(tmp_path):
+    for tempo, (nome, conteudo) in enumerate([('antigo', b'1111'), ('medio', b'2222'), ('novo', b'3333')]):
+        caminho = tmp_path / nome
+        caminho.write_bytes(conteudo)
+        os.utime(caminho, (1_000_000 + tempo, 1_000_000 + tempo))
+    (tmp_path / 'parcial.tmp').write_bytes(b'lixo')
+    cache = CacheLRU(100, diretorio=str(tmp_path), limite_disco=8)
+    # O limite vale já na abertura: sai o arquivo mais antigo (mtime); .tmp é ignorado
+    assert not (tmp_path / 'antigo').exists()
+    assert cache.estatisticas()['bytes_disco'] == 8
+    assert cache.obter('medio') == b'2222'
+    assert cache.obter('novo') == b'3333'
+    assert cache.obter('antigo') is None
+    assert cache.obter('parcial.tmp') is None
+
+
+def test_arquivo_apagado_por_fora_vira_falha(tmp_path):
+    cache = CacheLRU(0, diretorio=str(tmp_path), limite_disco=100)
+    cache.guardar('a', b'aaaa')
+    os.remove(tmp_path / 'a')
+    assert cache.obter('a') is None
+    assert cache.estatisticas()['bytes_disco'] == 0
+
+
+def test_acesso_concorrente_mantem_os_totais():
+    cache = CacheLRU(64 * 20)
+    valores = [bytes([i]) * 64 for i in range(40)]
+
+    def trabalhar():
+        for _ in range(50):
+            for valor in valores:
+                chave = hash_conteudo(valor)
+                obtido = cache.obter(chave)
+                assert obtido is None or obtido == valor
+                cache.guardar(chave, valor)
+
+    threads = [threading.Thread(target=trabalhar) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    estatisticas = cache.estatisticas()
+    assert estatisticas['bytes_memoria'] == 64 * estatisticas['itens_memoria'] <= cache.limite_memoria
+    assert estatisticas['acertos'] + estatisticas['falhas'] == 8 * 50 * 40
@@ -0,0 +1,108 @@
+"""Importação dos itens do laudo de constatação (``laudo.constatacao``)."""
+import io
+
+import pytest
+from docx import Document
+
+from laudo.constatacao import analisar_trecho, importar_constatacao
+
+
+def _constatacao(*blocos):
+    """.docx com parágrafos (texto) e tabelas (lista de linhas, cada uma lista de células)."""
+    documento = Document()
+    for bloco in blocos:
+        if isinstance(bloco, str):
+            documento.add_paragraph(bloco)
+            continue
+        tabela = documento.add_table(rows=len(bloco), cols=len(bloco[0]))
+        for linha, celulas in zip(tabela.rows, bloco):
+            for celula, texto in zip(linha.cells, celulas):
+                celula.text = texto
+    saida = io.BytesIO()
+    documento.save(saida)
+    return saida.getvalue()
+
+
+LAUDO = _constatacao(
+    "LAUDO DE CONSTATAÇÃO",
+    "1 HISTÓRICO",
+    "1.1 Material vegetal apreendido em plástico, conforme requisição.",
+    "2 DO MATERIAL RECEBIDO",
+    "2.1 Porções de material vegetal",
+    "2.1.1 Cento e vinte porções de material vegetal dessecado, acondicionadas em plástico azul, "
+    "relacionadas a José A. Silva.",
+    "2.1.2 - 3 (três) porções de material pulverizado em microtubos do tipo eppendorf, "
+    "pertencentes a Fulano de Tal Jr., apreendidas no local.",
+    [["Subitem", "Descrição"],
+     ["2.1.3", "Duas mil e cem porções de material petrificado em papel alumínio; relacionada a M.A.S. Souza"]],
+    "3 DOS EXAMES",
+    "3.1 Exame preliminar em material vegetal acondicionado em plástico.",
+    "2.1.4 Uma porção de material resinoso em plástico, citada no exame.",
+)
+
+
+def test_importa_so_a_secao_do_material():
+    avisos = []
+    itens = importar_constatacao(LAUDO, avisos)
+    assert [item['referencia_subitem'] for item in itens] == ['2.1.1', '2.1.2', '2.1.3']
+    assert itens[0] == {'quantidade': 120, 'tipo_material': 'v', 'tipo_embalagem_base': 'pl', 'cor_embalagem': 'azul',
+                        'referencia_subitem': '2.1.1', 'pessoa_relacionada': 'José A. Silva'}
+    assert (itens[1]['quantidade'], itens[1]['tipo_material'], itens[1]['tipo_embalagem_base']) == (3, 'po', 'e')
+    assert itens[1]['pessoa_relacionada'] == 'Fulano de Tal Jr.'
+    assert (itens[2]['quantidade'], itens[2]['tipo_material'], itens[2]['tipo_embalagem_base']) == (2100, 'pd', 'a')
+    assert itens[2]['pessoa_relacionada'] == 'M.A.S. Souza'
+    assert avisos == [
+        "Trecho 1.1 ignorado: está na seção 1, fora da seção do material (seção 2).",
+        "Trecho 3.1 ignorado: está na seção 3, fora da seção do material (seção 2).",
+        "Trecho 2.1.4 ignorado: está na seção 3, fora da seção do material (seção 2).",
+    ]
+
+
+def test_sem_titulo_de_secao_vale_a_secao_2():
+    avisos = []
+    itens = importar_constatacao(_constatacao(
+        "2.1 Uma porção de material vegetal em plástico transparente.",
+        "5.1 Resultado obtido para o material vegetal acondicionado em plástico.",
+    ), avisos)
+    assert [(item['referencia_subitem'], item['cor_embalagem']) for item in itens] == [('2.1', 't')]
+    assert avisos == ["Trecho 5.1 ignorado: a referência não é da seção do material (seção 2)."]
+
+
+@pytest.mark.parametrize('texto, quantidade', [
+    ("2.1.1 Uma porção de material vegetal em plástico.", 1),
+    ("2.1.1 Porção de material vegetal em plástico.", 1),
+    ("2.1.1 Vinte e duas porções de material vegetal em plástico.", 22),
+    ("2.1.1 Noventa e nove porções de material vegetal em plástico.", 99),
+    ("2.1.1 Cem porções de material vegetal em plástico.", 100),
+    ("2.1.1 Cento e uma porções de material vegetal em plástico.", 101),
+    ("2.1.1 Trezentas e quarenta e cinco porções de material vegetal em plástico.", 345),
+    ("2.1.1 Mil porções de material vegetal em plástico.", 1000),
+    ("2.1.1 Duas mil duzentas e uma porções de material vegetal em plástico.", 2201),
+    ("2.1.1 150 (cento e cinquenta) porções de material vegetal em plástico.", 150),
+    ("2.1.1 12 porções de material vegetal em plástico.", 12),
+])
+def test_quantidade(texto, quantidade):
+    item, faltando = analisar_trecho(texto)
+    assert item['quantidade'] == quantidade
+    assert faltando == []
+
+
+def test_quantidade_nao_identificada():
+    item, faltando = analisar_trecho("2.1.1 Material vegetal em plástico.")
+    assert item['quantidade'] == 1
+    assert faltando == ['quantidade']
+
+
+@pytest.mark.parametrize('texto, pessoa', [
+    ("2.1.1 Uma porção de material vegetal em plástico, relacionada a Beltrano. Lacre 123.", "Beltrano"),
+    ("2.1.1 Uma porção de material vegetal em plástico, relacionada a José A. Silva.", "José A. Silva"),
+    ("2.1.1 Uma porção de material vegetal em plástico, relacionada ao Dr. Fulano; lacre 1.", "Dr. Fulano"),
+    ("2.1.1 Uma porção de material vegetal em plástico.", ""),
+])
+def test_pessoa_relacionada(texto, pessoa):
+    assert analisar_trecho(texto)[0]['pessoa_relacionada'] == pessoa
+
+
+def test_titulo_de_subsecao_nao_e_item():
+    assert analisar_trecho("2.1 DO MATERIAL RECEBIDO PARA EXAME") is None
+    assert analisar_trecho("Texto sem referência de material vegetal.") is None
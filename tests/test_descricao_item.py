@@ -0,0 +1,74 @@
+"""``gerar_descricao_item_web`` (tabelas pré-compiladas) contra a implementação anterior.
+
+``_descricao_anterior`` é a versão de antes das tabelas memoizadas, copiada como
+referência; as saídas devem ser idênticas para todas as entradas que ela já suportava
+(quantidades de 1 a 20, que ela escrevia por extenso).
+"""
+import itertools
+import re
+
+import pytest
+
+from laudo.textos import (
+    CORES_FEMININO_EMBALAGEM, QUANTIDADES_EXTENSO, TIPOS_EMBALAGEM_BASE, TIPOS_MATERIAL_BASE,
+    gerar_descricao_item_web,
+)
+
+
+def _plural_anterior(palavra, quantidade):
+    if quantidade == 1 or not isinstance(palavra, str):
+        return palavra
+    if palavra == "microtubo do tipo “eppendorf”": return palavra
+    if palavra == "embalagem do tipo \"zip\"": return palavra
+    if palavra == "microtubo do tipo “eppendorf”s": return "microtubo do tipo “eppendorf”"
+    if palavra.endswith('m'): return re.sub(r'm$', 'ns', palavra)
+    if palavra.endswith(('ão', 'ões')): return palavra
+    if palavra.endswith(('al', 'el', 'ol', 'ul')): return palavra[:-1] + 'is'
+    if palavra.endswith(('r', 'z', 's')): return palavra + 'es'
+    return palavra + 's'
+
+
+def _descricao_anterior(numero_item_str, item_data):
+    quantidade = item_data.get('quantidade', 1)
+    tipo_material_key = item_data.get('tipo_material')
+    tipo_embalagem_base_key = item_data.get('tipo_embalagem_base')
+    cor_embalagem_key_or_text = item_data.get('cor_embalagem')
+    referencia_subitem = item_data.get('referencia_subitem', '[Ref. Ausente]')
+    pessoa_relacionada = item_data.get('pessoa_relacionada')
+    if not tipo_material_key or not tipo_embalagem_base_key:
+        return f"[ERRO NA DESCRIÇÃO DO ITEM {numero_item_str}]"
+
+    qtd_extenso = QUANTIDADES_EXTENSO[quantidade]
+    porcoes = _plural_anterior("porção", quantidade)
+    acondicionamento = "acondicionada em" if quantidade == 1 else "acondicionadas, individualmente, em"
+    tipo_material_nome = TIPOS_MATERIAL_BASE.get(tipo_material_key, f"[Tipo Inválido: {tipo_material_key}]")
+    embalagem_singular = TIPOS_EMBALAGEM_BASE.get(tipo_embalagem_base_key, f"[Emb. Inválida: {tipo_embalagem_base_key}]")
+    if tipo_embalagem_base_key in ["pl", "pa"] and cor_embalagem_key_or_text:
+        cor_legivel = CORES_FEMININO_EMBALAGEM.get(cor_embalagem_key_or_text, cor_embalagem_key_or_text)
+        if cor_legivel and cor_legivel not in ['transparente', 'azul', 'verde', 'cinza', 'marrom', 'rosa', 'laranja', 'violeta', 'roxa'] and isinstance(cor_legivel, str) and cor_legivel.endswith('o'):
+            cor_legivel = cor_legivel[:-1] + 'a'
+        embalagem_singular = f"{embalagem_singular} de cor {cor_legivel}"
+    if "microtubo do tipo “eppendorf”" in embalagem_singular: emb_texto = embalagem_singular
+    elif "embalagem do tipo \"zip\"" in embalagem_singular: emb_texto = embalagem_singular
+    else:
+        match_cor = re.search(r'^(.*?)( de cor .+)?$', embalagem_singular, re.IGNORECASE | re.UNICODE)
+        emb_texto = f"{_plural_anterior(match_cor.group(1), quantidade)}{match_cor.group(2) or ''}"
+    referente = "referente" if quantidade == 1 else "referentes"
+    terminacao = "." if item_data.get('is_last', False) else ";"
+    desc = f"{numero_item_str} {quantidade} ({qtd_extenso}) {porcoes} de material {tipo_material_nome}, {acondicionamento} {emb_texto}, {referente} à amostra do subitem {referencia_subitem} do laudo de constatação supracitado"
+    desc += f", relacionada a {pessoa_relacionada}{terminacao}" if pessoa_relacionada else f"{terminacao}"
+    return desc
+
+
+MATERIAIS = [*TIPOS_MATERIAL_BASE, 'x']
+EMBALAGENS = [*TIPOS_EMBALAGEM_BASE, 'x']
+CORES = [None, '', *CORES_FEMININO_EMBALAGEM, 'lilás', 'roxo', 'dourado']
+PESSOAS = [None, '', 'Fulano de Tal']
+
+
+@pytest.mark.parametrize('quantidade', sorted(QUANTIDADES_EXTENSO))
+def test_igual_a_implementacao_anterior(quantidade):
+    for material, embalagem, cor, pessoa, ultimo in itertools.product(MATERIAIS, EMBALAGENS, CORES, PESSOAS, (False, True)):
+        item = {'quantidade': quantidade, 'tipo_material': material, 'tipo_embalagem_base': embalagem,
+                'cor_embalagem': cor, 'referencia_subitem': '2.1.1', 'pessoa_relacionada': pessoa, 'is_last': ultimo}
+        assert gerar_descricao_item_web("2.1", item) == _descricao_anterior("2.1", item), item
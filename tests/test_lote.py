@@ -0,0 +1,56 @@
+"""Geração em lote pela linha de comando (``laudo.lote``)."""
+import json
+import os
+import zipfile
+
+import pytest
+from PIL import Image
+
+from laudo import lote
+
+
+def _item(referencia, pessoa='Fulano'):
+    return {'quantidade': 2, 'tipo_material': 'v', 'tipo_embalagem_base': 'pl', 'cor_embalagem': 't',
+            'referencia_subitem': referencia, 'pessoa_relacionada': pessoa}
+
+
+def _jsonl(caminho, casos):
+    caminho.write_text("\n".join(json.dumps(caso) for caso in casos) + "\n", encoding='utf-8')
+    return str(caminho)
+
+
+@pytest.fixture(autouse=True)
+def _sem_acervo(monkeypatch):
+    monkeypatch.delenv('LAUDO_ACERVO_DIR', raising=False)
+    monkeypatch.delenv('LAUDO_CACHE_IMAGENS_DIR', raising=False)
+
+
+def test_dois_casos_em_dois_processos(tmp_path):
+    foto = tmp_path / 'foto.jpg'
+    Image.new('RGB', (64, 48), 'red').save(foto)
+    entrada = _jsonl(tmp_path / 'casos.jsonl', [
+        {'arquivo': 'a.docx', 'lacre_num': '0000659555', 'data': '2025-05-05',
+         'itens': [_item('2.1.1'), _item('2.1.2', 'Beltrano')], 'imagens': [str(foto)]},
+        {'arquivo': 'b.docx', 'lacre_num': '0000659556', 'itens': [_item('2.1.1')]},
+    ])
+    saida = tmp_path / 'saida'
+    metricas = tmp_path / 'metricas.prom'
+    assert lote.main([entrada, '--saida', str(saida), '-j', '2', '--metricas', str(metricas)]) == 0
+    assert sorted(os.listdir(saida)) == ['a.docx', 'b.docx']
+    for nome, lacre, com_imagem in [('a.docx', '0000659555', True), ('b.docx', '0000659556', False)]:
+        with zipfile.ZipFile(saida / nome) as docx:
+            assert docx.testzip() is None
+            assert lacre in docx.read('word/document.xml').decode('utf-8')
+            assert any(parte.startswith('word/media/') for parte in docx.namelist()) == com_imagem
+    assert metricas.read_text(encoding='utf-8')
+
+
+def test_caso_invalido_nao_deixa_arquivo(tmp_path, capsys):
+    entrada = _jsonl(tmp_path / 'casos.jsonl', [
+        {'arquivo': 'ok.docx', 'lacre_num': '1', 'itens': [_item('2.1.1')]},
+        {'arquivo': 'sem_itens.docx', 'lacre_num': '2', 'itens': []},
+    ])
+    saida = tmp_path / 'saida'
+    assert lote.main([entrada, '--saida', str(saida), '-j', '2']) == 1
+    assert 'FALHA sem_itens.docx' in capsys.readouterr().err
+    assert os.listdir(saida) == ['ok.docx']
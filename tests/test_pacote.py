@@ -0,0 +1,78 @@
+"""Empacotamento determinístico do .docx (``laudo.pacote``)."""
+import io
+import zipfile
+from datetime import datetime
+
+import pytest
+from docx import Document
+from PIL import Image
+
+from laudo import pacote
+from laudo.gerador import gerar_laudo_docx, montar_documento
+from laudo.streaming import gerar_laudo_docx_streaming
+
+DATA = datetime(2025, 5, 5)
+ITENS = [{'quantidade': 3, 'tipo_material': 'po', 'tipo_embalagem_base': 'pl', 'cor_embalagem': 'az',
+          'referencia_subitem': '2.1.1', 'pessoa_relacionada': 'Fulano'}]
+
+
+def _jpeg():
+    saida = io.BytesIO()
+    Image.effect_noise((200, 150), 40).convert('RGB').save(saida, 'JPEG')
+    return saida.getvalue()
+
+
+IMAGENS = [('foto.jpg', _jpeg())]
+
+
+def _salvar(documento):
+    saida = io.BytesIO()
+    pacote.salvar_documento(documento, saida)
+    return saida.getvalue()
+
+
+def test_mesmo_documento_mesmos_bytes():
+    documento = montar_documento("123", ITENS, imagens=IMAGENS, data=DATA)
+    assert _salvar(documento) == _salvar(documento)
+
+
+@pytest.mark.parametrize('gerar', [gerar_laudo_docx, gerar_laudo_docx_streaming])
+def test_mesmas_entradas_mesmos_bytes(gerar):
+    assert gerar("123", ITENS, imagens=IMAGENS, data=DATA) == gerar("123", ITENS, imagens=IMAGENS, data=DATA)
+
+
+@pytest.mark.parametrize('gerar', [gerar_laudo_docx, gerar_laudo_docx_streaming])
+def test_data_ordem_e_compressao_das_partes(gerar):
+    with zipfile.ZipFile(io.BytesIO(gerar("123", ITENS, imagens=IMAGENS, data=DATA))) as zf:
+        infos = zf.infolist()
+    nomes = [info.filename for info in infos]
+    assert nomes[:2] == [pacote.TIPOS_CONTEUDO, pacote.RELACIONAMENTOS_PACOTE]
+    assert nomes == sorted(nomes, key=pacote.ordem_partes)
+    assert nomes[-1].startswith('word/media/')
+    assert 'docProps/thumbnail.jpeg' in nomes
+    for info in infos:
+        assert info.date_time == pacote.DATA_FIXA
+        esperado = zipfile.ZIP_STORED if info.filename.startswith('word/media/') else zipfile.ZIP_DEFLATED
+        assert info.compress_type == esperado, info.filename
+
+
+def test_nivel_zero_armazena_tudo():
+    saida = io.BytesIO()
+    pacote.salvar_documento(montar_documento("123", ITENS, data=DATA), saida, nivel=0)
+    with zipfile.ZipFile(saida) as zf:
+        assert {info.compress_type for info in zf.infolist()} == {zipfile.ZIP_STORED}
+
+
+class _SemPassosInternos:
+    """``PackageWriter`` de uma versão do python-docx sem os métodos ``_write_*``."""
+
+
+def test_alternativa_sem_passos_internos(monkeypatch):
+    documento = montar_documento("123", ITENS, imagens=IMAGENS, data=DATA)
+    esperado = _salvar(documento)
+    monkeypatch.setattr(pacote, 'PackageWriter', _SemPassosInternos)
+    conteudo = _salvar(documento)
+    assert conteudo == esperado
+    with zipfile.ZipFile(io.BytesIO(conteudo)) as zf:
+        assert zf.testzip() is None
+    assert [p.text for p in Document(io.BytesIO(conteudo)).paragraphs] == [p.text for p in documento.paragraphs]
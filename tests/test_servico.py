@@ -0,0 +1,118 @@
+"""Serviço HTTP (``laudo.servico``): validação dos pedidos e recuperação do pool de processos."""
+import http.client
+import json
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from laudo import servico
+
+ITEM = {'quantidade': 2, 'tipo_material': 'v', 'tipo_embalagem_base': 'pl', 'cor_embalagem': 't',
+        'referencia_subitem': '2.1.1', 'pessoa_relacionada': 'Fulano'}
+PEDIDO = {'lacre_num': '0000659555', 'itens': [ITEM], 'data': '2025-05-05', 'imagens': []}
+
+
+@pytest.fixture(scope='module')
+def servidor():
+    servidor = servico.criar_servidor(porta=0, processos=1, limite_fila=1)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+    servidor.fila.encerrar()
+
+
+def _postar(servidor, corpo, cabecalhos=None):
+    conexao = http.client.HTTPConnection(*servidor.server_address, timeout=30)
+    try:
+        conexao.putrequest('POST', '/laudos')
+        for nome, valor in (cabecalhos or {'Content-Length': str(len(corpo))}).items():
+            conexao.putheader(nome, valor)
+        conexao.endheaders(corpo)
+        resposta = conexao.getresponse()
+        return resposta.status, json.loads(resposta.read())
+    finally:
+        conexao.close()
+
+
+@pytest.mark.parametrize('campo, valor', [
+    ('referencia_subitem', 5),
+    ('pessoa_relacionada', ['Fulano']),
+    ('cor_embalagem', ['t']),
+    ('tipo_material', ['v']),
+    ('tipo_embalagem_base', {'pl': 1}),
+    ('quantidade', '2'),
+    ('quantidade', 2.5),
+    ('quantidade', True),
+])
+def test_tipos_invalidos_recusados_com_422(servidor, campo, valor):
+    pedido = dict(PEDIDO, itens=[dict(ITEM, **{campo: valor})])
+    status, corpo = _postar(servidor, json.dumps(pedido).encode('utf-8'))
+    assert status == 422
+    assert any(erro.startswith("Item 1:") for erro in corpo['erros'])
+    assert servidor.fila.ocupacao()['na_fila'] == 0
+
+
+def test_content_length_invalido_responde_400(servidor):
+    status, corpo = _postar(servidor, b'{}', {'Content-Length': 'abc'})
+    assert status == 400
+    assert 'Content-Length' in corpo['erro']
+
+
+def test_pedido_valido_aceito(servidor):
+    status, corpo = _postar(servidor, json.dumps(PEDIDO).encode('utf-8'))
+    assert status == 202
+    assert _aguardar(servidor.fila, corpo['id'])['estado'] == 'concluido'
+
+
+def _aguardar(fila, id_trabalho, limite_s=60):
+    fim = time.monotonic() + limite_s
+    while time.monotonic() < fim:
+        estado = fila.estado(id_trabalho)
+        if estado['estado'] not in ('na_fila', 'processando'):
+            return estado
+        time.sleep(0.05)
+    raise AssertionError(f"trabalho {id_trabalho} não terminou")
+
+
+def _encerrar_processo(id_trabalho, pedido):
+    os._exit(1) # Simula o processo filho morto (ex.: pelo OOM killer)
+
+
+class _PoolQuebrado:
+    def submit(self, *args, **kwargs):
+        raise BrokenProcessPool("processo filho encerrado")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def test_processo_morto_marca_erro_e_recria_pool(monkeypatch):
+    fila = servico.FilaLaudos(processos=1, limite_fila=0)
+    try:
+        monkeypatch.setattr(servico, 'executar_trabalho', _encerrar_processo)
+        estado = _aguardar(fila, fila.submeter(PEDIDO)['id'])
+        assert estado['estado'] == 'erro'
+        assert 'encerrado' in estado['erro']
+        monkeypatch.undo()
+        # A vaga foi liberada e o pool novo aceita trabalho
+        assert _aguardar(fila, fila.submeter(PEDIDO)['id'])['estado'] == 'concluido'
+    finally:
+        fila.encerrar()
+
+
+def test_submit_em_pool_quebrado_nao_ocupa_vaga():
+    fila = servico.FilaLaudos(processos=1, limite_fila=0)
+    try:
+        fila._executor = _PoolQuebrado()
+        with pytest.raises(servico.FilaCheia):
+            fila.submeter(PEDIDO)
+        assert fila.ocupacao()['na_fila'] == 0
+        assert not isinstance(fila._executor, _PoolQuebrado)
+        assert _aguardar(fila, fila.submeter(PEDIDO)['id'])['estado'] == 'concluido'
+    finally:
+        fila.encerrar()
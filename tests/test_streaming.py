@@ -0,0 +1,77 @@
+"""O motor em streaming (``laudo.streaming``) produz o mesmo documento que o motor python-docx."""
+import io
+import zipfile
+from datetime import datetime
+
+import pytest
+from docx import Document
+from lxml import etree
+from PIL import Image
+
+from laudo.gerador import gerar_laudo_docx
+from laudo.modelo import NS_W
+from laudo.streaming import gerar_laudo_docx_streaming
+
+DATA = datetime(2025, 5, 5)
+MATERIAIS = ('v', 'po', 'pd', 'r')
+EMBALAGENS = ('e', 'z', 'a', 'pl', 'pa')
+
+
+def _itens(quantidade):
+    return [{
+        'quantidade': i % 7 + 1,
+        'tipo_material': MATERIAIS[i % len(MATERIAIS)],
+        'tipo_embalagem_base': EMBALAGENS[i % len(EMBALAGENS)],
+        'cor_embalagem': 'az' if i % 2 else None,
+        'referencia_subitem': f"2.1.{i + 1}",
+        'pessoa_relacionada': "Fulano <de> Tal & Cia" if i % 3 else "",
+    } for i in range(quantidade)]
+
+
+def _jpeg(largura, altura, cor):
+    saida = io.BytesIO()
+    Image.new('RGB', (largura, altura), cor).save(saida, 'JPEG')
+    return saida.getvalue()
+
+
+IMAGENS = [('a.jpg', _jpeg(400, 300, 'red')), ('b.jpg', _jpeg(300, 400, 'blue')), ('c.jpg', _jpeg(400, 300, 'red'))]
+
+
+def _paragrafos(conteudo):
+    """(estilo, texto, ilustrações) de cada parágrafo do corpo."""
+    documento = Document(io.BytesIO(conteudo))
+    return [(p.style.name, p.text, len(p._p.xpath('.//pic:pic'))) for p in documento.paragraphs]
+
+
+def _texto_documento(conteudo):
+    """Texto de todos os w:t do document.xml, na ordem."""
+    with zipfile.ZipFile(io.BytesIO(conteudo)) as zf:
+        raiz = etree.fromstring(zf.read('word/document.xml'))
+    return [t.text for t in raiz.iter(f'{{{NS_W}}}t')]
+
+
+@pytest.mark.parametrize('quantidade', [0, 1, 25])
+@pytest.mark.parametrize('imagens', [(), IMAGENS], ids=['sem_imagens', 'com_imagens'])
+def test_streaming_igual_ao_python_docx(quantidade, imagens):
+    itens = _itens(quantidade)
+    avisos_docx, avisos_streaming = [], []
+    docx = gerar_laudo_docx("L<&>1", itens, imagens=imagens, data=DATA, avisos=avisos_docx)
+    streaming = gerar_laudo_docx_streaming("L<&>1", itens, imagens=imagens, data=DATA, avisos=avisos_streaming)
+    assert _texto_documento(streaming) == _texto_documento(docx)
+    assert _paragrafos(streaming) == _paragrafos(docx)
+    assert sum(ilustracoes for _, _, ilustracoes in _paragrafos(streaming)) == len(imagens)
+    assert avisos_streaming == avisos_docx
+
+
+def test_streaming_aceita_gerador_de_itens():
+    itens = _itens(5)
+    streaming = gerar_laudo_docx_streaming("1", (item for item in itens), data=DATA)
+    assert _paragrafos(streaming) == _paragrafos(gerar_laudo_docx("1", itens, data=DATA))
+
+
+def test_imagens_repetidas_compartilham_a_midia():
+    docx = gerar_laudo_docx("1", _itens(1), imagens=IMAGENS, data=DATA)
+    streaming = gerar_laudo_docx_streaming("1", _itens(1), imagens=IMAGENS, data=DATA)
+    for conteudo in (docx, streaming):
+        with zipfile.ZipFile(io.BytesIO(conteudo)) as zf:
+            assert len([nome for nome in zf.namelist() if nome.startswith('word/media/')]) == 2
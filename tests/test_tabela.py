@@ -0,0 +1,93 @@
+"""Entrada de itens em tabela (``laudo.tabela``): leitura do texto colado e validação."""
+import pandas as pd
+import pytest
+
+from laudo.tabela import COLUNAS, ler_tabela_colada, tabela_vazia, validar_tabela
+
+ERRO_QUANTIDADE = "quantidade deve ser um inteiro maior ou igual a 1"
+
+
+def _tabela(*linhas):
+    return pd.DataFrame([dict(zip(COLUNAS, linha)) for linha in linhas], columns=COLUNAS)
+
+
+@pytest.mark.parametrize('quantidade', [None, float('nan'), '', '  ', 'nan', 'duas', '0', '-1', '2.5'])
+def test_quantidade_invalida_recusada(quantidade):
+    itens, erros = validar_tabela(_tabela((quantidade, 'v', 'e', None, '2.1.1', '')))
+    assert itens == []
+    assert erros == [f"Linha 1: {ERRO_QUANTIDADE}."]
+
+
+@pytest.mark.parametrize('quantidade', ['2.0', 2.0, ' 2 ', 2])
+def test_quantidade_inteira_em_ponto_flutuante_aceita(quantidade):
+    itens, erros = validar_tabela(_tabela((quantidade, 'v', 'e', None, '2.1.1', '')))
+    assert erros == []
+    assert itens[0]['quantidade'] == 2
+    assert type(itens[0]['quantidade']) is int
+
+
+def test_cor_so_para_plastico_e_papel():
+    itens, erros = validar_tabela(_tabela(
+        (1, 'v', 'pl', 'az', '2.1.1', ''),
+        (1, 'v', 'PA', 'Preto', '2.1.2', ''),
+        (1, 'v', 'e', 'az', '2.1.3', ''),
+        (1, 'v', 'z', 'b', '2.1.4', ''),
+        (1, 'v', 'pl', '', '2.1.5', ''),
+    ))
+    assert erros == []
+    assert [item['cor_embalagem'] for item in itens] == ['az', 'preto', None, None, None]
+    assert [item['tipo_embalagem_base'] for item in itens] == ['pl', 'pa', 'e', 'z', 'pl']
+
+
+def test_codigos_desconhecidos_citam_a_linha():
+    itens, erros = validar_tabela(_tabela(
+        (1, 'v', 'e', None, '2.1.1', ''),
+        (1, 'x', 'e', None, '2.1.2', ''),
+        (1, 'v', 'caixa', None, '2.1.3', ''),
+        (1, 'v', 'e', None, '', ''),
+        (1, 'v', 'e', None, 'dois', ''),
+    ))
+    assert itens == []
+    assert erros == [
+        "Linha 2: tipo de material inválido (use v, po, pd, r).",
+        "Linha 3: tipo de embalagem inválido (use e, z, a, pl, pa).",
+        "Linha 4: informe a referência do subitem.",
+        "Linha 5: referência do subitem deve ter o formato 2.1.1.",
+    ]
+
+
+def test_linhas_vazias_ignoradas_e_ultimo_item_marcado():
+    tabela = _tabela((2, 'po', 'a', None, '2.1.1', 'Fulano'), (None, None, None, None, None, None),
+                     ('', ' ', '', '', '', ''), (1, 'r', 'e', None, '2.1.2', ''))
+    itens, erros = validar_tabela(tabela)
+    assert erros == []
+    assert [item['referencia_subitem'] for item in itens] == ['2.1.1', '2.1.2']
+    assert [item['is_last'] for item in itens] == [False, True]
+
+
+ESPERADO = [
+    {'quantidade': 2, 'tipo_material': 'v', 'tipo_embalagem_base': 'pl', 'cor_embalagem': 'az',
+     'referencia_subitem': '2.1.1', 'pessoa_relacionada': 'Fulano de Tal', 'is_last': False},
+    {'quantidade': 3, 'tipo_material': 'po', 'tipo_embalagem_base': 'e', 'cor_embalagem': None,
+     'referencia_subitem': '2.1.2', 'pessoa_relacionada': '', 'is_last': True},
+]
+
+
+@pytest.mark.parametrize('texto', [
+    "2\tv\tpl\taz\t2.1.1\tFulano de Tal\n3\tpo\te\t\t2.1.2\t\n",
+    "2;v;pl;az;2.1.1;Fulano de Tal\n3;po;e;;2.1.2;\n",
+    "2,v,pl,az,2.1.1,Fulano de Tal\n3,po,e,,2.1.2,\n",
+    "quantidade\ttipo_material\ttipo_embalagem_base\tcor_embalagem\treferencia_subitem\tpessoa_relacionada\n"
+    "2.0\tV\tpl\taz\t2.1.1\tFulano de Tal\n3\tpo\te\t\t2.1.2\t\n",
+    "referencia_subitem;quantidade;tipo_material;tipo_embalagem_base;cor_embalagem;pessoa_relacionada\n"
+    "2.1.1;2;v;pl;az;Fulano de Tal\n2.1.2;3;po;e;;\n",
+], ids=['tab', 'ponto_e_virgula', 'virgula', 'tab_com_cabecalho', 'cabecalho_fora_de_ordem'])
+def test_texto_colado(texto):
+    itens, erros = validar_tabela(ler_tabela_colada(texto))
+    assert erros == []
+    assert itens == ESPERADO
+
+
+def test_texto_colado_vazio():
+    assert ler_tabela_colada("\n\n").empty
+    assert validar_tabela(tabela_vazia(0)) == ([], [])
@@ -0,0 +1,41 @@
+"""Números por extenso (``laudo.textos.numero_por_extenso``)."""
+import pytest
+
+from laudo.textos import numero_por_extenso
+
+# (número, feminino, masculino); as fronteiras das escalas são os casos sensíveis ao "e"
+CASOS = [
+    (1, "uma", "um"),
+    (2, "duas", "dois"),
+    (21, "vinte e uma", "vinte e um"),
+    (100, "cem", "cem"),
+    (101, "cento e uma", "cento e um"),
+    (200, "duzentas", "duzentos"),
+    (1000, "mil", "mil"),
+    (1001, "mil e uma", "mil e um"),
+    (1100, "mil e cem", "mil e cem"),
+    (1101, "mil cento e uma", "mil cento e um"),
+    (2201, "duas mil duzentas e uma", "dois mil duzentos e um"),
+    (1_000_000, "um milhão", "um milhão"),
+    (1_000_100, "um milhão e cem", "um milhão e cem"),
+    (1_001_000, "um milhão e mil", "um milhão e mil"),
+    (2_000_001, "dois milhões e uma", "dois milhões e um"),
+    (2_500_000, "dois milhões e quinhentas mil", "dois milhões e quinhentos mil"),
+    (1_200_300, "um milhão duzentas mil e trezentas", "um milhão duzentos mil e trezentos"),
+    (1_234_567, "um milhão duzentas e trinta e quatro mil quinhentas e sessenta e sete",
+     "um milhão duzentos e trinta e quatro mil quinhentos e sessenta e sete"),
+    (3_000_000_000, "três bilhões", "três bilhões"),
+    (10 ** 15, "um quatrilhão", "um quatrilhão"),
+    (2 * 10 ** 15, "dois quatrilhões", "dois quatrilhões"),
+]
+
+
+@pytest.mark.parametrize('numero, feminino, masculino', CASOS)
+def test_numero_por_extenso(numero, feminino, masculino):
+    assert numero_por_extenso(numero) == feminino
+    assert numero_por_extenso(numero, False) == masculino
+
+
+def test_numero_grande_demais():
+    with pytest.raises(ValueError):
+        numero_por_extenso(10 ** 18)